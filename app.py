@@ -10,7 +10,10 @@ from tensorflow.keras.preprocessing.sequence import pad_sequences
 
 from rnn_custom import AttentionLayer, build_input
 from cao import TitleScraper
-from underthesea import word_tokenize
+from crawl_errors import FetchGuard, NegativeCache
+from http_cache import HTMLCache
+# word_tokenize của underthesea + cache trên đĩa (tokenize_cache.py)
+from tokenize_cache import print_stats as print_tokenize_stats, word_tokenize
 
 
 app = Flask(__name__)
@@ -537,7 +540,10 @@ PAGE_HTML = """
 """
 
 
-scraper = TitleScraper()
+# Dùng chung cache HTML với cao.py / caornn.py: link đã cào thì không phải tải lại
+# Web cần trả lời nhanh: chỉ thử lại 1 lần với lỗi tạm thời
+scraper = TitleScraper(cache=HTMLCache(),
+                       guard=FetchGuard(retries=1, backoff=0.5, negative_cache=NegativeCache()))
 
 
 @app.route("/", methods=["GET", "POST"])
@@ -702,4 +708,7 @@ def index():
 
 if __name__ == "__main__":
     # Chạy trên localhost:5000
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    try:
+        app.run(host="0.0.0.0", port=5000, debug=True)
+    finally:
+        print_tokenize_stats()
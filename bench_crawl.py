@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark end-to-end cao.py / caornn.py trên server tin giả lập (fake_news_server.py)
+
+Mỗi chế độ chạy được chạy trong 1 thư mục tạm riêng (cache, journal, negative cache mới),
+scraper chạy bằng subprocess như khi dùng thật. Đo:
+    - trang/giây (wall time của cả lệnh)
+    - p50 / p99 thời gian fetch 1 URL (lấy từ file số liệu --metrics của scraper; tính chính
+      xác từ thời gian của từng URL, không nội suy theo bucket histogram)
+    - CPU (user + sys) mỗi trang của tiến trình scraper
+
+Kết quả được ghi vào .cache/bench/<thời điểm>-<commit>.json và nối thêm vào
+.cache/bench/history.jsonl; mỗi lần chạy in chênh lệch so với lần chạy trước đó có cùng cấu hình
+(số báo/bài/thư mục, rate, latency, tỉ lệ lỗi...), khác cấu hình thì không so.
+
+Cách dùng:
+    python bench_crawl.py
+    python bench_crawl.py --pages=20 --folders=3 --latency=80 --jitter=40
+    python bench_crawl.py --modes=cao-async,caornn-parallel --drip=20000
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:     # Windows: không đo được CPU của tiến trình con
+    resource = None
+
+from cao import parse_args
+from fake_news_server import config_from_options, start_servers, stop_servers, write_links
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BENCH_DIR = os.path.join('.cache', 'bench')
+HISTORY_FILE = os.path.join(BENCH_DIR, 'history.jsonl')
+
+# Tên chế độ → (script, tham số); {delay} / {rate} được thay theo --rate
+MODES = {
+    'cao-seq':         ('cao.py',    ['--delay={delay}']),
+    'cao-async':       ('cao.py',    ['--async', '--delay={delay}']),
+    'cao-parallel':    ('cao.py',    ['--parallel', '--delay={delay}']),
+    'cao-full-page':   ('cao.py',    ['--parallel', '--full-page', '--delay={delay}']),
+    'caornn-seq':      ('caornn.py', ['--rate={rate}']),
+    'caornn-workers':  ('caornn.py', ['--workers=8', '--rate={rate}']),
+    'caornn-parallel': ('caornn.py', ['--parallel', '--rate={rate}']),
+    'caornn-both':     ('caornn.py', ['--parallel', '--both', '--links=links.txt', '--rate={rate}']),
+    'caornn-soup':     ('caornn.py', ['--parallel', '--parser=soup', '--rate={rate}']),
+    'caornn-parse-pool': ('caornn.py', ['--parallel', '--parse-workers', '--parser=soup', '--rate={rate}']),
+}
+COMMON_ARGS = ['--no-cache', '--fresh']
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return 'unknown'
+
+
+def children_cpu() -> float:
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_mode(name: str, sites_info: list, folders: int, pages: int, rate: float) -> dict:
+    """Chạy 1 chế độ trong thư mục tạm, trả về số liệu"""
+    script, args = MODES[name]
+    args = [a.format(delay=1.0 / rate, rate=rate) for a in args]
+
+    workspace = tempfile.mkdtemp(prefix=f'bench-{name}-')
+    try:
+        folder_names = [f'member{i + 1}' for i in range(folders)]
+        for i, folder in enumerate(folder_names):
+            write_links(os.path.join(workspace, folder), sites_info, pages, offset=i * pages)
+
+        metrics_prefix = os.path.join(workspace, 'metrics')
+        command = [sys.executable, os.path.join(ROOT, script), *COMMON_ARGS, *args,
+                   f'--metrics={metrics_prefix}', *folder_names]
+        env = dict(os.environ, ML2_HTML_CACHE=os.path.join(workspace, '.cache', 'html'))
+
+        cpu_before = children_cpu()
+        start = time.perf_counter()
+        proc = subprocess.run(command, cwd=workspace, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        wall = time.perf_counter() - start
+        cpu = children_cpu() - cpu_before
+
+        if proc.returncode != 0:
+            return {'error': proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f'exit {proc.returncode}'}
+
+        with open(metrics_prefix + '.json', 'r', encoding='utf-8') as f:
+            metrics = json.load(f)
+        total = metrics['stages'].get('total', {})
+        done = metrics['pages']
+        return {
+            'pages': done,
+            'failed': metrics['counters'].get('failed', 0),
+            'wall_seconds': round(wall, 3),
+            'pages_per_second': round(done / wall, 2) if wall else 0.0,
+            'p50_ms': round(total.get('p50', 0) * 1000, 1),
+            'p99_ms': round(total.get('p99', 0) * 1000, 1),
+            'cpu_ms_per_page': round(cpu / done * 1000, 2) if done and resource else None,
+            'mb': round(metrics['counters'].get('bytes', 0) / 1024 / 1024, 3),
+        }
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+
+def load_previous(config: dict) -> dict:
+    """Kết quả gần nhất của từng chế độ trong history.jsonl, chỉ xét các lần chạy cùng config"""
+    previous = {}
+    if not os.path.isfile(HISTORY_FILE):
+        return previous
+    with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get('config') != config:
+                continue
+            for name, result in entry.get('results', {}).items():
+                if 'error' not in result:
+                    previous[name] = (entry.get('commit'), result)
+    return previous
+
+
+def print_table(results: dict, previous: dict):
+    print(f"{'Chế độ':18s} {'trang':>6s} {'trang/s':>8s} {'p50':>8s} {'p99':>8s} {'CPU/trang':>10s}  so với lần trước")
+    for name, r in results.items():
+        if 'error' in r:
+            print(f"{name:18s} ❌ {r['error']}")
+            continue
+        cpu = f"{r['cpu_ms_per_page']:.2f}ms" if r['cpu_ms_per_page'] is not None else '-'
+        line = (f"{name:18s} {r['pages']:6d} {r['pages_per_second']:8.2f} "
+                f"{r['p50_ms']:6.0f}ms {r['p99_ms']:6.0f}ms {cpu:>10s}")
+        if name in previous:
+            commit, old = previous[name]
+            if old.get('pages_per_second'):
+                change = r['pages_per_second'] / old['pages_per_second'] - 1
+                line += f"  {change:+.0%} trang/s (commit {commit})"
+        print(line)
+
+
+def main():
+    _, options = parse_args(sys.argv[1:])
+    try:
+        config = config_from_options(options)
+        pages = int(options.get('pages', 10))
+        folders = int(options.get('folders', 2))
+        sites = int(options.get('sites', 0)) or None
+        rate = float(options.get('rate', 20))
+    except ValueError:
+        print("❌ Tham số không hợp lệ!")
+        print(__doc__)
+        sys.exit(1)
+
+    modes = list(MODES)
+    if options.get('modes'):
+        modes = [m.strip() for m in str(options['modes']).split(',') if m.strip()]
+        unknown = [m for m in modes if m not in MODES]
+        if unknown:
+            print(f"❌ Chế độ không có: {', '.join(unknown)}")
+            print(f"💡 Các chế độ: {', '.join(MODES)}")
+            sys.exit(1)
+
+    servers, sites_info = start_servers(config, sites=sites, port=0)
+    print("=" * 60)
+    print(f"🏁 BENCHMARK: {len(sites_info)} báo × {pages} bài × {folders} thư mục, "
+          f"{rate:g} request/s mỗi báo")
+    print(f"   latency {config.latency * 1000:.0f}±{config.jitter * 1000:.0f} ms, "
+          f"503 {config.error_rate:.0%}, 404 {config.not_found_rate:.0%}, drip {config.drip or 'tắt'} B/s")
+    print("=" * 60)
+
+    results = {}
+    try:
+        for name in modes:
+            print(f"▶ {name} ...", flush=True)
+            results[name] = run_mode(name, sites_info, folders, pages, rate)
+    finally:
+        stop_servers(servers)
+
+    commit = git_commit()
+    entry = {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {
+            'sites': len(sites_info), 'pages': pages, 'folders': folders, 'rate': rate,
+            'latency_ms': config.latency * 1000, 'jitter_ms': config.jitter * 1000,
+            'error_rate': config.error_rate, 'not_found_rate': config.not_found_rate,
+            'drip': config.drip,
+        },
+        'results': results,
+    }
+
+    print("=" * 60)
+    print_table(results, load_previous(entry['config']))
+    print("=" * 60)
+
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    path = os.path.join(BENCH_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(entry, f, ensure_ascii=False, indent=2)
+    with open(HISTORY_FILE, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    print(f"📄 Đã lưu: {path}")
+
+
+if __name__ == "__main__":
+    main()
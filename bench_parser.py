@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+So sánh 2 backend parse HTML trong extractors.py (BeautifulSoup vs lxml)
+
+1. Kiểm tra parity: cả 2 backend phải cho ra cùng title / nb_title / content
+   trên các trang HTML mẫu trong fixtures/html
+2. Benchmark: thời gian parse + trích xuất trung bình mỗi trang của từng backend
+
+Cách dùng:
+    python bench_parser.py                  # fixtures/html, lặp 50 lần
+    python bench_parser.py <thư_mục_html> [số_lần_lặp]
+    python bench_parser.py .cache/archive 3  # trang thật đã lưu trong kho HTML (tối đa 500 trang)
+"""
+
+import glob
+import os
+import sys
+import time
+
+from extractors import get_extractor
+from html_archive import HTMLArchive
+
+
+ARCHIVE_SAMPLE = 500
+
+
+def extract_all(extractor, raw: bytes) -> dict:
+    doc = extractor.parse(raw)
+    return {
+        'title':    extractor.title(doc),
+        'nb_title': extractor.nb_title(doc),
+        'content':  extractor.content_100_words(doc),
+    }
+
+
+def check_parity(pages: dict) -> int:
+    """In các trang mà 2 backend cho kết quả khác nhau, trả về số trang lệch"""
+    soup = get_extractor('soup')
+    fast = get_extractor('lxml')
+    mismatches = 0
+
+    for name, raw in pages.items():
+        expected = extract_all(soup, raw)
+        actual = extract_all(fast, raw)
+        diff = [key for key in expected if expected[key] != actual[key]]
+        if diff:
+            mismatches += 1
+            print(f"❌ {name}")
+            for key in diff:
+                print(f"   {key}:")
+                print(f"     soup: {expected[key][:100]!r}")
+                print(f"     lxml: {actual[key][:100]!r}")
+        else:
+            print(f"✅ {name}")
+
+    return mismatches
+
+
+def benchmark(pages: dict, rounds: int):
+    """Đo thời gian parse + trích xuất trung bình mỗi trang"""
+    results = {}
+    for name in ('soup', 'lxml'):
+        extractor = get_extractor(name)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for raw in pages.values():
+                extract_all(extractor, raw)
+        elapsed = time.perf_counter() - start
+        results[name] = elapsed / (rounds * len(pages)) * 1000
+
+    total_kb = sum(len(raw) for raw in pages.values()) / 1024
+    print(f"\n⏱  {len(pages)} trang ({total_kb:.1f} KB), {rounds} vòng")
+    for name, ms in results.items():
+        print(f"   {name:5s}: {ms:.3f} ms/trang")
+    if results['lxml'] > 0:
+        print(f"   → lxml nhanh hơn {results['soup'] / results['lxml']:.1f} lần")
+
+
+def main():
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join('fixtures', 'html')
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    pages = {}
+    if os.path.isfile(os.path.join(folder, 'index.sqlite3')):
+        # Kho HTML của caornn.py (html_archive.py)
+        pages = dict(HTMLArchive(folder).iter_pages(limit=ARCHIVE_SAMPLE))
+    else:
+        for path in sorted(glob.glob(os.path.join(folder, '*.html'))):
+            with open(path, 'rb') as f:
+                pages[os.path.basename(path)] = f.read()
+    if not pages:
+        print(f"❌ Không có trang HTML nào trong {folder}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("🔍 KIỂM TRA PARITY soup ↔ lxml")
+    print("=" * 60)
+    mismatches = check_parity(pages)
+
+    print("=" * 60)
+    print("🚀 BENCHMARK")
+    print("=" * 60)
+    benchmark(pages, rounds)
+
+    if mismatches:
+        print(f"\n❌ {mismatches}/{len(pages)} trang cho kết quả khác nhau")
+        sys.exit(1)
+    print(f"\n✅ Cả {len(pages)} trang khớp nhau")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,16 +7,62 @@ Script cào tiêu đề từ các trang báo
 
 import requests
 from bs4 import BeautifulSoup
-import json
+import asyncio
 import time
 import sys
 import os
-from typing import Dict
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from crawl_errors import FetchFailed, FetchFailure, FetchGuard, NegativeCache, NotHTMLError
+from crawl_journal import CrawlJournal
+from extractors import extract_nb_title
+from http_cache import HTMLCache
+from label_stats import update_from_journal
+from telemetry import CrawlMetrics, TimedHTTPAdapter, domain_of
+from url_index import DedupIndex
+
+
+# Chế độ chỉ đọc <head>: giới hạn số byte tải về cho mỗi trang
+HEAD_MAX_BYTES = 256 * 1024       # đủ cho <head> của hầu hết trang báo
+BODY_MAX_BYTES = 1024 * 1024      # khi phải đọc tiếp vào <body> để tìm <h1>
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+# Phần <head> đã stream được lưu vào cache HTML dưới khóa riêng, để caornn.py / app.py
+# (cần cả trang) không đọc nhầm bản bị cắt
+HEAD_CACHE_PREFIX = 'head:'
+
+
+class HostThrottle:
+    """
+    Giới hạn tốc độ theo từng tên miền (dùng trong chế độ async)
+    Mỗi host chỉ nhận tối đa 1 request mỗi `delay` giây, các host khác nhau chạy song song.
+    Gọi từ thread chạy request, ngay trước mỗi lần gửi (kể cả các lần thử lại của FetchGuard)
+    """
+    
+    def __init__(self, delay: float = 1.0):
+        self.delay = delay
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def wait(self, url: str):
+        """Chờ tới lượt của host chứa URL rồi giữ chỗ cho lượt kế tiếp"""
+        host = (urlparse(url).hostname or '').lower()
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = start + self.delay
+        
+        if start > now:
+            time.sleep(start - now)
+
 
 class TitleScraper:
     """Class để cào tiêu đề từ các trang web"""
     
-    def __init__(self):
+    def __init__(self, cache: HTMLCache = None, head_only: bool = True, guard: FetchGuard = None,
+                 metrics: CrawlMetrics = None):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -24,6 +70,34 @@ class TitleScraper:
         }
         self.session = requests.Session()
         self.session.headers.update(self.headers)
+        
+        # Đo thời gian dns/connect/tls/ttfb/download/parse và đếm byte theo tên miền
+        self.metrics = metrics if metrics is not None else CrawlMetrics('cao')
+        adapter = TimedHTTPAdapter(self.metrics)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # Cache HTML trên đĩa dùng chung với caornn.py / app.py (None = luôn tải mới)
+        self.cache = cache
+        
+        # True: chỉ tải tới </head> (đủ để lấy <title>/og:title), không tải cả bài
+        self.head_only = head_only
+        
+        # Thử lại lỗi tạm thời, circuit breaker theo host, negative cache cho lỗi vĩnh viễn
+        self.guard = guard if guard is not None else FetchGuard(negative_cache=NegativeCache())
+        
+        # Chỉ mục chống trùng link giữa các thư mục (url_index.DedupIndex), None = không lọc
+        self.dedup = None
+    
+    def http_get(self, url: str, timeout: int = 10) -> requests.Response:
+        """GET qua cache HTML nếu có, không thì gọi thẳng session"""
+        start = time.perf_counter()
+        if self.cache is not None:
+            response = self.cache.get(self.session, url, timeout)
+        else:
+            response = self.session.get(url, timeout=timeout)
+        self.metrics.record_response(url, response, time.perf_counter() - start)
+        return response
     
     def get_title(self, url: str, timeout: int = 10) -> str:
         """
@@ -36,46 +110,125 @@ class TitleScraper:
         Returns:
             Tiêu đề của trang hoặc thông báo lỗi
         """
+        return self.get_title_result(url, timeout)[0]
+    
+    def get_title_result(self, url: str, timeout: int = 10,
+                         throttle: HostThrottle = None) -> Tuple[str, Optional[FetchFailure]]:
+        """
+        Giống get_title nhưng trả thêm bản ghi lỗi
+        
+        Args:
+            throttle: giới hạn tốc độ theo host, chờ trước mỗi lần gửi request (None = không giới hạn)
+        
+        Returns:
+            (tiêu đề hoặc thông báo lỗi, FetchFailure hoặc None nếu thành công)
+        """
+        start = time.perf_counter()
         try:
-            response = self.session.get(url, timeout=timeout)
-            response.raise_for_status()
-            response.encoding = 'utf-8'
-            
+            title = self.guard.run(url, self._fetch_title, url, timeout, throttle)
+        except FetchFailed as e:
+            self.metrics.record_result(url, time.perf_counter() - start, e.failure)
+            return e.failure.title, e.failure
+        self.metrics.record_result(url, time.perf_counter() - start)
+        return title, None
+    
+    def _fetch_title(self, url: str, timeout: int = 10, throttle: HostThrottle = None) -> str:
+        """Fetch 1 lần (không bắt lỗi, FetchGuard lo phần thử lại)"""
+        if self.head_only:
+            return self._get_title_streaming(url, timeout, throttle)
+        
+        if throttle is not None:
+            throttle.wait(url)
+        response = self.http_get(url, timeout)
+        response.raise_for_status()
+        response.encoding = 'utf-8'
+        
+        with self.metrics.timer(url, 'parse'):
             soup = BeautifulSoup(response.text, 'html.parser')
+            return self.extract_title(soup)
+    
+    def _get_title_streaming(self, url: str, timeout: int = 10, throttle: HostThrottle = None,
+                             revalidate: bool = True) -> str:
+        """
+        Lấy tiêu đề bằng cách đọc response từng phần, dừng ngay khi gặp </head>.
+        Chỉ khi <head> không có tiêu đề mới đọc tiếp vào <body> (tìm <h1>), có giới hạn byte.
+        Có cache HTML: trang (cả trang hoặc phần <head> đã lưu) còn hạn thì dùng luôn, không gọi mạng;
+        phần <head> hết hạn thì hỏi lại server bằng ETag/Last-Modified, 304 thì dùng lại bản cũ.
+        Phần đã tải được lưu lại vào cache (khóa HEAD_CACHE_PREFIX + url).
+        revalidate=False: không gửi ETag/Last-Modified (luôn nhận về 200).
+        """
+        domain = domain_of(url)
+        head_key = HEAD_CACHE_PREFIX + url
+        headers = {}
+        if self.cache is not None:
+            # Miss được tính khi lưu phần vừa tải (cache.put)
+            body = (self.cache.get_fresh(url, count_miss=False)
+                    or self.cache.get_fresh(head_key, count_miss=False))
+            if body is not None:
+                self.metrics.count(domain, 'cache_hit')
+                return self._parse_title(url, body)
+            headers = self.cache.validators(head_key) if revalidate else {}
+        
+        if throttle is not None:
+            throttle.wait(url)
+        with self.session.get(url, timeout=timeout, stream=True, headers=headers) as response:
+            self.metrics.observe(domain, 'ttfb', response.elapsed.total_seconds())
+            self.metrics.count(domain, 'requests')
+            if response.status_code == 304 and headers:
+                body = self.cache.revalidated(head_key)
+                if body is None:
+                    # Bản cache bị xóa (evict) sau khi gửi request → tải lại không kèm validator
+                    return self._get_title_streaming(url, timeout, throttle, revalidate=False)
+                self.metrics.count(domain, 'cache_hit')
+                return self._parse_title(url, body)
+            response.raise_for_status()
             
-            # Tìm tiêu đề - thử nhiều cách
-            title = None
-            
-            # Cách 1: Thẻ <title>
-            if soup.title:
-                title = soup.title.get_text(strip=True)
-            
-            # Cách 2: Meta property og:title (thường chính xác hơn cho bài báo)
-            if not title:
-                og_title = soup.find('meta', property='og:title')
-                if og_title and og_title.get('content'):
-                    title = og_title.get('content').strip()
-            
-            # Cách 3: Meta name twitter:title
-            if not title:
-                twitter_title = soup.find('meta', attrs={'name': 'twitter:title'})
-                if twitter_title and twitter_title.get('content'):
-                    title = twitter_title.get('content').strip()
-            
-            # Cách 4: Thẻ h1 đầu tiên
-            if not title:
-                h1 = soup.find('h1')
-                if h1:
-                    title = h1.get_text(strip=True)
+            # Loại PDF, ảnh, video... trước khi tải body
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if content_type and content_type not in HTML_CONTENT_TYPES:
+                raise NotHTMLError(content_type)
             
-            return title if title else "Không tìm thấy tiêu đề"
+            chunks = response.iter_content(chunk_size=16 * 1024)
+            with self.metrics.timer(url, 'download'):
+                data = self._read_until(chunks, b'</head', HEAD_MAX_BYTES)
+            with self.metrics.timer(url, 'parse'):
+                title = self.extract_title(BeautifulSoup(data.decode('utf-8', 'replace'), 'html.parser'))
             
-        except requests.exceptions.Timeout:
-            return f"Lỗi: Timeout khi truy cập"
-        except requests.exceptions.RequestException as e:
-            return f"Lỗi: {type(e).__name__}"
-        except Exception as e:
-            return f"Lỗi không xác định: {type(e).__name__}"
+            if title == "Không tìm thấy tiêu đề":
+                with self.metrics.timer(url, 'download'):
+                    data += self._read_until(chunks, b'</h1', BODY_MAX_BYTES - len(data))
+                with self.metrics.timer(url, 'parse'):
+                    title = self.extract_title(BeautifulSoup(data.decode('utf-8', 'replace'), 'html.parser'))
+            self.metrics.count(domain, 'bytes', len(data))
+            if self.cache is not None and response.status_code == 200:
+                self.cache.put(head_key, data, response.headers)
+        
+        # Thoát khỏi with → đóng kết nối, phần còn lại của trang không được tải
+        return title
+    
+    def _parse_title(self, url: str, body: bytes) -> str:
+        with self.metrics.timer(url, 'parse'):
+            return self.extract_title(BeautifulSoup(body.decode('utf-8', 'replace'), 'html.parser'))
+    
+    @staticmethod
+    def _read_until(chunks, marker: bytes, max_bytes: int) -> bytes:
+        """Đọc các chunk tới khi gặp marker (không phân biệt hoa thường) hoặc đủ max_bytes"""
+        data = bytearray()
+        while len(data) < max_bytes:
+            chunk = next(chunks, None)
+            if not chunk:
+                break
+            # Chỉ tìm trong phần mới đọc (+ vài byte cuối của phần trước phòng marker bị cắt đôi)
+            start = max(0, len(data) - len(marker))
+            data += chunk
+            if marker in data[start:].lower():
+                break
+        return bytes(data)
+    
+    @staticmethod
+    def extract_title(soup: BeautifulSoup) -> str:
+        """Tìm tiêu đề trong trang đã parse (xem extractors.extract_nb_title)"""
+        return extract_nb_title(soup)
     
     def read_links(self, filename: str) -> list:
         """
@@ -120,18 +273,25 @@ class TitleScraper:
             print(f"❌ Lỗi khi đọc file: {e}")
             return []
     
-    def scrape_all(self, input_file: str, output_file: str, delay: float = 1.0):
+    def scrape_all(self, input_file: str, output_file: str, delay: float = 1.0,
+                   fresh: bool = False):
         """
         Cào tiêu đề từ tất cả links trong file và lưu kết quả
         Format: <url> <title> <tag>
         
+        Mỗi link cào xong được ghi ngay vào journal (data.journal.jsonl);
+        chạy lại sẽ bỏ qua các link đã có trong journal.
+        
         Args:
             input_file: File chứa danh sách links với format <url>: <tag>
             output_file: File JSON để lưu kết quả
             delay: Thời gian delay giữa các request (giây)
+            fresh: True thì xóa journal cũ và cào lại từ đầu
         """
         print(f"📂 Đọc links từ: {input_file}")
         links_with_tags = self.read_links(input_file)
+        if self.dedup is not None:
+            links_with_tags = self.dedup.filter(input_file, links_with_tags)
         
         if not links_with_tags:
             print("⚠️  Không có link nào để cào!")
@@ -140,19 +300,21 @@ class TitleScraper:
         print(f"📝 Tìm thấy {len(links_with_tags)} links")
         print("🚀 Bắt đầu cào tiêu đề...\n")
         
-        results = {}
+        journal, done_urls = self._open_journal(output_file, fresh)
         
         for i, (url, tag) in enumerate(links_with_tags, 1):
+            if url in done_urls:
+                print(f"[{i}/{len(links_with_tags)}] ⏭  Bỏ qua (đã có trong journal): {url}")
+                continue
+            
             print(f"[{i}/{len(links_with_tags)}] Đang cào: {url}")
             print(f"  📌 Tag: {tag}")
             
-            title = self.get_title(url)
+            title, failure = self.get_title_result(url)
             
             # Lưu theo format: url -> {"title": ..., "tag": ...}
-            results[url] = {
-                "title": title,
-                "tag": tag
-            }
+            journal.append(url, self._make_record(title, tag, failure))
+            done_urls.add(url)
             
             # Hiển thị tiêu đề với độ dài giới hạn
             display_title = title if len(title) <= 80 else title[:77] + "..."
@@ -162,17 +324,154 @@ class TitleScraper:
             if i < len(links_with_tags):
                 time.sleep(delay)
         
-        # Lưu kết quả ra file JSON
+        self._save_results(journal, links_with_tags, output_file)
+    
+    def scrape_all_async(self, input_file: str, output_file: str, delay: float = 1.0,
+                         concurrency: int = 8, fresh: bool = False):
+        """
+        Cào tiêu đề bằng asyncio: nhiều request chạy song song trên các tên miền khác nhau,
+        delay được áp dụng theo từng host thay vì toàn cục.
+        Kết quả giống hệt scrape_all: {url: {"title": ..., "tag": ...}} theo thứ tự trong file
+        
+        Args:
+            input_file: File chứa danh sách links với format <url>: <tag>
+            output_file: File JSON để lưu kết quả
+            delay: Khoảng cách tối thiểu giữa 2 request tới cùng một host (giây)
+            concurrency: Số request tối đa đang chạy cùng lúc
+            fresh: True thì xóa journal cũ và cào lại từ đầu
+        """
+        job = self._prepare_job(input_file, output_file, fresh)
+        if job is None:
+            return
+        links_with_tags, journal, pending = job
+        
+        print(f"🚀 Bắt đầu cào tiêu đề (async, {concurrency} luồng)...\n")
+        asyncio.run(self._crawl_async([(url, tag, journal, '') for url, tag in pending],
+                                      delay, concurrency))
+        
+        self._save_results(journal, links_with_tags, output_file)
+    
+    def scrape_folders_async(self, jobs: list, delay: float = 1.0,
+                             concurrency: int = 8, fresh: bool = False):
+        """
+        Cào nhiều thư mục cùng lúc: link của mọi thư mục vào chung 1 hàng đợi,
+        delay theo host tính chung cho tất cả, mỗi thư mục vẫn ghi journal + file JSON riêng.
+        Tổng thời gian phụ thuộc tên miền nhiều link nhất thay vì số thư mục.
+        
+        Args:
+            jobs: List các tuple (input_file, output_file), mỗi tuple ứng với 1 thư mục
+            delay: Khoảng cách tối thiểu giữa 2 request tới cùng một host (giây)
+            concurrency: Số request tối đa đang chạy cùng lúc
+            fresh: True thì xóa journal cũ và cào lại từ đầu
+        """
+        prepared = []
+        queue = []
+        for input_file, output_file in jobs:
+            job = self._prepare_job(input_file, output_file, fresh)
+            if job is None:
+                continue
+            links_with_tags, journal, pending = job
+            label = f"[{os.path.basename(os.path.dirname(output_file))}] "
+            queue.extend((url, tag, journal, label) for url, tag in pending)
+            prepared.append((journal, links_with_tags, output_file))
+        
+        print(f"🚀 Cào {len(queue)} link của {len(prepared)} thư mục "
+              f"(hàng đợi chung, async, {concurrency} luồng)...\n")
+        asyncio.run(self._crawl_async(queue, delay, concurrency))
+        
+        for journal, links_with_tags, output_file in prepared:
+            self._save_results(journal, links_with_tags, output_file)
+    
+    def _prepare_job(self, input_file: str, output_file: str, fresh: bool = False):
+        """
+        Đọc links + mở journal của 1 thư mục
+        
+        Returns:
+            (links_with_tags, journal, các link chưa cào) hoặc None nếu không có link nào
+        """
+        print(f"📂 Đọc links từ: {input_file}")
+        links_with_tags = self.read_links(input_file)
+        if self.dedup is not None:
+            links_with_tags = self.dedup.filter(input_file, links_with_tags)
+        
+        if not links_with_tags:
+            print("⚠️  Không có link nào để cào!")
+            return None
+        
+        print(f"📝 Tìm thấy {len(links_with_tags)} links")
+        
+        journal, done_urls = self._open_journal(output_file, fresh)
+        pending = []
+        for url, tag in links_with_tags:
+            if url not in done_urls:
+                pending.append((url, tag))
+                done_urls.add(url)
+        return links_with_tags, journal, pending
+    
+    async def _crawl_async(self, queue: list, delay: float, concurrency: int):
+        """
+        Chạy get_title cho tất cả link trong queue [(url, tag, journal, nhãn hiển thị)],
+        mỗi kết quả được ghi ngay vào journal tương ứng
+        """
+        loop = asyncio.get_running_loop()
+        throttle = HostThrottle(delay)
+        semaphore = asyncio.Semaphore(concurrency)
+        total = len(queue)
+        done = 0
+        
+        # requests là thư viện đồng bộ → chạy trong thread pool, session dùng chung
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            
+            async def crawl_one(url: str, tag: str, journal: CrawlJournal, label: str):
+                nonlocal done
+                # Chiếm slot trước; lượt của host được giữ trong thread ngay trước mỗi lần gửi
+                # (request đang xếp hàng chờ slot không giữ chỗ của host, lần thử lại cũng phải chờ lượt)
+                async with semaphore:
+                    title, failure = await loop.run_in_executor(
+                        executor, self.get_title_result, url, 10, throttle)
+                
+                journal.append(url, self._make_record(title, tag, failure))
+                done += 1
+                display_title = title if len(title) <= 80 else title[:77] + "..."
+                print(f"[{done}/{total}] {label}{url}")
+                print(f"  📌 Tag: {tag}")
+                print(f"  ✓ Tiêu đề: {display_title}\n")
+            
+            await asyncio.gather(*(crawl_one(*item) for item in queue))
+    
+    @staticmethod
+    def _make_record(title: str, tag: str, failure: FetchFailure = None) -> dict:
+        """Bản ghi data.json; link lỗi có thêm trường "error" mô tả loại lỗi"""
+        record = {
+            "title": title,
+            "tag": tag
+        }
+        if failure is not None:
+            record["error"] = failure.to_dict()
+        return record
+    
+    def _open_journal(self, output_file: str, fresh: bool = False):
+        """Mở journal của output_file, trả về (journal, tập URL đã cào)"""
+        journal = CrawlJournal(output_file)
+        if fresh:
+            journal.clear()
+        done_urls = journal.done_urls()
+        if done_urls:
+            print(f"📌 Resume: journal đã có {len(done_urls)} link, bỏ qua các link này\n")
+        return journal, done_urls
+    
+    def _save_results(self, journal: CrawlJournal, links_with_tags: list, output_file: str):
+        """Dựng file JSON kết quả từ journal, theo thứ tự trong file links"""
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
+            total = journal.export(output_file, [url for url, _ in links_with_tags])
+            update_from_journal(output_file, journal)
             print(f"\n✅ Đã lưu kết quả vào: {output_file}")
-            print(f"✅ Tổng cộng: {len(results)} tiêu đề")
+            print(f"✅ Tổng cộng: {total} tiêu đề")
         except Exception as e:
             print(f"❌ Lỗi khi lưu file: {e}")
 
 
-def process_folder(scraper, folder_name, delay=1.0):
+def process_folder(scraper, folder_name, delay=1.0, concurrency=0, fresh=False):
     """
     Xử lý một thư mục
     
@@ -180,6 +479,8 @@ def process_folder(scraper, folder_name, delay=1.0):
         scraper: TitleScraper instance
         folder_name: Tên thư mục cần cào
         delay: Thời gian delay giữa các request
+        concurrency: > 0 thì cào bằng chế độ async với số request song song này
+        fresh: True thì bỏ journal cũ, cào lại toàn bộ
         
     Returns:
         True nếu thành công, False nếu có lỗi
@@ -199,7 +500,10 @@ def process_folder(scraper, folder_name, delay=1.0):
     print("=" * 60)
     
     # Chạy scraper
-    scraper.scrape_all(input_file, output_file, delay)
+    if concurrency > 0:
+        scraper.scrape_all_async(input_file, output_file, delay, concurrency, fresh)
+    else:
+        scraper.scrape_all(input_file, output_file, delay, fresh)
     
     print("=" * 60)
     print(f"✨ HOÀN THÀNH THƯ MỤC: {folder_name.upper()}")
@@ -209,10 +513,56 @@ def process_folder(scraper, folder_name, delay=1.0):
     return True
 
 
+def process_folders(scraper, folder_names, delay=1.0, concurrency=8, fresh=False):
+    """
+    Cào nhiều thư mục trong 1 hàng đợi chung (xem TitleScraper.scrape_folders_async)
+    
+    Returns:
+        List các thư mục đã xử lý (có file links.txt)
+    """
+    jobs = []
+    processed = []
+    for folder_name in folder_names:
+        input_file = os.path.join(folder_name, 'links.txt')
+        if not os.path.isfile(input_file):
+            print(f"❌ Lỗi: Không tìm thấy file '{input_file}'")
+            continue
+        jobs.append((input_file, os.path.join(folder_name, 'data.json')))
+        processed.append(folder_name)
+    
+    if jobs:
+        print("=" * 60)
+        print(f"🎯 CÀO TIÊU ĐỀ - {len(jobs)} THƯ MỤC CÙNG LÚC")
+        print("=" * 60)
+        scraper.scrape_folders_async(jobs, delay, concurrency, fresh)
+    
+    return processed
+
+
+def parse_args(argv: list):
+    """
+    Tách các tùy chọn dạng --ten hoặc --ten=giatri ra khỏi danh sách thư mục
+    
+    Returns:
+        (danh sách thư mục, dict tùy chọn)
+    """
+    folders = []
+    options = {}
+    for arg in argv:
+        if arg.startswith('--'):
+            key, _, value = arg[2:].partition('=')
+            options[key] = value if value else True
+        else:
+            folders.append(arg)
+    return folders, options
+
+
 def main():
     """Hàm chính"""
+    folder_names, options = parse_args(sys.argv[1:])
+    
     # Kiểm tra tham số dòng lệnh
-    if len(sys.argv) < 2:
+    if not folder_names:
         print("❌ Lỗi: Thiếu tên thư mục!")
         print("\n📖 Cách sử dụng:")
         print("   python cao.py <tên_thư_mục_1> [tên_thư_mục_2] [tên_thư_mục_3] ...")
@@ -221,11 +571,21 @@ def main():
         print("   python cao.py thinh thien")
         print("   python cao.py thinh thien huy")
         print('   python cao.py "NĐT" "Q.Huy" "Thiện"')
+        print("\n⚙️  Tùy chọn:")
+        print("   --async            Cào song song nhiều tên miền, delay tính theo từng host")
+        print("   --concurrency=N    Số request song song khi dùng --async (mặc định 8)")
+        print("   --parallel         Cào mọi thư mục cùng lúc trong 1 hàng đợi chung (async),")
+        print("                      delay theo tên miền tính chung, mỗi thư mục vẫn có data.json riêng")
+        print("   --fresh            Bỏ journal cũ (data.journal.jsonl), cào lại từ đầu")
+        print("   --no-cache         Không dùng cache HTML trên đĩa (.cache/html)")
+        print("   --full-page        Tải cả trang thay vì chỉ đọc tới </head>")
+        print("   --retries=N        Số lần thử lại khi lỗi tạm thời (mặc định 3)")
+        print("   --delay=GIÂY       Khoảng cách giữa 2 request (tới cùng 1 host khi --async), mặc định 1")
+        print("   --no-dedup         Không lọc link trùng bài giữa các thư mục")
+        print("   --metrics=PREFIX   Ghi số liệu đo đạc ra PREFIX.json + PREFIX.prom")
+        print("                      (mặc định .cache/metrics/cao-<thời điểm>)")
         sys.exit(1)
     
-    # Lấy danh sách thư mục từ tham số
-    folder_names = sys.argv[1:]
-    
     # Kiểm tra từng thư mục có tồn tại không
     invalid_folders = []
     valid_folders = []
@@ -267,28 +627,62 @@ def main():
     print()
     
     # Khởi tạo scraper
-    scraper = TitleScraper()
+    try:
+        retries = max(0, int(options.get('retries', 3)))
+    except ValueError:
+        print("⚠️  --retries không hợp lệ, dùng mặc định 3")
+        retries = 3
+    scraper = TitleScraper(cache=None if options.get('no-cache') else HTMLCache(),
+                           head_only=not options.get('full-page'),
+                           guard=FetchGuard(retries=retries, negative_cache=NegativeCache()))
+    
+    # Chống trùng: mỗi bài (theo URL chuẩn) chỉ cào 1 lần dù nhiều thư mục cùng có link
+    if not options.get('no-dedup'):
+        scraper.dedup = DedupIndex.build(valid_folders, 'links.txt', 'data.json', scraper.read_links)
+        scraper.dedup.report()
+        print()
     
     # Cấu hình delay
     delay = 1.0  # Delay 1 giây giữa các request
+    if 'delay' in options:
+        try:
+            delay = max(0.0, float(options['delay']))
+        except ValueError:
+            print("⚠️  --delay không hợp lệ, dùng mặc định 1 giây")
+    
+    # Chế độ async: 0 = tuần tự như cũ
+    concurrency = 0
+    if options.get('async') or options.get('parallel'):
+        try:
+            concurrency = max(1, int(options.get('concurrency', 8)))
+        except ValueError:
+            print("⚠️  --concurrency không hợp lệ, dùng mặc định 8")
+            concurrency = 8
     
     # Thống kê
     success_count = 0
     failed_folders = []
     
-    # Xử lý từng thư mục
-    for i, folder_name in enumerate(valid_folders, 1):
-        print(f"\n📍 [{i}/{len(valid_folders)}] Đang xử lý thư mục: {folder_name}")
-        print()
-        
-        if process_folder(scraper, folder_name, delay):
-            success_count += 1
-        else:
-            failed_folders.append(folder_name)
-        
-        # Delay giữa các thư mục (trừ thư mục cuối)
-        if i < len(valid_folders):
-            time.sleep(1)
+    if options.get('parallel'):
+        # Cào tất cả thư mục trong 1 hàng đợi chung
+        processed = process_folders(scraper, valid_folders, delay, concurrency,
+                                    bool(options.get('fresh')))
+        success_count = len(processed)
+        failed_folders = [f for f in valid_folders if f not in processed]
+    else:
+        # Xử lý từng thư mục
+        for i, folder_name in enumerate(valid_folders, 1):
+            print(f"\n📍 [{i}/{len(valid_folders)}] Đang xử lý thư mục: {folder_name}")
+            print()
+            
+            if process_folder(scraper, folder_name, delay, concurrency, bool(options.get('fresh'))):
+                success_count += 1
+            else:
+                failed_folders.append(folder_name)
+            
+            # Delay giữa các thư mục (trừ thư mục cuối)
+            if i < len(valid_folders):
+                time.sleep(1)
     
     # Tổng kết
     print("\n" + "=" * 60)
@@ -301,6 +695,14 @@ def main():
         for folder in failed_folders:
             print(f"   - {folder}")
     
+    if scraper.cache is not None:
+        scraper.cache.print_stats()
+    scraper.guard.print_stats()
+    scraper.metrics.print_summary()
+    metrics_prefix = options.get('metrics')
+    saved = scraper.metrics.save(metrics_prefix if isinstance(metrics_prefix, str) else None)
+    print(f"   📄 Số liệu: {saved}.json, {saved}.prom")
+    
     print("=" * 60)
     print("🎉 HOÀN TẤT TẤT CẢ!")
     print("=" * 60)
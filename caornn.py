@@ -6,18 +6,111 @@ Lưu kết quả vào data_rnn.json để train RNN
 """
 
 import requests
-from bs4 import BeautifulSoup
-import json
 import time
 import sys
 import os
-from typing import Dict, Tuple
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from itertools import zip_longest
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from crawl_errors import FetchFailed, FetchFailure, FetchGuard, NegativeCache, classify
+from crawl_journal import CrawlJournal
+from extractors import SelectorCache, get_extractor
+from html_archive import HTMLArchive
+from http_cache import HTMLCache
+from label_stats import update_from_journal
+from parse_pool import ParsePool
+from telemetry import CrawlMetrics, TimedHTTPAdapter, domain_of
+from url_index import DedupIndex
+
+
+# Giới hạn request/giây riêng cho từng tên miền (ghi đè mức mặc định)
+# VD: {"vnexpress.net": 2.0, "dantri.com.vn": 1.0}
+DOMAIN_RATE_LIMITS: Dict[str, float] = {}
+
+
+# ──────────────────────────────────────────────────────────────────
+# GIỚI HẠN TỐC ĐỘ THEO TÊN MIỀN
+# ──────────────────────────────────────────────────────────────────
+class TokenBucket:
+    """
+    Token bucket an toàn đa luồng.
+    Mỗi giây nạp `rate` token, chứa tối đa `capacity` token; mỗi request lấy 1 token.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Chờ tới khi có token rồi lấy 1 token"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity,
+                                  self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """Giữ 1 TokenBucket cho mỗi host, mức giới hạn lấy từ DOMAIN_RATE_LIMITS hoặc mặc định"""
+
+    def __init__(self, default_rate: float = 1.0, limits: Dict[str, float] = None):
+        self.default_rate = default_rate
+        self.limits = dict(DOMAIN_RATE_LIMITS)
+        self.limits.update(limits or {})
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    def rate_for(self, host: str) -> float:
+        """Tìm giới hạn theo tên miền (khớp cả subdomain, bỏ www.)"""
+        host = host[4:] if host.startswith('www.') else host
+        for domain, rate in self.limits.items():
+            if host == domain or host.endswith('.' + domain):
+                return rate
+        return self.default_rate
+
+    def acquire(self, url: str):
+        host = (urlparse(url).hostname or '').lower()
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.rate_for(host))
+                self.buckets[host] = bucket
+        bucket.acquire()
+
+
+def interleave_by_host(queue: list) -> list:
+    """
+    Xếp lại hàng đợi theo vòng tròn giữa các host (a1, b1, c1, a2, b2...)
+    để worker không dồn hết vào 1 tên miền đang bị giới hạn tốc độ
+    """
+    by_host: Dict[str, list] = {}
+    for item in queue:
+        by_host.setdefault((urlparse(item[0]).hostname or '').lower(), []).append(item)
+    result = []
+    for round_items in zip_longest(*by_host.values()):
+        result.extend(item for item in round_items if item is not None)
+    return result
 
 
 class RNNScraper:
     """Cào tiêu đề + nội dung bài báo để train RNN"""
 
-    def __init__(self):
+    def __init__(self, pool_size: int = 10, cache: HTMLCache = None, parser: str = 'lxml',
+                 selector_cache: SelectorCache = None, guard: FetchGuard = None,
+                 metrics: CrawlMetrics = None, parse_pool: ParsePool = None,
+                 archive: HTMLArchive = None):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -26,105 +119,66 @@ class RNNScraper:
         self.session = requests.Session()
         self.session.headers.update(self.headers)
 
-    # ──────────────────────────────────────────────────────────────
-    # TIÊU ĐỀ
-    # ──────────────────────────────────────────────────────────────
-    def get_title(self, soup: BeautifulSoup) -> str:
-        """Lấy tiêu đề từ soup object"""
+        # Đo thời gian dns/connect/tls/ttfb/download/parse và đếm byte theo tên miền
+        self.metrics = metrics if metrics is not None else CrawlMetrics('caornn')
+
+        # Connection pool theo host: đủ chỗ cho mọi worker dùng chung session
+        adapter = TimedHTTPAdapter(self.metrics, pool_connections=32, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # Cache HTML trên đĩa dùng chung với cao.py / app.py (None = luôn tải mới)
+        self.cache = cache
 
-        # Ưu tiên og:title vì thường sạch hơn <title>
-        og = soup.find('meta', property='og:title')
-        if og and og.get('content'):
-            return og['content'].strip()
+        # Backend parse HTML: 'lxml' (nhanh, mặc định) hoặc 'soup' (BeautifulSoup)
+        self.extractor = get_extractor(parser)
 
-        if soup.title:
-            return soup.title.get_text(strip=True)
+        # Nhớ selector nội dung theo tên miền (None = luôn quét toàn bộ danh sách)
+        self.selector_cache = selector_cache
 
-        tw = soup.find('meta', attrs={'name': 'twitter:title'})
-        if tw and tw.get('content'):
-            return tw['content'].strip()
+        # Thử lại lỗi tạm thời, circuit breaker theo host, negative cache cho lỗi vĩnh viễn
+        self.guard = guard if guard is not None else FetchGuard(negative_cache=NegativeCache())
 
-        h1 = soup.find('h1')
-        if h1:
-            return h1.get_text(strip=True)
+        # Chỉ mục chống trùng link giữa các thư mục (url_index.DedupIndex), None = không lọc
+        self.dedup = None
+
+        # Pool process parse HTML (parse_pool.ParsePool): thread chỉ tải bytes, process con parse.
+        # None = parse ngay trong thread fetch như cũ
+        self.parse_pool = parse_pool
+
+        # Lưu HTML thô vào kho .warc.gz để trích xuất lại sau (reextract.py), None = không lưu
+        self.archive = archive
+
+    def http_get(self, url: str, timeout: int = 10) -> requests.Response:
+        """GET qua cache HTML nếu có, không thì gọi thẳng session"""
+        start = time.perf_counter()
+        if self.cache is not None:
+            resp = self.cache.get(self.session, url, timeout)
+        else:
+            resp = self.session.get(url, timeout=timeout)
+        self.metrics.record_response(url, resp, time.perf_counter() - start)
+        return resp
 
-        return "Không tìm thấy tiêu đề"
+    # ──────────────────────────────────────────────────────────────
+    # TIÊU ĐỀ
+    # ──────────────────────────────────────────────────────────────
+    def get_title(self, doc) -> str:
+        """Lấy tiêu đề từ trang đã parse (ưu tiên og:title vì thường sạch hơn <title>)"""
+        return self.extractor.title(doc)
 
     # ──────────────────────────────────────────────────────────────
     # NỘI DUNG — lấy 100 từ đầu của bài
     # ──────────────────────────────────────────────────────────────
-    def get_content_100_words(self, soup: BeautifulSoup) -> str:
+    def get_content_100_words(self, doc, url: str = None) -> str:
         """
         Trích xuất 100 từ đầu tiên của nội dung bài báo.
-        Thử nhiều selector phổ biến của các báo Việt Nam.
+        Thử nhiều selector phổ biến của các báo Việt Nam (extractors.CONTENT_SELECTORS).
+        Có url thì thử trước selector đã thắng ở các bài khác cùng tên miền.
         Trả về chuỗi văn bản, KHÔNG phải HTML.
         """
-
-        # Danh sách selector theo thứ tự ưu tiên
-        # Bao phủ: VnExpress, Tuổi Trẻ, Dân Trí, Thanh Niên, Znews, Tiền Phong...
-        content_selectors = [
-            # Semantic HTML5
-            'article',
-            # VnExpress
-            'div.fck_detail',
-            'div.article-body',
-            # Tuổi Trẻ
-            'div.detail-content',
-            'div#main-detail-body',
-            # Dân Trí
-            'div.singular-content',
-            'div.dt-news__content',
-            # Thanh Niên
-            'div.detail__cmain',
-            'div#contentBody',
-            # Znews / Zing
-            'div.the-article-body',
-            # Tiền Phong
-            'div.article__body',
-            # Saostar
-            'div.content-detail',
-            # Fallback chung
-            'div.content',
-            'div.post-content',
-            'div.entry-content',
-            'main',
-        ]
-
-        raw_text = ""
-
-        for selector in content_selectors:
-            tag, _, cls = selector.partition('.')
-            if cls:
-                el = soup.find(tag, class_=cls)
-            else:
-                # Có thể là id hoặc tag đơn
-                by_id = selector.partition('#')
-                if by_id[1]:  # có dấu #
-                    el = soup.find(by_id[0] or True, id=by_id[2])
-                else:
-                    el = soup.find(selector)
-
-            if el:
-                # Xoá các thẻ không liên quan trong nội dung
-                for noise in el.find_all(['script', 'style', 'figure',
-                                          'figcaption', 'aside', 'nav',
-                                          'form', 'button', 'iframe']):
-                    noise.decompose()
-
-                raw_text = el.get_text(separator=' ', strip=True)
-                if len(raw_text.split()) >= 20:   # cần ít nhất 20 từ mới tính
-                    break
-
-        # Fallback: lấy tất cả <p> trong body
-        if len(raw_text.split()) < 20:
-            paragraphs = soup.find_all('p')
-            raw_text = ' '.join(p.get_text(strip=True) for p in paragraphs)
-
-        # Lấy đúng 100 từ đầu
-        words = raw_text.split()
-        content_100 = ' '.join(words[:100])
-
-        return content_100 if content_100 else "Không tìm thấy nội dung"
+        if url and self.selector_cache is not None:
+            return self.selector_cache.extract(self.extractor, doc, url)
+        return self.extractor.content_100_words(doc)
 
     # ──────────────────────────────────────────────────────────────
     # FETCH 1 URL
@@ -133,27 +187,70 @@ class RNNScraper:
         """
         Fetch 1 URL, trả về (title, content_100_words)
         """
+        title, content, _, _ = self.fetch_result(url, timeout, with_nb_title=False)
+        return title, content
+
+    def fetch_both(self, url: str, timeout: int = 10) -> Tuple[str, str, str]:
+        """
+        Fetch + parse 1 URL đúng 1 lần cho cả 2 dataset,
+        trả về (title, content_100_words, nb_title) — nb_title lấy theo cách của cao.py
+        """
+        return self.fetch_result(url, timeout, with_nb_title=True)[:3]
+
+    def fetch_result(self, url: str, timeout: int = 10, with_nb_title: bool = False,
+                     limiter: HostRateLimiter = None) -> Tuple[str, str, str, Optional[FetchFailure]]:
+        """
+        Fetch qua FetchGuard (thử lại, circuit breaker, negative cache),
+        trả về (title, content, nb_title, FetchFailure hoặc None nếu thành công).
+        Lỗi thì title/nb_title là thông báo "Lỗi: ...", content rỗng.
+        limiter: lấy 1 token của host trước mỗi lần gửi request (kể cả lần thử lại).
+        """
+        start = time.perf_counter()
         try:
-            resp = self.session.get(url, timeout=timeout)
-            resp.raise_for_status()
-            resp.encoding = 'utf-8'
-            soup = BeautifulSoup(resp.text, 'html.parser')
-
-            title   = self.get_title(soup)
-            content = self.get_content_100_words(soup)
-            return title, content
-
-        except requests.exceptions.Timeout:
-            return "Lỗi: Timeout", ""
-        except requests.exceptions.RequestException as e:
-            return f"Lỗi: {type(e).__name__}", ""
-        except Exception as e:
-            return f"Lỗi không xác định: {type(e).__name__}", ""
+            title, content, nb_title = self.guard.run(url, self._fetch, url, timeout, with_nb_title, limiter)
+        except FetchFailed as e:
+            failure = e.failure
+            self.metrics.record_result(url, time.perf_counter() - start, failure)
+            return failure.title, "", failure.title if with_nb_title else "", failure
+        self.metrics.record_result(url, time.perf_counter() - start)
+        return title, content, nb_title, None
+
+    def _fetch(self, url: str, timeout: int, with_nb_title: bool,
+               limiter: HostRateLimiter = None) -> Tuple[str, str, str]:
+        """Fetch + parse 1 lần (không bắt lỗi, FetchGuard lo phần thử lại)"""
+        if limiter is not None:
+            limiter.acquire(url)
+        resp = self.http_get(url, timeout)
+        resp.raise_for_status()
+        self._archive(url, resp)
+        with self.metrics.timer(url, 'parse'):
+            # Parse thẳng từ bytes (utf-8), không cần tạo bản sao resp.text
+            doc = self.extractor.parse(resp.content)
+
+            # Lấy tiêu đề trước: get_content_100_words xoá bớt thẻ trong doc
+            title    = self.get_title(doc)
+            nb_title = self.extractor.nb_title(doc) if with_nb_title else ""
+            content  = self.get_content_100_words(doc, url)
+        return title, content, nb_title
+
+    def _download(self, url: str, timeout: int, limiter: HostRateLimiter = None) -> bytes:
+        """Chỉ tải bytes của trang (parse ở ParsePool), không bắt lỗi"""
+        if limiter is not None:
+            limiter.acquire(url)
+        resp = self.http_get(url, timeout)
+        resp.raise_for_status()
+        self._archive(url, resp)
+        return resp.content
+
+    def _archive(self, url: str, resp: requests.Response):
+        if self.archive is not None:
+            self.archive.append(url, resp.content, resp.headers.get('Content-Type'))
 
     # ──────────────────────────────────────────────────────────────
     # ĐỌC FILE LINKS
     # ──────────────────────────────────────────────────────────────
-    def read_links(self, filename: str) -> list:
+    @staticmethod
+    def read_links(filename: str) -> list:
         """Đọc links từ file format: <url>: <tag>"""
         try:
             with open(filename, 'r', encoding='utf-8') as f:
@@ -181,10 +278,22 @@ class RNNScraper:
     # ──────────────────────────────────────────────────────────────
     # CÀO TOÀN BỘ
     # ──────────────────────────────────────────────────────────────
-    def scrape_all(self, input_file: str, output_file: str, delay: float = 1.0):
+    def scrape_all(self, input_file: str, output_file: str, delay: float = 1.0,
+                   workers: int = 1, rate_limits: Dict[str, float] = None,
+                   fresh: bool = False, nb_output_file: str = None):
         """
         Cào tất cả links → lưu data_rnn.json
 
+        nb_output_file: nếu có, mỗi trang chỉ fetch + parse 1 lần và ghi luôn
+        bản ghi tiêu đề cho Naive Bayes ({"title", "tag"}, giống cao.py) vào file này
+
+        workers > 1: fetch song song bằng thread pool, mỗi host bị giới hạn
+        bởi token bucket (mặc định 1/delay request/giây, ghi đè qua rate_limits)
+        Có self.parse_pool thì luôn chạy kiểu song song, parse ở các process con.
+
+        Mỗi bài cào xong được ghi ngay vào journal (<output>.journal.jsonl),
+        chạy lại sẽ bỏ qua các URL đã có. fresh=True để xóa journal và cào lại.
+
         Format output:
         {
           "https://...": {
@@ -197,6 +306,8 @@ class RNNScraper:
         """
         print(f"📂 Đọc links từ: {input_file}")
         links = self.read_links(input_file)
+        if self.dedup is not None:
+            links = self.dedup.filter(input_file, links)
 
         if not links:
             print("⚠️  Không có link nào để cào!")
@@ -205,52 +316,247 @@ class RNNScraper:
         print(f"📝 Tìm thấy {len(links)} links")
         print("🚀 Bắt đầu cào tiêu đề + nội dung...\n")
 
-        # Load kết quả cũ nếu file đã tồn tại (để resume khi bị ngắt)
-        results = {}
-        if os.path.isfile(output_file):
-            try:
-                with open(output_file, 'r', encoding='utf-8') as f:
-                    results = json.load(f)
-                print(f"📌 Resume: đã có {len(results)} bài, bỏ qua các URL trùng\n")
-            except Exception:
-                results = {}
-
-        for i, (url, tag) in enumerate(links, 1):
-            # Bỏ qua nếu đã cào rồi
-            if url in results:
-                print(f"[{i}/{len(links)}] ⏭  Bỏ qua (đã có): {url[:60]}")
-                continue
-
-            print(f"[{i}/{len(links)}] 🔍 {url[:70]}")
-            print(f"  📌 Tag: {tag}")
+        journal, nb_journal, done_urls = self._open_journals(output_file, nb_output_file, fresh)
+
+        if workers > 1 or self.parse_pool is not None:
+            default_rate = 1.0 / delay if delay > 0 else 1000.0
+            limiter = HostRateLimiter(default_rate, rate_limits)
+            pending = self._pending_links(links, done_urls)
+            skipped = len(links) - len(pending)
+            if skipped:
+                print(f"⏭  Bỏ qua {skipped} URL đã có")
+            self._scrape_parallel([(url, tag, journal, nb_journal, '') for url, tag in pending],
+                                  workers, limiter)
+        else:
+            for i, (url, tag) in enumerate(links, 1):
+                # Bỏ qua nếu đã cào rồi
+                if url in done_urls:
+                    print(f"[{i}/{len(links)}] ⏭  Bỏ qua (đã có): {url[:60]}")
+                    continue
+
+                print(f"[{i}/{len(links)}] 🔍 {url[:70]}")
+                print(f"  📌 Tag: {tag}")
+
+                # Ghi ngay vào journal để tránh mất dữ liệu khi bị ngắt
+                title, content = self._record(url, tag, journal, nb_journal)
+                done_urls.add(url)
+
+                # Preview
+                print(f"  ✓ Tiêu đề : {title[:80]}")
+                word_count = len(content.split())
+                print(f"  ✓ Nội dung: {word_count} từ — {content[:60]}...")
+                print()
+
+                if i < len(links):
+                    time.sleep(delay)
+
+        self._save(journal, links, output_file)
+        if nb_journal is not None:
+            self._save(nb_journal, links, nb_output_file)
+
+    def scrape_folders(self, jobs: list, delay: float = 1.0, workers: int = 8,
+                       rate_limits: Dict[str, float] = None, fresh: bool = False):
+        """
+        Cào nhiều thư mục cùng lúc: link của mọi thư mục vào chung 1 hàng đợi,
+        giới hạn request/giây theo tên miền tính chung cho tất cả thư mục,
+        mỗi thư mục vẫn ghi journal + file output riêng.
 
-            title, content = self.fetch(url)
+        jobs: list các tuple (input_file, output_file, nb_output_file hoặc None)
+        """
+        prepared = []
+        queue = []
+        for input_file, output_file, nb_output_file in jobs:
+            print(f"📂 Đọc links từ: {input_file}")
+            links = self.read_links(input_file)
+            if self.dedup is not None:
+                links = self.dedup.filter(input_file, links)
+            if not links:
+                print("⚠️  Không có link nào để cào!")
+                continue
+            print(f"📝 Tìm thấy {len(links)} links")
+
+            journal, nb_journal, done_urls = self._open_journals(output_file, nb_output_file, fresh)
+            label = f"[{os.path.basename(os.path.dirname(output_file))}] "
+            queue.extend(
+                (url, tag, journal, nb_journal, label)
+                for url, tag in self._pending_links(links, done_urls)
+            )
+            prepared.append((journal, nb_journal, links, output_file, nb_output_file))
+
+        default_rate = 1.0 / delay if delay > 0 else 1000.0
+        limiter = HostRateLimiter(default_rate, rate_limits)
+        print(f"\n🚀 Hàng đợi chung: {len(queue)} URL của {len(prepared)} thư mục")
+        self._scrape_parallel(interleave_by_host(queue), workers, limiter)
+
+        for journal, nb_journal, links, output_file, nb_output_file in prepared:
+            self._save(journal, links, output_file)
+            if nb_journal is not None:
+                self._save(nb_journal, links, nb_output_file)
+
+    @staticmethod
+    def _pending_links(links: list, done_urls: set) -> list:
+        """
+        Các (url, tag) chưa cào, mỗi URL 1 lần (giữ tag của lần xuất hiện đầu, như chế độ tuần tự)
+        """
+        pending = {}
+        for url, tag in links:
+            if url not in done_urls:
+                pending.setdefault(url, tag)
+        return list(pending.items())
 
-            results[url] = {
-                "title":   title,
-                "content": content,
-                "tag":     tag
-            }
+    def _open_journals(self, output_file: str, nb_output_file: str = None, fresh: bool = False):
+        """
+        Mở journal của output (và output Naive Bayes nếu có)
 
-            # Preview
-            print(f"  ✓ Tiêu đề : {title[:80]}")
-            word_count = len(content.split())
-            print(f"  ✓ Nội dung: {word_count} từ — {content[:60]}...")
-            print()
+        Returns:
+            (journal, nb_journal hoặc None, tập URL đã cào xong)
+        """
+        # Resume từ journal; lần đầu thì chép kết quả cũ trong output_file (nếu có) vào journal
+        journal = CrawlJournal(output_file)
+        nb_journal = CrawlJournal(nb_output_file) if nb_output_file else None
+        for j, path in ((journal, output_file), (nb_journal, nb_output_file)):
+            if j is None:
+                continue
+            if fresh:
+                j.clear()
+            else:
+                j.seed_from(path)
+        done_urls = journal.done_urls()
+        if nb_journal is not None:
+            # Chế độ cào 1 lần: chỉ coi là xong khi đã có ở cả 2 file
+            done_urls &= nb_journal.done_urls()
+        if done_urls:
+            print(f"📌 Resume: đã có {len(done_urls)} bài, bỏ qua các URL trùng\n")
+        return journal, nb_journal, done_urls
+
+    def _record(self, url: str, tag: str, journal: CrawlJournal,
+                nb_journal: CrawlJournal = None, limiter: HostRateLimiter = None) -> Tuple[str, str]:
+        """Fetch 1 URL rồi ghi kết quả vào journal (và journal Naive Bayes nếu có)"""
+        title, content, nb_title, failure = self.fetch_result(url, with_nb_title=nb_journal is not None,
+                                                              limiter=limiter)
+        self._write_record(url, tag, journal, nb_journal, title, content, nb_title, failure)
+        return title, content
+
+    def _write_record(self, url: str, tag: str, journal: CrawlJournal, nb_journal: Optional[CrawlJournal],
+                      title: str, content: str, nb_title: str, failure: Optional[FetchFailure]):
+        """Ghi kết quả 1 URL vào journal (và journal Naive Bayes nếu có)"""
+        # Link lỗi có thêm trường "error" (loại lỗi, mã HTTP, số lần thử) để cào lại sau
+        error = {"error": failure.to_dict()} if failure is not None else {}
+
+        if nb_journal is not None:
+            nb_journal.append(url, {
+                "title": nb_title,
+                "tag":   tag,
+                **error
+            })
+
+        journal.append(url, {
+            "title":   title,
+            "content": content,
+            "tag":     tag,
+            **error
+        })
+
+    def _scrape_parallel(self, queue: list, workers: int, limiter: HostRateLimiter):
+        """
+        Fetch song song các link trong queue [(url, tag, journal, nb_journal, nhãn hiển thị)],
+        mỗi bài xong được ghi ngay vào journal tương ứng
+        """
+        if self.parse_pool is not None:
+            return self._scrape_pipelined(queue, workers, limiter)
 
-            # Lưu ngay sau mỗi bài để tránh mất dữ liệu khi bị ngắt
-            self._save(results, output_file)
+        print(f"⚙️  {workers} workers, {len(queue)} URL cần cào\n")
 
-            if i < len(links):
-                time.sleep(delay)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self._record, url, tag, journal, nb_journal, limiter): (url, label)
+                for url, tag, journal, nb_journal, label in queue
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                url, label = futures[future]
+                title, content = future.result()
 
-        print(f"\n✅ Hoàn tất! Đã lưu {len(results)} bài vào: {output_file}")
+                print(f"[{done}/{len(queue)}] 🔍 {label}{url[:70]}")
+                print(f"  ✓ Tiêu đề : {title[:80]}")
+                print(f"  ✓ Nội dung: {len(content.split())} từ\n")
 
-    def _save(self, data: dict, path: str):
-        """Lưu JSON (gọi nội bộ sau mỗi bài)"""
+    def _fetch_raw(self, url: str, limiter: HostRateLimiter = None):
+        """
+        Việc của thread fetch khi có ParsePool: giữ 1 chỗ trong hàng đợi parse rồi tải bytes.
+        Returns:
+            (bytes hoặc None, FetchFailure hoặc None, thời điểm bắt đầu)
+        """
+        self.parse_pool.reserve()
+        start = time.perf_counter()
+        try:
+            return self.guard.run(url, self._download, url, 10, limiter), None, start
+        except FetchFailed as e:
+            self.parse_pool.release()
+            return None, e.failure, start
+        except BaseException:
+            self.parse_pool.release()
+            raise
+
+    def _scrape_pipelined(self, queue: list, workers: int, limiter: HostRateLimiter):
+        """
+        Như _scrape_parallel nhưng tách 2 tầng: thread tải bytes, ParsePool parse ở process con.
+        Thread chính chuyển bytes sang pool, nhận kết quả parse và ghi journal theo thứ tự xong trước.
+        """
+        pool = self.parse_pool
+        print(f"⚙️  {workers} workers tải + {pool.processes} process parse, {len(queue)} URL cần cào\n")
+
+        done = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            jobs = {executor.submit(self._fetch_raw, item[0], limiter): ('fetch', item, None, None)
+                    for item in queue}
+            pending = set(jobs)
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage, (url, tag, journal, nb_journal, label), start, cached = jobs.pop(future)
+                    with_nb_title = nb_journal is not None
+
+                    if stage == 'fetch':
+                        raw, failure, start = future.result()
+                        if failure is None:
+                            cached = self.selector_cache.lookup(url) if self.selector_cache is not None else None
+                            parse_future = pool.submit(raw, with_nb_title, cached)
+                            jobs[parse_future] = ('parse', (url, tag, journal, nb_journal, label), start, cached)
+                            pending.add(parse_future)
+                            continue
+                        title, content, nb_title = failure.title, "", failure.title
+                    else:
+                        try:
+                            parsed = future.result()
+                        except Exception as e:
+                            failure = classify(url, e)
+                            title, content, nb_title = failure.title, "", failure.title
+                        else:
+                            failure = None
+                            title, content, nb_title = parsed['title'], parsed['content'], parsed['nb_title']
+                            self.metrics.observe(domain_of(url), 'parse', parsed['parse_seconds'])
+                            if self.selector_cache is not None:
+                                self.selector_cache.learn(url, cached, parsed['winner'],
+                                                          parsed['extract_seconds'])
+
+                    self.metrics.record_result(url, time.perf_counter() - start, failure)
+                    self._write_record(url, tag, journal, nb_journal, title, content,
+                                       nb_title if with_nb_title else "", failure)
+
+                    done += 1
+                    print(f"[{done}/{len(queue)}] 🔍 {label}{url[:70]}")
+                    print(f"  ✓ Tiêu đề : {title[:80]}")
+                    print(f"  ✓ Nội dung: {len(content.split())} từ\n")
+
+    def _save(self, journal: CrawlJournal, links: list, path: str):
+        """
+        Dựng file JSON từ journal.
+        Thứ tự luôn cố định: theo file links, các bài cũ không còn trong links ở cuối.
+        """
         try:
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            total = journal.export(path, [url for url, _ in links])
+            update_from_journal(path, journal)
+            print(f"\n✅ Hoàn tất! Đã lưu {total} bài vào: {path}")
         except Exception as e:
             print(f"  ⚠️  Lỗi lưu file: {e}")
 
@@ -258,9 +564,29 @@ class RNNScraper:
 # ──────────────────────────────────────────────────────────────────
 # XỬ LÝ THƯ MỤC
 # ──────────────────────────────────────────────────────────────────
-def process_folder(scraper: RNNScraper, folder: str, delay: float = 1.0) -> bool:
-    input_file  = os.path.join(folder, 'linksnew.txt')
-    output_file = os.path.join(folder, 'data_rnn_new.json')   # ← file mới
+# File links → (file Naive Bayes, file RNN) khi cào 1 lần cho cả 2 dataset
+BOTH_OUTPUTS = {
+    'links.txt':    ('data.json', 'data_rnn.json'),
+    'linksnew.txt': ('data_new.json', 'data_rnn_new.json'),
+}
+
+
+def output_names(links_name: str = 'linksnew.txt', both: bool = False) -> Tuple[str, Optional[str]]:
+    """Tên file output (RNN, Naive Bayes hoặc None) ứng với file links"""
+    if both:
+        nb_name, rnn_name = BOTH_OUTPUTS.get(links_name, ('data_new.json', 'data_rnn_new.json'))
+        return rnn_name, nb_name
+    return 'data_rnn_new.json', None   # ← file mới
+
+
+def process_folder(scraper: RNNScraper, folder: str, delay: float = 1.0,
+                   workers: int = 1, rate_limits: Dict[str, float] = None,
+                   fresh: bool = False, both: bool = False,
+                   links_name: str = 'linksnew.txt') -> bool:
+    rnn_name, nb_name = output_names(links_name, both)
+    input_file  = os.path.join(folder, links_name)
+    output_file = os.path.join(folder, rnn_name)
+    nb_output_file = os.path.join(folder, nb_name) if nb_name else None
 
     if not os.path.isfile(input_file):
         print(f"❌ Không tìm thấy '{input_file}'")
@@ -270,9 +596,12 @@ def process_folder(scraper: RNNScraper, folder: str, delay: float = 1.0) -> bool
     print(f"🎯 THƯ MỤC: {folder.upper()}")
     print(f"   Input : {input_file}")
     print(f"   Output: {output_file}")
+    if nb_output_file:
+        print(f"   Output: {nb_output_file} (Naive Bayes)")
     print("=" * 60)
 
-    scraper.scrape_all(input_file, output_file, delay)
+    scraper.scrape_all(input_file, output_file, delay, workers, rate_limits, fresh,
+                       nb_output_file)
 
     print("=" * 60)
     print(f"✨ XONG: {folder.upper()}")
@@ -280,20 +609,112 @@ def process_folder(scraper: RNNScraper, folder: str, delay: float = 1.0) -> bool
     return True
 
 
+def process_folders(scraper: RNNScraper, folders: list, delay: float = 1.0,
+                    workers: int = 8, rate_limits: Dict[str, float] = None,
+                    fresh: bool = False, both: bool = False,
+                    links_name: str = 'linksnew.txt') -> list:
+    """Cào nhiều thư mục trong 1 hàng đợi chung, trả về các thư mục đã xử lý"""
+    rnn_name, nb_name = output_names(links_name, both)
+    jobs = []
+    processed = []
+    for folder in folders:
+        input_file = os.path.join(folder, links_name)
+        if not os.path.isfile(input_file):
+            print(f"❌ Không tìm thấy '{input_file}'")
+            continue
+        jobs.append((input_file, os.path.join(folder, rnn_name),
+                     os.path.join(folder, nb_name) if nb_name else None))
+        processed.append(folder)
+
+    if jobs:
+        print("=" * 60)
+        print(f"🎯 {len(jobs)} THƯ MỤC CÙNG LÚC: {', '.join(processed)}")
+        print("=" * 60)
+        scraper.scrape_folders(jobs, delay, workers, rate_limits, fresh)
+    return processed
+
+
 # ──────────────────────────────────────────────────────────────────
 # MAIN
 # ──────────────────────────────────────────────────────────────────
+def parse_args(argv: list):
+    """Tách các tùy chọn --ten / --ten=giatri ra khỏi danh sách thư mục"""
+    folders = []
+    options = {}
+    for arg in argv:
+        if arg.startswith('--'):
+            key, _, value = arg[2:].partition('=')
+            options[key] = value if value else True
+        else:
+            folders.append(arg)
+    return folders, options
+
+
+def parse_rate_limits(spec: str) -> Tuple[float, Dict[str, float]]:
+    """
+    Đọc --rate: "2" hoặc "2,vnexpress.net:4,dantri.com.vn:1"
+    Trả về (mức mặc định hoặc None, dict giới hạn theo tên miền)
+    """
+    default_rate = None
+    limits = {}
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        domain, sep, value = part.rpartition(':')
+        if sep:
+            limits[domain.strip().lower()] = float(value)
+        else:
+            default_rate = float(value)
+    return default_rate, limits
+
+
 def main():
-    if len(sys.argv) < 2:
+    folder_names, options = parse_args(sys.argv[1:])
+
+    if not folder_names:
         print("❌ Thiếu tên thư mục!")
         print("\n📖 Cách dùng:")
         print("   python cao_rnn.py <thư_mục_1> [thư_mục_2] ...")
         print("\n💡 Ví dụ:")
         print("   python cao_rnn.py thinh")
         print("   python cao_rnn.py thinh thien huy")
+        print("   python cao_rnn.py --workers=8 --rate=1,vnexpress.net:3 thinh")
+        print("\n⚙️  Tùy chọn:")
+        print("   --workers=N   Số luồng fetch song song (mặc định 1 = tuần tự)")
+        print("   --rate=...    Request/giây mỗi host: mặc định[,domain:rate,...]")
+        print("   --parallel    Cào mọi thư mục cùng lúc trong 1 hàng đợi chung, giới hạn theo")
+        print("                 tên miền tính chung (mặc định 8 workers), mỗi thư mục vẫn có file riêng")
+        print("   --fresh       Bỏ journal + kết quả cũ, cào lại từ đầu")
+        print("   --no-cache    Không dùng cache HTML trên đĩa (.cache/html)")
+        print("   --both        Cào 1 lần, ghi cả file Naive Bayes lẫn RNN")
+        print("                 (links.txt → data.json + data_rnn.json,")
+        print("                  linksnew.txt → data_new.json + data_rnn_new.json)")
+        print("   --links=FILE  Tên file links trong thư mục (mặc định linksnew.txt)")
+        print("   --parser=...  Backend parse HTML: lxml (mặc định) hoặc soup")
+        print("   --no-selector-cache  Không nhớ selector nội dung theo tên miền")
+        print("   --retries=N   Số lần thử lại khi lỗi tạm thời (mặc định 3)")
+        print("   --no-dedup    Không lọc link trùng bài giữa các thư mục")
+        print("   --no-archive  Không lưu HTML thô vào .cache/archive (dùng cho reextract.py)")
+        print("   --parse-workers[=N]  Parse HTML ở N process riêng (mặc định = số lõi CPU),")
+        print("                 thread chỉ tải trang; luôn fetch song song")
+        print("   --metrics=PREFIX  Ghi số liệu đo đạc ra PREFIX.json + PREFIX.prom")
+        print("                 (mặc định .cache/metrics/caornn-<thời điểm>)")
         sys.exit(1)
 
-    folder_names = sys.argv[1:]
+    delay = 1.0
+    try:
+        # --parallel luôn fetch song song: mặc định 8 workers
+        workers = max(1, int(options.get('workers', 8 if options.get('parallel') else 1)))
+        retries = max(0, int(options.get('retries', 3)))
+        parse_workers = options.get('parse-workers')
+        parse_workers = (os.cpu_count() or 1) if parse_workers is True else int(parse_workers or 0)
+        default_rate, rate_limits = parse_rate_limits(str(options.get('rate', '')))
+    except ValueError:
+        print("❌ --workers / --rate / --retries / --parse-workers không hợp lệ!")
+        sys.exit(1)
+    if default_rate:
+        delay = 1.0 / default_rate
     valid   = [f for f in folder_names if os.path.isdir(f)]
     invalid = [f for f in folder_names if not os.path.isdir(f)]
 
@@ -308,18 +729,63 @@ def main():
     print(f"🚀 BẮT ĐẦU CÀO {len(valid)} THƯ MỤC")
     print("=" * 60)
 
-    scraper = RNNScraper()
+    cache = None if options.get('no-cache') else HTMLCache()
+    try:
+        selector_cache = None if options.get('no-selector-cache') else SelectorCache()
+        parser = str(options.get('parser', 'lxml'))
+        scraper = RNNScraper(pool_size=max(10, workers), cache=cache, parser=parser,
+                             selector_cache=selector_cache,
+                             guard=FetchGuard(retries=retries, negative_cache=NegativeCache()),
+                             archive=None if options.get('no-archive') else HTMLArchive())
+        if parse_workers > 0:
+            if workers == 1:
+                # Tầng tải vẫn cần nhiều thread để giữ các process parse luôn có việc
+                workers = 8
+            scraper.parse_pool = ParsePool(parse_workers, scraper.extractor.name)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    # Chống trùng: mỗi bài (theo URL chuẩn) chỉ cào 1 lần dù nhiều thư mục cùng có link
+    links_name = str(options.get('links', 'linksnew.txt'))
+    if not options.get('no-dedup'):
+        scraper.dedup = DedupIndex.build(valid, links_name,
+                                         output_names(links_name, bool(options.get('both')))[0],
+                                         scraper.read_links)
+        scraper.dedup.report()
+
     success = 0
 
-    for i, folder in enumerate(valid, 1):
-        print(f"\n📍 [{i}/{len(valid)}] {folder}")
-        if process_folder(scraper, folder):
-            success += 1
-        if i < len(valid):
-            time.sleep(1)
+    if options.get('parallel'):
+        success = len(process_folders(scraper, valid, delay, workers, rate_limits,
+                                      bool(options.get('fresh')), bool(options.get('both')),
+                                      links_name))
+    else:
+        for i, folder in enumerate(valid, 1):
+            print(f"\n📍 [{i}/{len(valid)}] {folder}")
+            if process_folder(scraper, folder, delay, workers, rate_limits,
+                              bool(options.get('fresh')), bool(options.get('both')), links_name):
+                success += 1
+            if i < len(valid):
+                time.sleep(1)
 
     print("\n" + "=" * 60)
     print(f"📊 TỔNG KẾT: {success}/{len(valid)} thư mục thành công")
+    if cache is not None:
+        cache.print_stats()
+    if scraper.archive is not None:
+        scraper.archive.print_stats()
+    if scraper.parse_pool is not None:
+        scraper.parse_pool.close()
+        scraper.parse_pool.print_stats()
+    scraper.guard.print_stats()
+    scraper.metrics.print_summary()
+    metrics_prefix = options.get('metrics')
+    saved = scraper.metrics.save(metrics_prefix if isinstance(metrics_prefix, str) else None)
+    print(f"   📄 Số liệu: {saved}.json, {saved}.prom")
+    if selector_cache is not None:
+        selector_cache.save()
+        selector_cache.print_stats()
     print("=" * 60)
     print("🎉 HOÀN TẤT!")
 
@@ -1,9 +1,15 @@
 #  file chuẩn hóa labels
 
-import json
+import os
 import re
+import sys
+import time
+import unicodedata
+from collections import Counter
 
-INPUT_FILE  = "data_rnn_new.json"
+from corpus_store import DataWriter, iter_data
+
+INPUT_FILE  = "data_rnn_new.json"   # hoặc .corpus (corpus_store.py)
 OUTPUT_FILE = "data_rnn_new.json"
 
 # ── Bảng chuẩn hóa từng nhãn đơn ──────────────────────────────────────────
@@ -28,72 +34,197 @@ LABEL_MAP = {
 VALID_LABELS = {"Giáo dục", "Giải trí", "Công nghệ", "Kinh doanh"}
 
 
-def normalize_label(raw: str) -> str:
-    """Chuẩn hóa một nhãn đơn: strip, lowercase rồi map về tên chuẩn."""
-    key = raw.strip().lower()
-    key = re.sub(r"\s+", " ", key)          # chuẩn hóa khoảng trắng thừa
-    return LABEL_MAP.get(key, raw.strip())   # nếu không có trong map, giữ nguyên
+def alias_key(text: str) -> str:
+    """Khóa tra alias: lowercase, gộp khoảng trắng, bỏ dấu ("Công  Nghệ" → "cong nghe")"""
+    text = unicodedata.normalize("NFD", " ".join(str(text).lower().split()))
+    text = "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+    return text.replace("đ", "d")
 
 
-def split_and_normalize(tag_str: str) -> list[str]:
+class TagNormalizer:
     """
-    Tách chuỗi tag bằng dấu phẩy (hoặc khoảng trắng liên tiếp giữa nhãn),
-    chuẩn hóa từng nhãn, loại bỏ trùng lặp, sắp xếp.
+    Bộ chuẩn hóa tag dùng chung cho mọi bản ghi:
+    - alias index dựng 1 lần: mọi khóa LABEL_MAP + nhãn chuẩn, tra theo alias_key
+      (nên "cong nghe", "CÔNG NGHỆ", "Công   nghệ" đều khớp)
+    - 1 regex biên dịch sẵn để tìm nhãn chuẩn nằm lẫn trong phần không khớp ("Công nghệ Giáo dục")
+    - nhớ kết quả theo chuỗi tag thô: dataset chỉ có vài chục chuỗi tag khác nhau
     """
-    # Một số tag viết liền không có dấu phẩy, VD: "Công nghệ Giáo dục"
-    # → thử tách bằng dấu phẩy trước
-    parts = [p.strip() for p in tag_str.split(",") if p.strip()]
-
-    # Nếu sau khi tách bằng dấu phẩy vẫn còn phần không khớp nhãn chuẩn
-    # → thử tách tiếp bằng khoảng trắng giữa các nhãn đã biết
-    final = []
-    for part in parts:
-        norm = normalize_label(part)
-        if norm in VALID_LABELS:
-            final.append(norm)
-        else:
-            # Thử tìm nhãn chuẩn nào khớp trong chuỗi này
-            found = []
-            for label in VALID_LABELS:
-                if label.lower() in part.lower():
-                    found.append(label)
+
+    def __init__(self, label_map: dict = LABEL_MAP, valid_labels: set = VALID_LABELS):
+        self.valid_labels = set(valid_labels)
+        self.aliases = {}
+        for label in self.valid_labels:
+            self.aliases[alias_key(label)] = label
+        for raw, label in label_map.items():
+            self.aliases[alias_key(raw)] = label
+        # Alias dài trước để "kinh doanh" không bị alias ngắn hơn nuốt mất
+        pattern = "|".join(re.escape(alias) for alias in sorted(self.aliases, key=len, reverse=True))
+        self.search = re.compile(pattern) if pattern else None
+
+        self.memo = {}
+        self.unknown = {}          # phần tag không nhận dạng được → số lần gặp
+        self.hits = 0
+        self.misses = 0
+
+    def normalize_label(self, raw: str) -> str:
+        """Chuẩn hóa một nhãn đơn; không có trong alias index thì giữ nguyên (đã strip)"""
+        return self.aliases.get(alias_key(raw), raw.strip())
+
+    def split(self, tag_str: str) -> list[str]:
+        """Tách + chuẩn hóa 1 chuỗi tag (không nhớ), trả về danh sách nhãn đã sắp xếp"""
+        final = set()
+        for part in (p.strip() for p in str(tag_str or "").split(",")):
+            if not part:
+                continue
+            norm = self.normalize_label(part)
+            if norm in self.valid_labels:
+                final.add(norm)
+                continue
+            # Thử tìm nhãn chuẩn nào nằm trong chuỗi này
+            found = {self.aliases[m.group(0)] for m in self.search.finditer(alias_key(part))} if self.search else set()
             if found:
-                final.extend(found)
+                final.update(found)
             else:
-                # Giữ nguyên và in cảnh báo để review thủ công
-                print(f"  ⚠️  Không nhận dạng được nhãn: '{part}' (từ '{tag_str}')")
-                final.append(norm)
+                if part not in self.unknown:
+                    # Chỉ cảnh báo lần đầu gặp, để review thủ công
+                    print(f"  ⚠️  Không nhận dạng được nhãn: '{part}' (từ '{tag_str}')")
+                self.unknown[part] = self.unknown.get(part, 0) + 1
+                final.add(norm)
+        # Loại trùng, sắp xếp để nhất quán
+        return sorted(final)
+
+    def labels(self, tag_str: str) -> list[str]:
+        """Như split() nhưng nhớ kết quả theo chuỗi tag thô"""
+        result = self.memo.get(tag_str)
+        if result is None:
+            self.misses += 1
+            result = self.memo[tag_str] = self.split(tag_str)
+        else:
+            self.hits += 1
+            # Phần không nhận dạng được vẫn đếm đủ số lần gặp
+            for part in result:
+                if part in self.unknown:
+                    self.unknown[part] += 1
+        return list(result)
 
-    # Loại trùng, sắp xếp để nhất quán
-    return sorted(set(final))
+    def normalize(self, tag_str: str) -> str:
+        return ", ".join(self.labels(tag_str))
 
 
-def main():
-    with open(INPUT_FILE, encoding="utf-8") as f:
-        data = json.load(f)
+# Bộ chuẩn hóa mặc định cho các hàm cũ (url_index.py dùng split_and_normalize)
+DEFAULT_NORMALIZER = TagNormalizer()
 
-    changed = 0
-    for url, info in data.items():
-        raw_tag = info.get("tag", "")
-        labels  = split_and_normalize(raw_tag)
-        new_tag = ", ".join(labels)
 
-        if new_tag != raw_tag:
-            print(f"[SỬA] {raw_tag!r:40s} → {new_tag!r}")
-            info["tag"] = new_tag
-            changed += 1
+def normalize_label(raw: str) -> str:
+    """Chuẩn hóa một nhãn đơn: strip, lowercase rồi map về tên chuẩn."""
+    return DEFAULT_NORMALIZER.normalize_label(raw)
 
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
 
-    print(f"\n✅ Đã chuẩn hóa {changed}/{len(data)} bản ghi → {OUTPUT_FILE}")
+def split_and_normalize(tag_str: str) -> list[str]:
+    """
+    Tách chuỗi tag bằng dấu phẩy, chuẩn hóa từng nhãn (phần không khớp thì tìm nhãn chuẩn
+    nằm trong nó, VD: "Công nghệ Giáo dục"), loại bỏ trùng lặp, sắp xếp.
+    """
+    return DEFAULT_NORMALIZER.labels(tag_str)
 
-    # ── Thống kê nhãn sau khi làm sạch ──────────────────────────────────
-    from collections import Counter
+
+def normalize_file(input_file: str, output_file: str, normalizer: TagNormalizer,
+                   counter: Counter, seen: set = None, writer: DataWriter = None,
+                   stats=None, folder: str = None) -> tuple[int, int]:
+    """
+    Chuẩn hóa tag của 1 file, đọc và ghi từng bản ghi (không load cả file).
+    writer != None: ghi nối vào writer chung (gộp nhiều input), URL đã có trong seen thì bỏ qua.
+    stats (label_stats.LabelStats của output): cập nhật thống kê nhãn từng bản ghi, folder là
+    thư mục ghi nhận cho bản ghi (None: giữ như cũ).
+    Trả về (số bản ghi, số bản ghi bị sửa).
+    """
+    own_writer = writer is None
+    if own_writer:
+        writer = DataWriter(output_file)
+    total = changed = 0
+    reported = set()
+    try:
+        for url, info in iter_data(input_file):
+            if seen is not None:
+                if url in seen:
+                    continue
+                seen.add(url)
+            raw_tag = info.get("tag", "")
+            labels = normalizer.labels(raw_tag)
+            new_tag = ", ".join(labels)
+            if new_tag != raw_tag:
+                if raw_tag not in reported:
+                    reported.add(raw_tag)
+                    print(f"[SỬA] {raw_tag!r:40s} → {new_tag!r}")
+                info["tag"] = new_tag
+                changed += 1
+            counter.update(labels)
+            if stats is not None:
+                stats.put(url, new_tag, folder)
+            writer.write(url, info)
+            total += 1
+    except BaseException:
+        if own_writer:
+            writer.abort()
+        raise
+    if own_writer:
+        writer.close()
+    return total, changed
+
+
+def main():
+    # python chuanhoatag.py [input ...] [--output=FILE]
+    #   không có --output: sửa tại chỗ từng input (mặc định INPUT_FILE)
+    #   có --output: gộp mọi input vào 1 file (URL trùng giữ bản gặp đầu tiên)
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    options = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--output="))
+    inputs = args or [INPUT_FILE]
+    output = options.get("output")
+
+    missing = [f for f in inputs if not os.path.isfile(f)]
+    if missing:
+        print(f"❌ Không tìm thấy: {', '.join(missing)}")
+        sys.exit(1)
+
+    normalizer = TagNormalizer()
     counter: Counter = Counter()
-    for info in data.values():
-        for lbl in info["tag"].split(", "):
-            counter[lbl.strip()] += 1
+    start = time.perf_counter()
+    total = changed = 0
+
+    # Thống kê nhãn (label_stats.py) của file output được cập nhật ngay trong lượt ghi
+    from label_stats import LabelStats   # label_stats import chuanhoatag → import muộn
+    if output:
+        seen = set()
+        with LabelStats(output) as stats:
+            with stats.batch(), DataWriter(output) as writer:
+                for input_file in inputs:
+                    n, c = normalize_file(input_file, output, normalizer, counter, seen, writer,
+                                          stats, os.path.basename(os.path.dirname(input_file)))
+                    print(f"📄 {input_file}: {c}/{n} bản ghi được sửa")
+                    total += n
+                    changed += c
+                stats.prune(seen)
+            stats.mark_synced()
+        targets = [output]
+    else:
+        for input_file in inputs:
+            seen = set()
+            with LabelStats(input_file) as stats:
+                with stats.batch():
+                    n, c = normalize_file(input_file, input_file, normalizer, counter, seen, stats=stats)
+                    stats.prune(seen)
+                stats.mark_synced()
+            if len(inputs) > 1:
+                print(f"📄 {input_file}: {c}/{n} bản ghi được sửa")
+            total += n
+            changed += c
+        targets = inputs
+
+    print(f"\n✅ Đã chuẩn hóa {changed}/{total} bản ghi → {', '.join(targets)} "
+          f"({time.perf_counter() - start:.2f}s, {len(normalizer.memo)} chuỗi tag khác nhau, "
+          f"{normalizer.hits} lần dùng lại kết quả)")
+
+    # ── Thống kê nhãn sau khi làm sạch (đếm ngay trong lượt chuẩn hóa) ──
     print("\n📊 Phân phối nhãn sau khi chuẩn hóa:")
     for lbl, cnt in sorted(counter.items()):
         mark = "✅" if lbl in VALID_LABELS else "❌"
@@ -101,4 +232,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
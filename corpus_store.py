@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Kho dữ liệu dạng nhị phân (SQLite) thay cho data.json / data_rnn.json in đẹp
+
+- 1 file .corpus (SQLite): bảng records(url, title, content, tag, mask, extra)
+- URL có index → tra 1 bài theo URL không cần đọc cả file
+- mask: bitmask các nhãn của bài (bit i ↔ nhãn trong bảng labels), đếm / lọc nhãn bằng SQL
+- Đọc cả kho để train = 1 câu SELECT, SQLite đọc qua mmap thay vì parse JSON in đẹp
+- Thứ tự bản ghi giữ theo thứ tự thêm vào (như dict trong data.json)
+
+Script cũ đọc / ghi qua load_data(path) / save_data(path, data): đuôi .corpus thì dùng
+kho, còn lại là JSON như trước.
+
+Cách dùng:
+    python corpus_store.py import data_rnn.json data_rnn.corpus
+    python corpus_store.py export data_rnn.corpus data_rnn.json
+    python corpus_store.py stats  data_rnn.corpus
+    python corpus_store.py get    data_rnn.corpus https://vnexpress.net/...
+"""
+
+import json
+import os
+import sqlite3
+import sys
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+CORPUS_EXT = '.corpus'
+MMAP_BYTES = 256 * 1024 * 1024
+MAX_LABELS = 63          # INTEGER của SQLite là 64 bit có dấu
+
+# Trường có cột riêng; các trường khác (VD "error") nằm trong cột extra (JSON)
+COLUMNS = ('title', 'content', 'tag')
+
+
+def split_tags(tag_str: str) -> List[str]:
+    """"Giải trí, Công nghệ" → ["Giải trí", "Công nghệ"] (không chuẩn hóa, giữ nguyên chữ)"""
+    return [part.strip() for part in str(tag_str or '').split(',') if part.strip()]
+
+
+class CorpusStore:
+    """Kho bản ghi URL → {title, content, tag, ...} trên SQLite"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute(f'PRAGMA mmap_size = {MMAP_BYTES}')
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS records (
+                id      INTEGER PRIMARY KEY,
+                url     TEXT NOT NULL UNIQUE,
+                title   TEXT,
+                content TEXT,
+                tag     TEXT,
+                mask    INTEGER NOT NULL DEFAULT 0,
+                extra   TEXT
+            )
+        ''')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS labels (
+                bit  INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+        ''')
+        self.db.commit()
+        self.label_bits: Dict[str, int] = dict(
+            (name, bit) for bit, name in self.db.execute('SELECT bit, name FROM labels'))
+        self._in_batch = False
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @contextmanager
+    def batch(self):
+        """Gom nhiều put/delete vào 1 transaction (nhanh hơn commit từng bản ghi)"""
+        self._in_batch = True
+        try:
+            with self.db:
+                yield self
+        finally:
+            self._in_batch = False
+
+    def _commit(self):
+        if not self._in_batch:
+            self.db.commit()
+
+    # ──────────────────────────────────────────────────────────────
+    # NHÃN ↔ BITMASK
+    # ──────────────────────────────────────────────────────────────
+    def _bit(self, name: str) -> Optional[int]:
+        bit = self.label_bits.get(name)
+        if bit is None and len(self.label_bits) < MAX_LABELS:
+            bit = len(self.label_bits)
+            self.db.execute('INSERT INTO labels VALUES (?, ?)', (bit, name))
+            self.label_bits[name] = bit
+        return bit   # quá MAX_LABELS nhãn: nhãn mới không có bit, vẫn còn trong cột tag
+
+    def encode_tags(self, tag_str: str) -> int:
+        mask = 0
+        for name in split_tags(tag_str):
+            bit = self._bit(name)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def decode_mask(self, mask: int) -> List[str]:
+        return [name for name, bit in self.label_bits.items() if mask >> bit & 1]
+
+    def label_names(self) -> List[str]:
+        """Tên nhãn theo thứ tự bit"""
+        return sorted(self.label_bits, key=self.label_bits.get)
+
+    def label_counts(self) -> Dict[str, int]:
+        """Số bài có từng nhãn (đếm bằng SQL trên cột mask)"""
+        return {
+            name: self.db.execute('SELECT COUNT(*) FROM records WHERE mask & ?',
+                                  (1 << bit,)).fetchone()[0]
+            for name, bit in sorted(self.label_bits.items(), key=lambda item: item[1])
+        }
+
+    # ──────────────────────────────────────────────────────────────
+    # ĐỌC / GHI BẢN GHI
+    # ──────────────────────────────────────────────────────────────
+    @staticmethod
+    def _to_record(title, content, tag, extra) -> dict:
+        record = {'title': title}
+        if content is not None:
+            record['content'] = content
+        record['tag'] = tag
+        if extra:
+            record.update(json.loads(extra))
+        return record
+
+    def put(self, url: str, record: dict):
+        """Thêm / cập nhật 1 bản ghi (URL đã có thì giữ nguyên vị trí)"""
+        extra = {k: v for k, v in record.items() if k not in COLUMNS}
+        tag = record.get('tag', '')
+        self.db.execute('''
+            INSERT INTO records (url, title, content, tag, mask, extra) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET title = excluded.title, content = excluded.content,
+                tag = excluded.tag, mask = excluded.mask, extra = excluded.extra
+        ''', (url, record.get('title'), record.get('content'), tag, self.encode_tags(tag),
+              json.dumps(extra, ensure_ascii=False) if extra else None))
+        self._commit()
+
+    def put_many(self, items: Iterable[Tuple[str, dict]]) -> int:
+        count = 0
+        with self.batch():
+            for url, record in items:
+                self.put(url, record)
+                count += 1
+        return count
+
+    def get(self, url: str) -> Optional[dict]:
+        row = self.db.execute('SELECT title, content, tag, extra FROM records WHERE url = ?',
+                              (url,)).fetchone()
+        return self._to_record(*row) if row else None
+
+    def delete(self, url: str):
+        self.db.execute('DELETE FROM records WHERE url = ?', (url,))
+        self._commit()
+
+    def clear(self):
+        self.db.execute('DELETE FROM records')
+        self.db.execute('DELETE FROM labels')
+        self.label_bits.clear()
+        self._commit()
+
+    def __contains__(self, url: str) -> bool:
+        return self.db.execute('SELECT 1 FROM records WHERE url = ?', (url,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self.db.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+
+    def urls(self) -> List[str]:
+        return [url for url, in self.db.execute('SELECT url FROM records ORDER BY id')]
+
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        """Duyệt (url, record) theo thứ tự thêm vào"""
+        cursor = self.db.execute('SELECT url, title, content, tag, extra FROM records ORDER BY id')
+        for url, title, content, tag, extra in cursor:
+            yield url, self._to_record(title, content, tag, extra)
+
+    def to_dict(self) -> Dict[str, dict]:
+        return dict(self.items())
+
+    def columns(self, mask: int = 0) -> Tuple[List[str], List[str], List[str], List[str]]:
+        """
+        Đọc nhanh để train: (urls, titles, contents, tags) trong 1 câu SELECT.
+        mask != 0: chỉ lấy các bài có ít nhất 1 nhãn trong mask.
+        """
+        sql = 'SELECT url, title, content, tag FROM records'
+        params = ()
+        if mask:
+            sql += ' WHERE mask & ?'
+            params = (mask,)
+        rows = self.db.execute(sql + ' ORDER BY id', params).fetchall()
+        if not rows:
+            return [], [], [], []
+        urls, titles, contents, tags = (list(col) for col in zip(*rows))
+        return urls, titles, [c or '' for c in contents], tags
+
+    # ──────────────────────────────────────────────────────────────
+    # NHẬP / XUẤT JSON CŨ
+    # ──────────────────────────────────────────────────────────────
+    def import_json(self, json_path: str, replace: bool = True) -> int:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError(f"{json_path} không phải JSON object")
+        with self.batch():
+            if replace:
+                self.clear()
+            for url, record in data.items():
+                self.put(url, record)
+        return len(data)
+
+    def export_json(self, json_path: str) -> int:
+        """Ghi ra JSON giống json.dump(..., ensure_ascii=False, indent=2), từng bản ghi một"""
+        with DataWriter(json_path) as out:
+            for url, record in self.items():
+                out.write(url, record)
+        return out.count
+
+
+# ──────────────────────────────────────────────────────────────────
+# API CHO CÁC SCRIPT CŨ
+# ──────────────────────────────────────────────────────────────────
+def is_corpus(path) -> bool:
+    return str(path).endswith(CORPUS_EXT)
+
+
+def load_data(path) -> Dict[str, dict]:
+    """Đọc toàn bộ dữ liệu URL → record từ .corpus hoặc .json"""
+    if is_corpus(path):
+        with CorpusStore(str(path)) as store:
+            return store.to_dict()
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def iter_json_object(path, chunk_size: int = 1024 * 1024) -> Iterator[Tuple[str, dict]]:
+    """
+    Duyệt (url, record) của file JSON object {url: record, ...} mà không đọc hết vào RAM:
+    đọc từng khúc chunk_size ký tự, decode từng cặp key / value bằng JSONDecoder.raw_decode
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buf = ''
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip(chars: str = ' \t\r\n') -> str:
+            """Bỏ khoảng trắng (và các ký tự trong chars), trả về ký tự kế tiếp ('' nếu hết file)"""
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in chars:
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    return buf[pos] if pos < len(buf) else ''
+
+        def decode():
+            nonlocal pos
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                    # Giá trị nằm sát cuối buffer có thể bị cắt ngang (VD số) → đọc thêm cho chắc
+                    if end < len(buf) or eof:
+                        pos = end
+                        return value
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                if not fill():
+                    continue
+
+        if skip() != '{':
+            raise ValueError(f"{path} không phải JSON object")
+        pos += 1
+        while True:
+            char = skip(' \t\r\n,')
+            if char == '}':
+                return
+            if char != '"':
+                raise ValueError(f"{path}: JSON hỏng ở ký tự {char!r}")
+            url = decode()
+            if skip() != ':':
+                raise ValueError(f"{path}: thiếu ':' sau key {url!r}")
+            pos += 1
+            skip()
+            yield url, decode()
+
+
+def iter_data(path) -> Iterator[Tuple[str, dict]]:
+    """Duyệt (url, record) từ .corpus hoặc .json, từng bản ghi một (không load cả file)"""
+    if is_corpus(path):
+        with CorpusStore(str(path)) as store:
+            yield from store.items()
+        return
+    yield from iter_json_object(path)
+
+
+class DataWriter:
+    """
+    Ghi từng bản ghi ra .corpus hoặc .json (cùng định dạng json.dump indent=2), vào file tạm
+    rồi mới thay file đích khi close() → output có thể trùng với file đang đọc bằng iter_data
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        root, ext = os.path.splitext(self.path)
+        self.tmp = f"{root}.tmp{ext}"
+        self.count = 0
+        if is_corpus(self.path):
+            if os.path.exists(self.tmp):
+                os.remove(self.tmp)
+            self.store = CorpusStore(self.tmp)
+            self.batch = self.store.batch()      # cả file là 1 transaction
+            self.batch.__enter__()
+            self.f = None
+        else:
+            self.store = None
+            self.f = open(self.tmp, 'w', encoding='utf-8')
+            self.f.write('{')
+
+    def write(self, url: str, record: dict):
+        if self.store is not None:
+            self.store.put(url, record)
+        else:
+            body = json.dumps(record, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+            self.f.write(',' if self.count else '')
+            self.f.write(f'\n  {json.dumps(url, ensure_ascii=False)}: {body}')
+        self.count += 1
+
+    def close(self):
+        if self.store is not None:
+            self.batch.__exit__(None, None, None)
+            self.store.close()
+        else:
+            self.f.write('\n}' if self.count else '}')
+            self.f.close()
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        """Bỏ file tạm, giữ nguyên file đích"""
+        if self.store is not None:
+            self.batch.__exit__(RuntimeError, RuntimeError('abort'), None)
+            self.store.close()
+        else:
+            self.f.close()
+        for path in (self.tmp, self.tmp + '-wal', self.tmp + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def save_data(path, data: Dict[str, dict]):
+    """Ghi đè toàn bộ dữ liệu ra .corpus hoặc .json (indent=2 như trước)"""
+    if is_corpus(path):
+        with CorpusStore(str(path)) as store:
+            with store.batch():
+                store.clear()
+                for url, record in data.items():
+                    store.put(url, record)
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ('import', 'export', 'stats', 'get'):
+        print(__doc__)
+        sys.exit(1)
+
+    command = sys.argv[1]
+    if command == 'import' and len(sys.argv) >= 4:
+        with CorpusStore(sys.argv[3]) as store:
+            count = store.import_json(sys.argv[2])
+            print(f"✅ Đã nhập {count} bản ghi: {sys.argv[2]} → {sys.argv[3]} "
+                  f"({len(store.label_bits)} nhãn)")
+    elif command == 'export' and len(sys.argv) >= 4:
+        with CorpusStore(sys.argv[2]) as store:
+            count = store.export_json(sys.argv[3])
+            print(f"✅ Đã xuất {count} bản ghi: {sys.argv[2]} → {sys.argv[3]}")
+    elif command == 'stats':
+        with CorpusStore(sys.argv[2]) as store:
+            print(f"📦 {sys.argv[2]}: {len(store)} bản ghi, "
+                  f"{os.path.getsize(sys.argv[2]) / 1024 / 1024:.1f} MB")
+            for name, count in store.label_counts().items():
+                print(f"   {name:20s}: {count}")
+    elif command == 'get' and len(sys.argv) >= 4:
+        with CorpusStore(sys.argv[2]) as store:
+            record = store.get(sys.argv[3])
+            if record is None:
+                print("❌ Không có URL này")
+                sys.exit(1)
+            print(json.dumps(record, ensure_ascii=False, indent=2))
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Xử lý lỗi khi cào dùng chung cho cao.py, caornn.py và app.py
+
+- FetchFailure: bản ghi lỗi có kiểu (timeout, http, dns, ...) thay vì chỉ là chuỗi "Lỗi: ..."
+- Lỗi tạm thời (timeout, mất kết nối, 429/5xx) được thử lại với backoff lũy thừa
+- CircuitBreaker: host lỗi tạm thời liên tiếp nhiều lần thì tạm ngừng gọi tới host đó
+- NegativeCache: lỗi vĩnh viễn (404/410, tên miền không tồn tại, không phải HTML...) được ghi ra đĩa
+  (SQLite, dùng chung được giữa các process), lần sau gặp lại URL/host đó thì trả lỗi ngay, không tốn request
+"""
+
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+
+NEGATIVE_CACHE_FILE = os.path.join('.cache', 'negative.sqlite3')
+LEGACY_NEGATIVE_FILE = os.path.join('.cache', 'negative.json')    # định dạng cũ, chép sang khi tạo DB
+NEGATIVE_CACHE_TTL = 30 * 24 * 3600     # 30 ngày rồi thử lại
+# Lỗi của cả tên miền (DNS) và lỗi SSL hay được sửa sớm, chặn lâu thì mất cả 1 báo → TTL ngắn
+NEGATIVE_SHORT_TTL = 6 * 3600
+SHORT_TTL_KINDS = {'dns', 'ssl'}
+
+# Mã lỗi getaddrinfo nghĩa là tên miền chắc chắn không tồn tại (NXDOMAIN);
+# mã khác (EAI_AGAIN, EAI_FAIL...) là resolver trục trặc / mất mạng → thử lại
+NXDOMAIN_ERRNOS = {getattr(socket, name) for name in ('EAI_NONAME', 'EAI_NODATA') if hasattr(socket, name)}
+
+# Mã HTTP coi là lỗi tạm thời (thử lại được)
+TRANSIENT_STATUS = {408, 425, 429, 500, 502, 503, 504}
+# Mã HTTP chắc chắn là bài không còn → ghi negative cache. Mã khác (401/403/451...) hay là chặn bot /
+# chặn theo vùng: không thử lại ngay nhưng cũng không ghi nhớ, lần chạy sau vẫn thử
+PERMANENT_STATUS = {404, 410}
+
+
+class NotHTMLError(requests.exceptions.RequestException):
+    """Server trả về nội dung không phải HTML (PDF, ảnh, video...)"""
+
+
+def host_of(url: str) -> str:
+    return (urlparse(url).hostname or '').lower()
+
+
+class FetchFailure:
+    """Bản ghi 1 lần fetch thất bại"""
+
+    def __init__(self, url: str, kind: str, message: str = '', status: Optional[int] = None,
+                 permanent: bool = False, attempts: int = 1, retry_after: Optional[float] = None):
+        self.url = url
+        self.kind = kind              # timeout | http | dns | connection | ssl | redirect | not_html | invalid_url | circuit_open | unknown
+        self.message = message
+        self.status = status
+        self.permanent = permanent    # True → ghi vào negative cache
+        self.attempts = attempts
+        self.retry_after = retry_after
+        self.cached = False           # True nếu lấy từ negative cache
+
+    @property
+    def transient(self) -> bool:
+        """True → thử lại (có backoff)"""
+        if self.kind == 'http':
+            return self.status in TRANSIENT_STATUS
+        return not self.permanent and self.kind != 'unknown'
+
+    @property
+    def title(self) -> str:
+        """Chuỗi lỗi lưu vào trường title (giữ tiền tố "Lỗi" để tienxuly.py nhận ra)"""
+        if self.kind == 'timeout':
+            return "Lỗi: Timeout khi truy cập"
+        if self.kind == 'http':
+            return f"Lỗi: HTTPError {self.status}: {self.message}"
+        if self.kind == 'dns':
+            return "Lỗi: Không phân giải được tên miền"
+        if self.kind == 'not_html':
+            return f"Lỗi: Không phải trang HTML ({self.message})"
+        if self.kind == 'circuit_open':
+            return f"Lỗi: Tạm ngừng truy cập {host_of(self.url)} do lỗi liên tiếp"
+        if self.kind == 'unknown':
+            return f"Lỗi không xác định: {self.message}"
+        return f"Lỗi: {self.message}"
+
+    def to_dict(self) -> dict:
+        return {
+            'kind': self.kind,
+            'status': self.status,
+            'message': self.message,
+            'permanent': self.permanent,
+            'attempts': self.attempts,
+        }
+
+    @classmethod
+    def from_dict(cls, url: str, data: dict) -> 'FetchFailure':
+        return cls(url, data.get('kind', 'unknown'), data.get('message', ''),
+                   data.get('status'), data.get('permanent', True), data.get('attempts', 1))
+
+
+class FetchFailed(Exception):
+    """Ném ra khi fetch thất bại hẳn (đã hết lượt thử lại)"""
+
+    def __init__(self, failure: FetchFailure):
+        super().__init__(failure.title)
+        self.failure = failure
+
+
+def classify(url: str, exc: Exception) -> FetchFailure:
+    """Phân loại exception của requests thành FetchFailure"""
+    if isinstance(exc, FetchFailed):
+        return exc.failure
+
+    # Nội dung không phải HTML thì thử lại cũng vô ích
+    if isinstance(exc, NotHTMLError):
+        return FetchFailure(url, 'not_html', str(exc), permanent=True)
+
+    if isinstance(exc, requests.exceptions.Timeout):
+        return FetchFailure(url, 'timeout', type(exc).__name__)
+
+    if isinstance(exc, requests.exceptions.HTTPError) and exc.response is not None:
+        status = exc.response.status_code
+        reason = exc.response.reason or ''
+        retry_after = None
+        header = exc.response.headers.get('Retry-After')
+        if header and header.strip().isdigit():
+            retry_after = float(header)
+        return FetchFailure(url, 'http', reason, status,
+                            permanent=status in PERMANENT_STATUS, retry_after=retry_after)
+
+    if isinstance(exc, requests.exceptions.SSLError):
+        # Không thử lại, nhưng chỉ chặn NEGATIVE_SHORT_TTL (chứng chỉ hay được gia hạn / sửa)
+        return FetchFailure(url, 'ssl', type(exc).__name__, permanent=True)
+
+    if isinstance(exc, requests.exceptions.TooManyRedirects):
+        return FetchFailure(url, 'redirect', type(exc).__name__, permanent=True)
+
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        # Tìm lỗi phân giải tên miền trong chuỗi nguyên nhân; chỉ NXDOMAIN mới là lỗi vĩnh viễn
+        cause = exc
+        dns_error = None
+        while cause is not None:
+            if isinstance(cause, socket.gaierror):
+                return FetchFailure(url, 'dns', type(cause).__name__,
+                                    permanent=cause.errno in NXDOMAIN_ERRNOS)
+            if dns_error is None and 'NameResolutionError' in type(cause).__name__:
+                dns_error = cause
+            cause = cause.__cause__ or cause.__context__ or (
+                cause.args[0] if cause.args and isinstance(cause.args[0], BaseException) else None)
+        if dns_error is not None:
+            # Không có errno (gaierror không nằm trong chuỗi): coi là tạm thời
+            return FetchFailure(url, 'dns', type(dns_error).__name__)
+        return FetchFailure(url, 'connection', type(exc).__name__)
+
+    if isinstance(exc, (requests.exceptions.InvalidURL, requests.exceptions.MissingSchema,
+                        requests.exceptions.InvalidSchema)):
+        return FetchFailure(url, 'invalid_url', type(exc).__name__, permanent=True)
+
+    if isinstance(exc, requests.exceptions.RequestException):
+        return FetchFailure(url, 'connection', type(exc).__name__)
+
+    return FetchFailure(url, 'unknown', type(exc).__name__)
+
+
+# ──────────────────────────────────────────────────────────────────
+# CIRCUIT BREAKER THEO HOST
+# ──────────────────────────────────────────────────────────────────
+class CircuitBreaker:
+    """
+    Đếm lỗi tạm thời liên tiếp của từng host.
+    Quá `threshold` lần → mở mạch trong `cooldown` giây (mọi request tới host bị từ chối ngay).
+    Hết cooldown cho 1 request thử: thành công thì đóng mạch, lỗi thì mở lại.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 300.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures: Dict[str, int] = {}
+        self.open_until: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def allow(self, host: str) -> bool:
+        with self.lock:
+            until = self.open_until.get(host)
+            if until is None:
+                return True
+            if time.monotonic() >= until:
+                # Half-open: cho 1 request thử, các request khác vẫn bị chặn tới khi có kết quả
+                self.open_until[host] = time.monotonic() + self.cooldown
+                return True
+            return False
+
+    def success(self, host: str):
+        with self.lock:
+            self.failures.pop(host, None)
+            self.open_until.pop(host, None)
+
+    def failure(self, host: str) -> bool:
+        """Ghi nhận 1 lỗi tạm thời, trả về True nếu vừa mở mạch"""
+        with self.lock:
+            count = self.failures.get(host, 0) + 1
+            self.failures[host] = count
+            if count >= self.threshold:
+                opened = host not in self.open_until
+                self.open_until[host] = time.monotonic() + self.cooldown
+                return opened
+            return False
+
+
+# ──────────────────────────────────────────────────────────────────
+# NEGATIVE CACHE
+# ──────────────────────────────────────────────────────────────────
+class NegativeCache:
+    """
+    Lưu lỗi vĩnh viễn vào SQLite: URL → lỗi, và host → lỗi DNS (NXDOMAIN).
+    cao.py, caornn.py và app.py chạy cùng lúc vẫn ghi chung được (mỗi lần ghi chỉ 1 dòng).
+    Mục quá TTL bị bỏ qua để có cơ hội thử lại; lỗi DNS / SSL dùng short_ttl.
+    """
+
+    def __init__(self, path: str = NEGATIVE_CACHE_FILE, ttl: float = NEGATIVE_CACHE_TTL,
+                 short_ttl: float = NEGATIVE_SHORT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.short_ttl = short_ttl
+        self.lock = threading.Lock()
+        self.hits = 0
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, data TEXT NOT NULL, '
+                        'at REAL NOT NULL)')
+        self.db.commit()
+        if path == NEGATIVE_CACHE_FILE:
+            self._import_legacy(LEGACY_NEGATIVE_FILE)
+
+    def _import_legacy(self, legacy: str):
+        """Chép negative.json của phiên bản trước vào DB (1 lần, khi DB còn trống)"""
+        if not os.path.isfile(legacy) or self.db.execute('SELECT 1 FROM entries LIMIT 1').fetchone():
+            return
+        try:
+            with open(legacy, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except Exception as e:
+            print(f"⚠️  Không đọc được {legacy}: {e}")
+            return
+        with self.db:
+            self.db.executemany('INSERT OR IGNORE INTO entries VALUES (?, ?, ?)',
+                                [(key, json.dumps(entry, ensure_ascii=False), entry.get('at', 0))
+                                 for key, entry in entries.items()])
+
+    @staticmethod
+    def _key(url: str, failure: FetchFailure = None) -> str:
+        # Lỗi DNS là của cả tên miền, không riêng URL
+        if failure is not None and failure.kind == 'dns':
+            return 'host:' + host_of(url)
+        return url
+
+    def _ttl(self, entry: dict) -> float:
+        return self.short_ttl if entry.get('kind') in SHORT_TTL_KINDS else self.ttl
+
+    def get(self, url: str) -> Optional[FetchFailure]:
+        now = time.time()
+        with self.lock:
+            for key in (url, 'host:' + host_of(url)):
+                row = self.db.execute('SELECT data, at FROM entries WHERE key = ?', (key,)).fetchone()
+                entry = json.loads(row[0]) if row else None
+                if entry and now - row[1] < self._ttl(entry):
+                    self.hits += 1
+                    failure = FetchFailure.from_dict(url, entry)
+                    failure.cached = True
+                    return failure
+        return None
+
+    def add(self, failure: FetchFailure):
+        entry = failure.to_dict()
+        try:
+            with self.lock, self.db:
+                self.db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?)',
+                                (self._key(failure.url, failure), json.dumps(entry, ensure_ascii=False),
+                                 time.time()))
+        except sqlite3.Error as e:
+            print(f"⚠️  Không lưu được {self.path}: {e}")
+
+    def remove(self, url: str):
+        with self.lock, self.db:
+            self.db.execute('DELETE FROM entries WHERE key = ?', (url,))
+
+
+# ──────────────────────────────────────────────────────────────────
+# GỘP LẠI: FETCH CÓ RETRY + BREAKER + NEGATIVE CACHE
+# ──────────────────────────────────────────────────────────────────
+class FetchGuard:
+    """
+    Bọc 1 hàm fetch: kiểm tra negative cache và circuit breaker trước,
+    thử lại lỗi tạm thời với backoff 1s, 2s, 4s... (có jitter, tôn trọng Retry-After),
+    lỗi vĩnh viễn được ghi vào negative cache.
+    """
+
+    def __init__(self, retries: int = 3, backoff: float = 1.0, max_backoff: float = 30.0,
+                 breaker: CircuitBreaker = None, negative_cache: NegativeCache = None):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.negative_cache = negative_cache
+        self.lock = threading.Lock()
+        self.stats: Dict[str, int] = {'ok': 0, 'retried': 0, 'failed': 0,
+                                      'negative_hit': 0, 'circuit_open': 0}
+
+    def _count(self, key: str):
+        with self.lock:
+            self.stats[key] += 1
+
+    def run(self, url: str, fn: Callable, *args, **kwargs):
+        """Gọi fn(*args, **kwargs); thất bại hẳn thì ném FetchFailed"""
+        if self.negative_cache is not None:
+            failure = self.negative_cache.get(url)
+            if failure is not None:
+                self._count('negative_hit')
+                raise FetchFailed(failure)
+
+        host = host_of(url)
+        attempt = 0
+        while True:
+            attempt += 1
+            if not self.breaker.allow(host):
+                self._count('circuit_open')
+                raise FetchFailed(FetchFailure(url, 'circuit_open', 'circuit open', attempts=attempt - 1))
+
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                failure = classify(url, e)
+                failure.attempts = attempt
+
+                if failure.transient:
+                    if self.breaker.failure(host):
+                        print(f"  ⛔ {host}: lỗi liên tiếp, tạm ngừng {self.breaker.cooldown:.0f}s")
+                    if attempt <= self.retries:
+                        self._count('retried')
+                        wait = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+                        if failure.retry_after:
+                            wait = min(self.max_backoff, max(wait, failure.retry_after))
+                        time.sleep(wait * random.uniform(0.8, 1.2))
+                        continue
+                elif failure.permanent and self.negative_cache is not None:
+                    self.negative_cache.add(failure)
+
+                self._count('failed')
+                raise FetchFailed(failure) from e
+
+            self.breaker.success(host)
+            self._count('ok')
+            return result
+
+    def print_stats(self):
+        s = self.stats
+        print(f"🛡  Fetch: {s['ok']} thành công, {s['failed']} thất bại, {s['retried']} lần thử lại, "
+              f"{s['negative_hit']} bỏ qua nhờ negative cache, {s['circuit_open']} bị chặn do circuit breaker")
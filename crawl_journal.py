@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Nhật ký cào dữ liệu dạng JSONL (append-only) dùng chung cho cao.py và caornn.py
+
+Mỗi URL cào xong được ghi ngay 1 dòng vào <output>.journal.jsonl:
+    {"url": "https://...", "data": {"title": ..., "tag": ...}, "at": 1718000000.0}
+("at" = thời điểm cào, epoch giây; gop.py --policy=latest dựa vào đó khi gộp nhiều journal)
+
+Khi chạy lại, các URL đã có trong journal được bỏ qua; file data.json / data_rnn.json
+được dựng lại từ journal bằng cách ghi từng entry (không giữ toàn bộ dữ liệu trong RAM).
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, Iterator, Tuple
+
+from corpus_store import DataWriter
+
+
+def journal_path(output_file: str) -> str:
+    """data.json → data.journal.jsonl (cùng thư mục)"""
+    return os.path.splitext(output_file)[0] + '.journal.jsonl'
+
+
+class CrawlJournal:
+    """Journal append-only: URL → record, dòng sau ghi đè dòng trước nếu trùng URL"""
+
+    def __init__(self, output_file: str):
+        self.path = journal_path(output_file)
+        self.lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
+
+    def _scan(self) -> Iterator[Tuple[int, dict]]:
+        """Duyệt journal, trả về (offset, entry); bỏ qua dòng hỏng (VD: ghi dở khi bị ngắt)"""
+        if not self.exists():
+            return
+        with open(self.path, 'rb') as f:
+            offset = 0
+            for line in f:
+                start = offset
+                offset += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and 'url' in entry:
+                    yield start, entry
+
+    def index(self) -> Dict[str, int]:
+        """URL → offset của dòng mới nhất (giữ thứ tự xuất hiện đầu tiên)"""
+        return {entry['url']: offset for offset, entry in self._scan()}
+
+    def done_urls(self) -> set:
+        """Tập URL đã cào xong"""
+        return {entry['url'] for _, entry in self._scan()}
+
+    def append(self, url: str, record: dict):
+        """Ghi 1 kết quả vào cuối journal và flush ngay xuống đĩa"""
+        line = json.dumps({'url': url, 'data': record, 'at': time.time()}, ensure_ascii=False) + '\n'
+        with self.lock:
+            with open(self.path, 'a+b') as f:
+                # Dòng cuối bị cắt dở (crash khi đang ghi) → xuống dòng trước khi ghi tiếp
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        f.write(b'\n')
+                f.write(line.encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def read_at(self, f, offset: int) -> dict:
+        """Đọc record tại offset (f là file journal mở ở chế độ 'rb')"""
+        f.seek(offset)
+        return json.loads(f.readline())['data']
+
+    def seed_from(self, output_file: str) -> int:
+        """
+        Nếu chưa có journal mà đã có file output cũ (chạy bằng phiên bản trước),
+        chép các bản ghi cũ vào journal để không phải cào lại.
+        """
+        if self.exists() or not os.path.isfile(output_file):
+            return 0
+        try:
+            with open(output_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception:
+            return 0
+        if not isinstance(data, dict):
+            return 0
+        with self.lock, open(self.path, 'w', encoding='utf-8') as f:
+            for url, record in data.items():
+                f.write(json.dumps({'url': url, 'data': record}, ensure_ascii=False) + '\n')
+        return len(data)
+
+    def export(self, output_file: str, urls: Iterable[str] = ()) -> int:
+        """
+        Dựng file JSON kết quả từ journal, ghi từng entry một.
+        Thứ tự: các URL trong `urls` trước (theo thứ tự truyền vào), rồi tới các URL còn lại.
+        Định dạng giống json.dump(..., ensure_ascii=False, indent=2).
+
+        Returns:
+            Số entry đã ghi
+        """
+        if not self.exists():
+            with DataWriter(output_file):
+                pass
+            return 0
+
+        index = self.index()
+        order = [url for url in dict.fromkeys(urls) if url in index]
+        seen = set(order)
+        order.extend(url for url in index if url not in seen)
+
+        with open(self.path, 'rb') as src, DataWriter(output_file) as out:
+            for url in order:
+                out.write(url, self.read_at(src, index[url]))
+        return out.count
+
+    def clear(self):
+        """Xóa journal (cào lại từ đầu)"""
+        if self.exists():
+            os.remove(self.path)
@@ -1,5 +1,4 @@
-import json
-from collections import defaultdict
+from label_stats import LabelStats
 
 # 4 tag chuẩn
 VALID_TAGS = {
@@ -9,24 +8,14 @@ VALID_TAGS = {
     "giáo dục": "Giáo dục"
 }
 
-with open("data_rnn.json", "r", encoding="utf-8") as f:
-    data = json.load(f)
-
-tag_count = defaultdict(int)
-
-for url, info in data.items():
-    raw_tag = info.get("tag", "")
-    
-    # tách multi-tag
-    tags = raw_tag.split(",")
-    
-    for tag in tags:
-        tag = tag.strip().lower()   # chuẩn hóa
-        
-        if tag in VALID_TAGS:
-            standard_tag = VALID_TAGS[tag]
-            tag_count[standard_tag] += 1
+# Đọc số đếm từ index thống kê nhãn (data_rnn.labels.sqlite3) thay vì parse lại cả file JSON;
+# index chỉ đồng bộ lại khi data_rnn.json bị sửa ngoài gop / chuanhoatag / cào.
+# Báo cáo đầy đủ (nhãn đi cùng nhau, theo thư mục, theo domain): python label_stats.py
+with LabelStats("data_rnn.json") as stats:   # hoặc "data_rnn.corpus"
+    stats.ensure_fresh()
+    tag_count = stats.label_counts()
 
 # in kết quả
 for tag, count in tag_count.items():
-    print(f"{tag}: {count}")
\ No newline at end of file
+    if tag in VALID_TAGS.values():
+        print(f"{tag}: {count}")
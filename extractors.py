@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backend trích xuất tiêu đề + 100 từ đầu nội dung từ HTML (dùng trong caornn.py)
+
+- SoupExtractor: BeautifulSoup + html.parser (thuần Python, cách làm ban đầu)
+- LxmlExtractor: lxml, parse thẳng từ bytes của response, selector được biên dịch
+  sẵn thành XPath 1 lần khi import module
+
+Cả 2 có cùng interface: parse(raw_bytes) → doc, title(doc), nb_title(doc), content_100_words(doc)
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+    import lxml.html
+except ImportError:  # lxml có trong requirements.txt, nhưng vẫn cho chạy bằng bs4 nếu thiếu
+    etree = None
+
+
+NO_TITLE   = "Không tìm thấy tiêu đề"
+NO_CONTENT = "Không tìm thấy nội dung"
+
+# Danh sách selector theo thứ tự ưu tiên
+# Bao phủ: VnExpress, Tuổi Trẻ, Dân Trí, Thanh Niên, Znews, Tiền Phong...
+CONTENT_SELECTORS = [
+    # Semantic HTML5
+    'article',
+    # VnExpress
+    'div.fck_detail',
+    'div.article-body',
+    # Tuổi Trẻ
+    'div.detail-content',
+    'div#main-detail-body',
+    # Dân Trí
+    'div.singular-content',
+    'div.dt-news__content',
+    # Thanh Niên
+    'div.detail__cmain',
+    'div#contentBody',
+    # Znews / Zing
+    'div.the-article-body',
+    # Tiền Phong
+    'div.article__body',
+    # Saostar
+    'div.content-detail',
+    # Fallback chung
+    'div.content',
+    'div.post-content',
+    'div.entry-content',
+    'main',
+]
+
+# Các thẻ không liên quan trong nội dung bài
+NOISE_TAGS = ['script', 'style', 'figure', 'figcaption', 'aside', 'nav',
+              'form', 'button', 'iframe']
+
+MIN_WORDS = 20   # selector phải cho ra ít nhất 20 từ mới tính
+MAX_WORDS = 100
+
+
+def split_selector(selector: str) -> Tuple[str, str, str]:
+    """'div.fck_detail' → ('div', 'class', 'fck_detail'); 'div#id' → ('div', 'id', 'id'); 'main' → ('main', '', '')"""
+    tag, _, cls = selector.partition('.')
+    if cls:
+        return tag, 'class', cls
+    tag, sep, id_ = selector.partition('#')
+    if sep:
+        return tag, 'id', id_
+    return selector, '', ''
+
+
+def first_words(raw_text: str) -> str:
+    """Lấy đúng 100 từ đầu"""
+    content_100 = ' '.join(raw_text.split()[:MAX_WORDS])
+    return content_100 if content_100 else NO_CONTENT
+
+
+def extract_content(extractor, doc, selectors: List[str] = None,
+                    fallback: bool = True) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Thử lần lượt các selector, dừng ở selector đầu tiên cho ra >= MIN_WORDS từ.
+
+    Returns:
+        (100 từ đầu, selector thắng). Không selector nào đạt thì selector = None và
+        nội dung lấy từ tất cả <p> (fallback=False thì trả về (None, None) luôn).
+    """
+    raw_text = ""
+
+    for selector in selectors or CONTENT_SELECTORS:
+        el = extractor.select(doc, selector)
+        if el is not None:
+            raw_text = extractor.element_text(el)
+            if len(raw_text.split()) >= MIN_WORDS:
+                return first_words(raw_text), selector
+
+    if not fallback:
+        return None, None
+
+    # Fallback: lấy tất cả <p> trong body
+    return first_words(extractor.paragraphs_text(doc)), None
+
+
+def extract_with_hint(extractor, doc, cached: Optional[str]) -> Tuple[str, Optional[str], float]:
+    """
+    Thử selector đã học (cached) trước, hụt thì quét toàn bộ CONTENT_SELECTORS.
+    Không đụng tới SelectorCache nên chạy được trong process con (parse_pool.py).
+
+    Returns:
+        (100 từ đầu, selector thắng hoặc None, thời gian trích xuất)
+    """
+    start = time.perf_counter()
+    if cached:
+        content, winner = extract_content(extractor, doc, [cached], fallback=False)
+        if winner:
+            return content, winner, time.perf_counter() - start
+    content, winner = extract_content(extractor, doc)
+    return content, winner, time.perf_counter() - start
+
+
+def extract_nb_title(soup: BeautifulSoup) -> str:
+    """
+    Tìm tiêu đề cho Naive Bayes trong trang đã parse (cao.py + SoupExtractor.nb_title)
+
+    Args:
+        soup: BeautifulSoup của trang
+
+    Returns:
+        Tiêu đề của trang hoặc "Không tìm thấy tiêu đề"
+    """
+    # Tìm tiêu đề - thử nhiều cách
+    title = None
+
+    # Cách 1: Thẻ <title>
+    if soup.title:
+        title = soup.title.get_text(strip=True)
+
+    # Cách 2: Meta property og:title (thường chính xác hơn cho bài báo)
+    if not title:
+        og_title = soup.find('meta', property='og:title')
+        if og_title and og_title.get('content'):
+            title = og_title.get('content').strip()
+
+    # Cách 3: Meta name twitter:title
+    if not title:
+        twitter_title = soup.find('meta', attrs={'name': 'twitter:title'})
+        if twitter_title and twitter_title.get('content'):
+            title = twitter_title.get('content').strip()
+
+    # Cách 4: Thẻ h1 đầu tiên
+    if not title:
+        h1 = soup.find('h1')
+        if h1:
+            title = h1.get_text(strip=True)
+
+    return title if title else NO_TITLE
+
+
+# ──────────────────────────────────────────────────────────────────
+# BEAUTIFULSOUP
+# ──────────────────────────────────────────────────────────────────
+class SoupExtractor:
+    """Backend BeautifulSoup + html.parser"""
+
+    name = 'soup'
+
+    def __init__(self):
+        # selector → tham số cho soup.find, tính sẵn 1 lần
+        self.finders: Dict[str, Tuple[tuple, dict]] = {
+            selector: self._finder(selector) for selector in CONTENT_SELECTORS
+        }
+
+    @staticmethod
+    def _finder(selector: str) -> Tuple[tuple, dict]:
+        tag, kind, value = split_selector(selector)
+        if kind == 'class':
+            return (tag,), {'class_': value}
+        if kind == 'id':
+            return (tag or True,), {'id': value}
+        return (tag,), {}
+
+    def parse(self, raw: bytes) -> BeautifulSoup:
+        # Giống resp.encoding = 'utf-8'; resp.text
+        return BeautifulSoup(raw.decode('utf-8', errors='replace'), 'html.parser')
+
+    def title(self, soup: BeautifulSoup) -> str:
+        """Tiêu đề cho RNN: ưu tiên og:title vì thường sạch hơn <title>"""
+        og = soup.find('meta', property='og:title')
+        if og and og.get('content'):
+            return og['content'].strip()
+
+        if soup.title:
+            return soup.title.get_text(strip=True)
+
+        tw = soup.find('meta', attrs={'name': 'twitter:title'})
+        if tw and tw.get('content'):
+            return tw['content'].strip()
+
+        h1 = soup.find('h1')
+        if h1:
+            return h1.get_text(strip=True)
+
+        return NO_TITLE
+
+    def nb_title(self, soup: BeautifulSoup) -> str:
+        """Tiêu đề cho Naive Bayes: cùng cách lấy với cao.py (<title> trước)"""
+        return extract_nb_title(soup)
+
+    def select(self, soup: BeautifulSoup, selector: str):
+        """Tìm phần tử đầu tiên khớp selector ('tag', 'tag.class', 'tag#id')"""
+        finder = self.finders.get(selector)
+        if finder is None:
+            finder = self.finders[selector] = self._finder(selector)
+        args, kwargs = finder
+        return soup.find(*args, **kwargs)
+
+    def element_text(self, el) -> str:
+        """Xoá các thẻ nhiễu trong el rồi lấy text"""
+        for noise in el.find_all(NOISE_TAGS):
+            noise.decompose()
+        return el.get_text(separator=' ', strip=True)
+
+    def paragraphs_text(self, soup: BeautifulSoup) -> str:
+        return ' '.join(p.get_text(strip=True) for p in soup.find_all('p'))
+
+    def content_100_words(self, soup: BeautifulSoup, selectors: List[str] = None) -> str:
+        """
+        Trích xuất 100 từ đầu tiên của nội dung bài báo.
+        Thử lần lượt các selector, trả về chuỗi văn bản, KHÔNG phải HTML.
+        """
+        return extract_content(self, soup, selectors)[0]
+
+
+# ──────────────────────────────────────────────────────────────────
+# LXML
+# ──────────────────────────────────────────────────────────────────
+def _selector_xpath(selector: str) -> str:
+    tag, kind, value = split_selector(selector)
+    tag = tag or '*'
+    if kind == 'class':
+        return f"(//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {value} ')])[1]"
+    if kind == 'id':
+        return f"(//{tag}[@id='{value}'])[1]"
+    return f"(//{tag})[1]"
+
+
+def _strip_join(texts, sep: str) -> str:
+    """Giống get_text(separator=sep, strip=True) của BeautifulSoup"""
+    return sep.join(t for t in (s.strip() for s in texts) if t)
+
+
+class LxmlExtractor:
+    """Backend lxml: parse từ bytes, mọi XPath được biên dịch sẵn"""
+
+    name = 'lxml'
+
+    if etree is not None:
+        PARSER = lxml.html.HTMLParser(encoding='utf-8', remove_comments=True)
+        X_OG_TITLE = etree.XPath("(//meta[@property='og:title'])[1]/@content")
+        X_TW_TITLE = etree.XPath("(//meta[@name='twitter:title'])[1]/@content")
+        X_TITLE    = etree.XPath("(//title)[1]")
+        X_H1       = etree.XPath("(//h1)[1]")
+        X_P        = etree.XPath("//p")
+        X_NOISE    = etree.XPath('|'.join(f'.//{t}' for t in NOISE_TAGS))
+        X_SKIP     = etree.XPath(".//script|.//style|.//template")
+        X_CONTENT = {
+            selector: etree.XPath(_selector_xpath(selector)) for selector in CONTENT_SELECTORS
+        }
+
+    def __init__(self):
+        if etree is None:
+            raise ImportError("Chưa cài lxml: pip install lxml")
+
+    def parse(self, raw: bytes):
+        # lxml báo lỗi với tài liệu rỗng, bs4 thì không
+        if not raw.strip():
+            raw = b'<html></html>'
+        return lxml.html.document_fromstring(raw, parser=self.PARSER)
+
+    def _text(self, el, sep: str = '') -> str:
+        # BeautifulSoup không lấy text trong <script>/<style>/<template>
+        if self.X_SKIP(el):
+            return _strip_join(self._visible_texts(el), sep)
+        return _strip_join(el.itertext(), sep)
+
+    def _visible_texts(self, el):
+        if el.tag in ('script', 'style', 'template'):
+            return
+        if el.text:
+            yield el.text
+        for child in el:
+            if isinstance(child.tag, str):
+                yield from self._visible_texts(child)
+            if child.tail:
+                yield child.tail
+
+    def _first(self, xpath, doc) -> str:
+        found = xpath(doc)
+        return found[0].strip() if found else ''
+
+    def title(self, doc) -> str:
+        """Tiêu đề cho RNN: og:title → <title> → twitter:title → <h1>"""
+        found = self.X_OG_TITLE(doc)
+        if found and found[0]:
+            return found[0].strip()
+
+        titles = self.X_TITLE(doc)
+        if titles:
+            return self._text(titles[0])
+
+        found = self.X_TW_TITLE(doc)
+        if found and found[0]:
+            return found[0].strip()
+
+        h1 = self.X_H1(doc)
+        if h1:
+            return self._text(h1[0])
+
+        return NO_TITLE
+
+    def nb_title(self, doc) -> str:
+        """Tiêu đề cho Naive Bayes: <title> → og:title → twitter:title → <h1>"""
+        titles = self.X_TITLE(doc)
+        title = self._text(titles[0]) if titles else ''
+        title = (title
+                 or self._first(self.X_OG_TITLE, doc)
+                 or self._first(self.X_TW_TITLE, doc))
+        if not title:
+            h1 = self.X_H1(doc)
+            title = self._text(h1[0]) if h1 else ''
+        return title or NO_TITLE
+
+    def select(self, doc, selector: str):
+        xpath = self.X_CONTENT.get(selector)
+        if xpath is None:
+            xpath = self.X_CONTENT[selector] = etree.XPath(_selector_xpath(selector))
+        found = xpath(doc)
+        return found[0] if found else None
+
+    def element_text(self, el) -> str:
+        # drop_tree giữ lại phần tail (text sau thẻ), giống decompose() của bs4
+        for noise in self.X_NOISE(el):
+            noise.drop_tree()
+        return self._text(el, ' ')
+
+    def paragraphs_text(self, doc) -> str:
+        return ' '.join(self._text(p) for p in self.X_P(doc))
+
+    def content_100_words(self, doc, selectors: List[str] = None) -> str:
+        return extract_content(self, doc, selectors)[0]
+
+
+# ──────────────────────────────────────────────────────────────────
+# CACHE SELECTOR THEO TÊN MIỀN
+# ──────────────────────────────────────────────────────────────────
+SELECTOR_CACHE_FILE = os.path.join('.cache', 'selectors.json')
+
+
+class SelectorCache:
+    """
+    Nhớ selector nội dung đã thắng cho từng hostname (mỗi báo luôn dùng cùng 1 layout).
+    Trang sau của cùng host thử selector đó trước, chỉ quét cả CONTENT_SELECTORS khi nó hụt.
+    Bảng hostname → selector được lưu ra file JSON để dùng lại giữa các lần chạy.
+    """
+
+    def __init__(self, path: str = SELECTOR_CACHE_FILE):
+        self.path = path
+        self.table: Dict[str, str] = {}
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.stats = {'hit': 0, 'stale': 0, 'learn': 0,
+                      'hit_time': 0.0, 'scan_time': 0.0, 'scans': 0}
+
+        if os.path.isfile(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.table = json.load(f)
+            except Exception as e:
+                print(f"⚠️  Không đọc được {path}: {e}")
+
+    def lookup(self, url: str) -> Optional[str]:
+        """Selector đã học cho host của url (None nếu chưa có)"""
+        host = (urlparse(url).hostname or '').lower()
+        with self.lock:
+            return self.table.get(host)
+
+    def learn(self, url: str, cached: Optional[str], winner: Optional[str], seconds: float):
+        """Ghi nhận kết quả extract_with_hint: cập nhật thống kê và selector của host"""
+        host = (urlparse(url).hostname or '').lower()
+        with self.lock:
+            if cached and winner == cached:
+                self.stats['hit'] += 1
+                self.stats['hit_time'] += seconds
+                return
+            self.stats['stale' if cached else 'learn'] += 1
+            self.stats['scans'] += 1
+            self.stats['scan_time'] += seconds
+            if winner and self.table.get(host) != winner:
+                self.table[host] = winner
+                self.dirty = True
+
+    def extract(self, extractor, doc, url: str) -> str:
+        """content_100_words có dùng selector đã học của host"""
+        cached = self.lookup(url)
+        content, winner, seconds = extract_with_hint(extractor, doc, cached)
+        self.learn(url, cached, winner, seconds)
+        return content
+
+    def save(self):
+        """Ghi bảng hostname → selector ra đĩa (chỉ khi có thay đổi)"""
+        with self.lock:
+            if not self.dirty:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    json.dump(self.table, f, ensure_ascii=False, indent=2, sort_keys=True)
+                self.dirty = False
+            except Exception as e:
+                print(f"⚠️  Không lưu được {self.path}: {e}")
+
+    def print_stats(self):
+        s = self.stats
+        total = s['hit'] + s['stale'] + s['learn']
+        if not total:
+            return
+        avg_scan = s['scan_time'] / s['scans'] if s['scans'] else 0.0
+        avg_hit = s['hit_time'] / s['hit'] if s['hit'] else 0.0
+        saved = max(0.0, avg_scan - avg_hit) * s['hit']
+        print(f"🎯 Selector theo tên miền ({len(self.table)} host): "
+              f"{s['hit']} hit, {s['stale']} hụt, {s['learn']} học mới — "
+              f"hit rate {s['hit'] / total:.1%}, tiết kiệm ~{saved * 1000:.0f} ms trích xuất")
+
+
+EXTRACTORS = {
+    SoupExtractor.name: SoupExtractor,
+    LxmlExtractor.name: LxmlExtractor,
+}
+
+
+def get_extractor(name: str = 'lxml'):
+    """Tạo backend theo tên ('lxml' hoặc 'soup'); thiếu lxml thì dùng BeautifulSoup"""
+    if name == 'lxml' and etree is None:
+        print("⚠️  Chưa cài lxml, dùng BeautifulSoup")
+        name = 'soup'
+    if name not in EXTRACTORS:
+        raise ValueError(f"Backend không hợp lệ: {name} (chọn: {', '.join(EXTRACTORS)})")
+    return EXTRACTORS[name]()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Server tin tức giả lập trên máy để thử / benchmark scraper mà không gọi báo thật
+
+Phục vụ các trang HTML mẫu trong fixtures/html (layout VnExpress fck_detail, Dân Trí
+singular-content, Thanh Niên detail__cmain...) tại:
+
+    http://127.0.0.N:<port>/<tên_fixture>/<số>.html
+
+Mỗi "tờ báo" (fixture) chạy trên 1 địa chỉ loopback riêng (127.0.0.1, 127.0.0.2, ...) để
+giới hạn tốc độ theo tên miền của scraper hoạt động như với báo thật.
+
+Mô phỏng mạng chậm / lỗi:
+    --latency=MS      độ trễ trước khi trả header (mặc định 0)
+    --jitter=MS       cộng/trừ ngẫu nhiên quanh latency
+    --error-rate=P    tỉ lệ trả 503 (lỗi tạm thời, scraper sẽ thử lại)
+    --404-rate=P      tỉ lệ trả 404 (lỗi vĩnh viễn)
+    --drip=BPS        gửi body từ từ, BPS byte/giây (0 = gửi 1 lần)
+    --seed=N          seed ngẫu nhiên để tái lập kết quả
+
+Cách dùng:
+    python fake_news_server.py --latency=80 --jitter=40
+    python fake_news_server.py --links=demo:20          # ghi demo/links.txt + linksnew.txt, 20 bài/báo
+"""
+
+import glob
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+
+from cao import parse_args
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'html')
+DEFAULT_PORT = 8765
+DRIP_CHUNK = 1024
+
+# Tag gán lần lượt cho link của từng fixture khi sinh links.txt
+TAGS = ["Giáo dục", "Giải trí", "Công nghệ", "Kinh doanh"]
+
+
+class ServerConfig:
+    """Thông số mô phỏng mạng, dùng chung cho mọi server"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 not_found_rate: float = 0.0, drip: int = 0, seed: int = None):
+        self.latency = latency              # giây
+        self.jitter = jitter                # giây
+        self.error_rate = error_rate
+        self.not_found_rate = not_found_rate
+        self.drip = drip                    # byte/giây, 0 = không nhỏ giọt
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def roll(self) -> Tuple[float, float]:
+        """(độ trễ, số ngẫu nhiên quyết định lỗi) cho 1 request"""
+        with self.lock:
+            delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+            return max(0.0, delay), self.random.random()
+
+
+def load_fixtures(folder: str = FIXTURES_DIR) -> dict:
+    """tên fixture (không đuôi) → nội dung bytes"""
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(folder, '*.html'))):
+        with open(path, 'rb') as f:
+            pages[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    return pages
+
+
+class FakeNewsHandler(BaseHTTPRequestHandler):
+    """GET /<fixture>/<số>.html → trang fixture, tiêu đề thêm " #<số>" để mỗi URL khác nhau"""
+
+    server_version = 'FakeNews/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        config: ServerConfig = self.server.config
+        delay, dice = config.roll()
+        if delay:
+            time.sleep(delay)
+
+        parts = self.path.split('?')[0].strip('/').split('/')
+        page = self.server.pages.get(parts[0]) if len(parts) == 2 else None
+        if page is None or dice < config.not_found_rate:
+            return self._send_plain(404, b'Not Found')
+        if dice < config.not_found_rate + config.error_rate:
+            return self._send_plain(503, b'Service Unavailable')
+
+        number = os.path.splitext(parts[1])[0].encode()
+        body = page.replace(b'</title>', b' #' + number + b'</title>', 1)
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            if config.drip <= 0:
+                self.wfile.write(body)
+                return
+            # Nhỏ giọt: scraper đọc tới </head> rồi ngắt sẽ không phải chờ hết body
+            for start in range(0, len(body), DRIP_CHUNK):
+                self.wfile.write(body[start:start + DRIP_CHUNK])
+                self.wfile.flush()
+                time.sleep(DRIP_CHUNK / config.drip)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send_plain(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_servers(config: ServerConfig, sites: int = None, port: int = DEFAULT_PORT,
+                  fixtures_dir: str = FIXTURES_DIR) -> Tuple[List[ThreadingHTTPServer], List[Tuple[str, str]]]:
+    """
+    Chạy mỗi fixture trên 1 địa chỉ 127.0.0.N (thread nền).
+    Máy không có dải loopback 127.0.0.0/8 (macOS) thì dùng 127.0.0.1 với cổng khác nhau.
+    port=0: để hệ điều hành chọn cổng trống.
+
+    Returns:
+        (danh sách server, [(tên fixture, base URL)])
+    """
+    pages = load_fixtures(fixtures_dir)
+    names = list(pages)[:sites] if sites else list(pages)
+    servers = []
+    sites_info = []
+    for i, name in enumerate(names):
+        for address in ((f'127.0.0.{i + 1}', port), ('127.0.0.1', port + i if port else 0)):
+            try:
+                server = ThreadingHTTPServer(address, FakeNewsHandler)
+                break
+            except OSError:
+                continue
+        else:
+            raise OSError(f"Không mở được server cho {name} (cổng {port})")
+        server.daemon_threads = True
+        server.config = config
+        server.pages = pages
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        host, bound_port = server.server_address[:2]
+        sites_info.append((name, f'http://{host}:{bound_port}'))
+    return servers, sites_info
+
+
+def stop_servers(servers: List[ThreadingHTTPServer]):
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def write_links(folder: str, sites_info: List[Tuple[str, str]], pages: int,
+                offset: int = 0, names: tuple = ('links.txt', 'linksnew.txt')) -> int:
+    """
+    Ghi <folder>/links.txt và linksnew.txt theo format "<url>: <tag>",
+    xen kẽ các báo; offset để các thư mục khác nhau có link khác nhau. Trả về số link.
+    """
+    os.makedirs(folder, exist_ok=True)
+    lines = []
+    for n in range(offset, offset + pages):
+        for i, (name, base) in enumerate(sites_info):
+            lines.append(f"{base}/{name}/{n}.html: {TAGS[i % len(TAGS)]}\n")
+    for filename in names:
+        with open(os.path.join(folder, filename), 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+    return len(lines)
+
+
+def config_from_options(options: dict) -> ServerConfig:
+    return ServerConfig(
+        latency=float(options.get('latency', 0)) / 1000,
+        jitter=float(options.get('jitter', 0)) / 1000,
+        error_rate=float(options.get('error-rate', 0)),
+        not_found_rate=float(options.get('404-rate', 0)),
+        drip=int(options.get('drip', 0)),
+        seed=int(options['seed']) if 'seed' in options else None,
+    )
+
+
+def main():
+    _, options = parse_args(sys.argv[1:])
+    try:
+        config = config_from_options(options)
+        port = int(options.get('port', DEFAULT_PORT))
+    except ValueError:
+        print("❌ Tham số không hợp lệ!")
+        print(__doc__)
+        sys.exit(1)
+
+    servers, sites_info = start_servers(config, port=port)
+    print("=" * 60)
+    print(f"📰 SERVER TIN GIẢ LẬP: {len(servers)} báo")
+    print("=" * 60)
+    for name, base in sites_info:
+        print(f"   {base}/{name}/<số>.html")
+    print(f"⏱  latency {config.latency * 1000:.0f}±{config.jitter * 1000:.0f} ms, "
+          f"503 {config.error_rate:.0%}, 404 {config.not_found_rate:.0%}, "
+          f"drip {config.drip or 'tắt'} B/s")
+
+    if options.get('links'):
+        folder, _, count = str(options['links']).partition(':')
+        total = write_links(folder, sites_info, int(count or 10))
+        print(f"📝 Đã ghi {total} link vào {folder}/links.txt, {folder}/linksnew.txt")
+
+    print("Ctrl+C để dừng")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stop_servers(servers)
+        print("\n👋 Đã dừng server")
+
+
+if __name__ == "__main__":
+    main()
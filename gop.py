@@ -2,30 +2,90 @@
 # -*- coding: utf-8 -*-
 """
 Script gộp file từ nhiều thư mục Lí do vì sao gộp : chia để bt link do ai cào, check tiến độ quá trình làm việc + chia nhỏ để xử lý lối 
-Hỗ trợ: .txt, .json, .csv
+Hỗ trợ: .txt, .json, .csv, .jsonl (gộp kiểu streaming, không đọc hết dữ liệu vào RAM),
+        .corpus (kho SQLite của corpus_store.py)
 """
 
 import sys
 import os
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+from corpus_store import CorpusStore, DataWriter
+from label_stats import update_from_items
+
+
+# Cách xử lý 1 URL có trong nhiều file .jsonl / .corpus
+POLICIES = {
+    'first':      'giữ bản ghi gặp đầu tiên',
+    'latest':     'giữ bản ghi cào sau cùng (theo "at" trong journal; thiếu "at" thì dòng sau / thư mục sau ghi đè)',
+    'union-tags': 'giữ bản ghi đầu tiên, tag là hợp các tag của mọi bản ghi',
+}
+
+
+def iter_jsonl(path: str) -> Iterator[Tuple[int, str, dict, Optional[float]]]:
+    """
+    Duyệt file JSONL, trả về (offset, url, record, at); bỏ qua dòng hỏng.
+    Nhận cả format journal {"url", "data": {...}, "at"} lẫn bản ghi phẳng {"url", "title", ...}
+    """
+    with open(path, 'rb') as f:
+        offset = 0
+        for line in f:
+            start = offset
+            offset += len(line)
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and isinstance(entry.get('url'), str):
+                yield start, entry['url'], entry_record(entry), entry_time(entry)
+
+
+def entry_record(entry: dict) -> dict:
+    if isinstance(entry.get('data'), dict):
+        return entry['data']
+    return {k: v for k, v in entry.items() if k != 'url'}
+
+
+def entry_time(entry: dict) -> Optional[float]:
+    """Thời điểm cào ("at") của dòng journal; journal cũ / bản ghi phẳng → None"""
+    at = entry.get('at') if isinstance(entry.get('data'), dict) else None
+    return at if isinstance(at, (int, float)) else None
+
+
+def union_tags(tags: List[str]) -> str:
+    """["Giải trí", "Giải trí, Sao Việt"] → "Giải trí, Sao Việt" (giữ thứ tự gặp đầu tiên)"""
+    seen = {}
+    for tag in tags:
+        for part in str(tag or '').split(','):
+            part = part.strip()
+            if part and part.lower() not in seen:
+                seen[part.lower()] = part
+    return ', '.join(seen.values())
 
 
 class FileMerger:
     """Class để gộp các file từ nhiều thư mục"""
     
-    def __init__(self, filename: str, folders: List[str]):
+    def __init__(self, filename: str, folders: List[str], policy: str = 'latest',
+                 output_path: str = None):
         """
         Khởi tạo FileMerger
         
         Args:
-            filename: Tên file cần gộp (vd: links.txt, data.json)
+            filename: Tên file cần gộp (vd: links.txt, data.json, data.journal.jsonl)
             folders: Danh sách thư mục cần tìm file
+            policy: Cách xử lý URL trùng khi gộp .jsonl (xem POLICIES)
+            output_path: File output (mặc định cùng tên file, ở thư mục hiện tại).
+                         Gộp .jsonl mà output là .json thì ghi ra JSON object như data.json
         """
+        if policy not in POLICIES:
+            raise ValueError(f"Policy không hợp lệ: {policy} (chọn: {', '.join(POLICIES)})")
         self.filename = filename
         self.folders = folders
         self.file_extension = os.path.splitext(filename)[1].lower()
-        self.output_path = filename  # File output ở thư mục hiện tại
+        self.output_path = output_path or filename  # File output ở thư mục hiện tại
+        self.policy = policy
     
     def merge(self):
         """Gộp file dựa vào extension"""
@@ -45,9 +105,13 @@ class FileMerger:
             self._merge_json()
         elif self.file_extension == '.csv':
             self._merge_csv()
+        elif self.file_extension == '.jsonl':
+            self._merge_jsonl()
+        elif self.file_extension == '.corpus':
+            self._merge_corpus()
         else:
             print(f"❌ Lỗi: Không hỗ trợ file extension '{self.file_extension}'")
-            print("💡 Các extension được hỗ trợ: .txt, .json, .csv")
+            print("💡 Các extension được hỗ trợ: .txt, .json, .csv, .jsonl, .corpus")
             sys.exit(1)
     
     def _find_files(self) -> List[str]:
@@ -129,6 +193,7 @@ class FileMerger:
         found_files = self._find_files()
         
         merged_data = {}
+        sources = {}        # URL → thư mục của bản ghi được giữ (cho thống kê nhãn)
         total_keys = 0
         
         # Đọc từng file JSON
@@ -145,6 +210,7 @@ class FileMerger:
                         # Gộp dictionary
                         before_count = len(merged_data)
                         merged_data.update(data)
+                        sources.update(dict.fromkeys(data, os.path.basename(folder_name)))
                         after_count = len(merged_data)
                         new_keys = after_count - before_count
                         
@@ -171,6 +237,9 @@ class FileMerger:
         try:
             with open(self.output_path, 'w', encoding='utf-8') as f:
                 json.dump(merged_data, f, ensure_ascii=False, indent=2)
+            update_from_items(self.output_path, (
+                (url, record.get('tag', '') if isinstance(record, dict) else '', sources[url])
+                for url, record in merged_data.items()))
             
             print("=" * 60)
             print(f"✅ ĐÃ GỘP THÀNH CÔNG!")
@@ -185,6 +254,172 @@ class FileMerger:
             print(f"❌ Lỗi khi ghi file: {e}")
             sys.exit(1)
     
+    def _merge_jsonl(self):
+        """
+        Gộp các file .jsonl kiểu streaming (VD: data.journal.jsonl của cao.py / caornn.py).
+
+        Lượt 1: đọc tuần tự từng file, chỉ giữ trong RAM index URL → (file, offset)
+                của bản ghi thắng theo policy (+ tag gặp thêm nếu policy union-tags).
+                Policy latest so "at" (thời điểm cào CrawlJournal ghi vào từng dòng);
+                nếu 1 trong 2 bản ghi không có "at" (journal cũ) thì bản đọc sau thắng.
+        Lượt 2: mở cùng lúc mọi file nguồn, đọc từng bản ghi thắng theo offset và ghi
+                ngay ra output theo thứ tự URL xuất hiện lần đầu.
+        """
+        print(f"📝 Đang gộp file JSONL (streaming, policy: {self.policy} — {POLICIES[self.policy]})...\n")
+        
+        found_files = self._find_files()
+        
+        index: Dict[str, Tuple[int, int]] = {}
+        extra_tags: Dict[str, List[str]] = {}   # union-tags: URL → tag của các bản ghi trùng
+        crawled_at: Dict[str, Optional[float]] = {}   # latest: URL → "at" của bản ghi đang giữ
+        total_records = 0
+        
+        # Lượt 1: dựng index
+        for i, file_path in enumerate(found_files):
+            print(f"📖 Đọc từ: {file_path}")
+            count = 0
+            duplicates = 0
+            try:
+                for offset, url, record, at in iter_jsonl(file_path):
+                    count += 1
+                    if url not in index:
+                        index[url] = (i, offset)
+                        crawled_at[url] = at
+                        continue
+                    duplicates += 1
+                    if self.policy == 'latest':
+                        kept = crawled_at[url]
+                        if at is None or kept is None or at >= kept:
+                            index[url] = (i, offset)
+                            crawled_at[url] = at
+                    elif self.policy == 'union-tags':
+                        extra_tags.setdefault(url, []).append(record.get('tag', ''))
+            except Exception as e:
+                print(f"   ❌ Lỗi khi đọc file: {e}\n")
+                continue
+            total_records += count
+            print(f"   → {count} bản ghi")
+            if duplicates:
+                print(f"   ⚠️  {duplicates} bản ghi trùng URL đã gặp")
+            print()
+        
+        # Lượt 2: ghi output từng bản ghi một
+        as_json = os.path.splitext(self.output_path)[1].lower() == '.json'
+        tmp_path = self.output_path + '.tmp'
+        handles = []
+        folder_names = [os.path.basename(os.path.dirname(path)) for path in found_files]
+        label_items = []    # (url, tag, thư mục) cho thống kê nhãn của output .json
+        try:
+            handles = [open(path, 'rb') for path in found_files]
+            if as_json:
+                writer = DataWriter(self.output_path)
+            else:
+                writer = open(tmp_path, 'w', encoding='utf-8')
+            with writer:
+                for url, (i, offset) in index.items():
+                    f = handles[i]
+                    f.seek(offset)
+                    entry = json.loads(f.readline())
+                    record = entry_record(entry)
+                    if url in extra_tags:
+                        record['tag'] = union_tags([record.get('tag', ''), *extra_tags[url]])
+                    if as_json:
+                        label_items.append((url, record.get('tag', ''), folder_names[i]))
+                        writer.write(url, record)
+                    else:
+                        line = {'url': url, 'data': record}
+                        if entry_time(entry) is not None:
+                            line['at'] = entry_time(entry)
+                        writer.write(json.dumps(line, ensure_ascii=False) + '\n')
+            if as_json:
+                update_from_items(self.output_path, label_items)
+            else:
+                os.replace(tmp_path, self.output_path)
+            
+            print("=" * 60)
+            print(f"✅ ĐÃ GỘP THÀNH CÔNG!")
+            print("=" * 60)
+            print(f"📄 File output: {self.output_path}")
+            print(f"📊 Tổng số entries: {len(index)}")
+            print(f"📁 Từ {len(found_files)} file ({total_records} bản ghi)")
+            if len(index) < total_records:
+                print(f"⚠️  Có {total_records - len(index)} bản ghi trùng URL (policy: {self.policy})")
+            if extra_tags:
+                print(f"🏷  {len(extra_tags)} URL được gộp tag")
+            print("=" * 60)
+        except Exception as e:
+            print(f"❌ Lỗi khi ghi file: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            sys.exit(1)
+        finally:
+            for f in handles:
+                f.close()
+    
+    def _merge_corpus(self):
+        """
+        Gộp các kho .corpus (corpus_store.py), URL trùng xử lý theo policy như .jsonl.
+        Kho .corpus không lưu thời điểm cào nên latest = kho của thư mục sau ghi đè.
+        """
+        print(f"📝 Đang gộp kho CORPUS (policy: {self.policy} — {POLICIES[self.policy]})...\n")
+        
+        found_files = self._find_files()
+        
+        tmp_path = self.output_path + '.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        total_records = 0
+        sources = {}        # URL → thư mục của bản ghi được giữ (cho thống kê nhãn)
+        try:
+            with CorpusStore(tmp_path) as merged, merged.batch():
+                for file_path in found_files:
+                    folder_name = os.path.basename(os.path.dirname(file_path))
+                    print(f"📖 Đọc từ: {file_path}")
+                    count = 0
+                    duplicates = 0
+                    with CorpusStore(file_path) as store:
+                        for url, record in store.items():
+                            count += 1
+                            existing = merged.get(url)
+                            if existing is not None:
+                                duplicates += 1
+                                if self.policy == 'first':
+                                    continue
+                                if self.policy == 'union-tags':
+                                    existing['tag'] = union_tags([existing.get('tag', ''),
+                                                                  record.get('tag', '')])
+                                    record = existing
+                                else:
+                                    sources[url] = folder_name
+                            else:
+                                sources[url] = folder_name
+                            merged.put(url, record)
+                    total_records += count
+                    print(f"   → {count} bản ghi")
+                    if duplicates:
+                        print(f"   ⚠️  {duplicates} bản ghi trùng URL đã gặp")
+                    print()
+                total_entries = len(merged)
+            os.replace(tmp_path, self.output_path)
+            with CorpusStore(self.output_path) as merged:
+                urls, _, _, tags = merged.columns()
+            update_from_items(self.output_path, ((url, tag, sources.get(url)) for url, tag in zip(urls, tags)))
+            
+            print("=" * 60)
+            print(f"✅ ĐÃ GỘP THÀNH CÔNG!")
+            print("=" * 60)
+            print(f"📄 File output: {self.output_path}")
+            print(f"📊 Tổng số entries: {total_entries}")
+            print(f"📁 Từ {len(found_files)} file ({total_records} bản ghi)")
+            if total_entries < total_records:
+                print(f"⚠️  Có {total_records - total_entries} bản ghi trùng URL (policy: {self.policy})")
+            print("=" * 60)
+        except Exception as e:
+            print(f"❌ Lỗi khi gộp: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            sys.exit(1)
+    
     def _merge_csv(self):
         """Gộp các file .csv"""
         print("📝 Đang gộp file CSV...\n")
@@ -246,8 +481,12 @@ class FileMerger:
 
 def main():
     """Hàm chính"""
+    # Tách tùy chọn --ten=giatri ra khỏi tham số
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    options = dict(arg[2:].partition('=')[::2] for arg in sys.argv[1:] if arg.startswith('--'))
+    
     # Kiểm tra tham số
-    if len(sys.argv) < 3:
+    if len(args) < 2:
         print("❌ Lỗi: Thiếu tham số!")
         print("\n📖 Cách sử dụng:")
         print("   python gop.py <tên_file> <thư_mục_1> [thư_mục_2] [thư_mục_3] ...")
@@ -255,15 +494,23 @@ def main():
         print("   python gop.py links.txt NĐT Q.Huy Thiện")
         print("   python gop.py data.json NĐT Q.Huy Thiện")
         print("   python gop.py results.csv folder1 folder2 folder3")
+        print("   python gop.py data_rnn.journal.jsonl NĐT Q.Huy --output=data_rnn.json --policy=union-tags")
         print("\n📝 File được hỗ trợ:")
         print("   - .txt  : Gộp tất cả dòng từ các file")
         print("   - .json : Gộp tất cả entries (phải là JSON object)")
         print("   - .csv  : Gộp tất cả dòng với header từ file đầu tiên")
+        print("   - .jsonl: Gộp streaming (mỗi dòng 1 bản ghi có \"url\", VD journal của cao.py/caornn.py)")
+        print("   - .corpus: Gộp kho SQLite của corpus_store.py")
+        print("\n⚙️  Tùy chọn (.jsonl / .corpus):")
+        print("   --policy=... Xử lý URL trùng:")
+        for name, desc in POLICIES.items():
+            print(f"                  {name:10s} {desc}")
+        print("   --output=FILE  File output (.jsonl hoặc .json), mặc định cùng tên file")
         sys.exit(1)
     
     # Lấy tham số
-    filename = sys.argv[1]
-    folders = sys.argv[2:]
+    filename = args[0]
+    folders = args[1:]
     
     # Loại bỏ dấu phẩy nếu người dùng gõ "NĐT, Q.Huy, Thiện"
     folders = [folder.strip().rstrip(',') for folder in folders]
@@ -296,7 +543,12 @@ def main():
         sys.exit(1)
     
     # Tạo merger và thực hiện gộp
-    merger = FileMerger(filename, valid_folders)
+    try:
+        merger = FileMerger(filename, valid_folders, policy=options.get('policy') or 'latest',
+                            output_path=options.get('output') or None)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
     merger.merge()
 
 
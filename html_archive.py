@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Kho lưu trữ HTML thô đã cào (kiểu WARC), dùng để trích xuất lại mà không cần cào lại
+
+- Trang được nối vào cuối các file .cache/archive/pages-00001.warc.gz, mỗi bản ghi là 1
+  gzip member riêng (gunzip / zcat đọc được cả file, đọc lẻ 1 bản ghi chỉ cần offset + độ dài)
+- Mỗi bản ghi: header dạng WARC (WARC-Target-URI, WARC-Date, Content-Type, Content-Length...)
+  + dòng trống + nội dung HTML
+- Index SQLite: URL → (file, offset, độ dài nén, sha256) của bản mới nhất.
+  Trang không đổi (cùng sha256) thì không ghi thêm
+- File đầy SEGMENT_MAX_BYTES thì mở file mới; không bao giờ sửa / xoá bản ghi cũ
+"""
+
+import glob
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterator, Optional, Tuple
+
+
+ARCHIVE_DIR = os.environ.get('ML2_HTML_ARCHIVE', os.path.join('.cache', 'archive'))
+SEGMENT_MAX_BYTES = 256 * 1024 * 1024   # 256 MB mỗi file .warc.gz
+SEGMENT_PATTERN = 'pages-{:05d}.warc.gz'
+
+
+class HTMLArchive:
+    """Kho append-only, an toàn khi ghi từ nhiều thread"""
+
+    def __init__(self, archive_dir: str = ARCHIVE_DIR, segment_max_bytes: int = SEGMENT_MAX_BYTES):
+        self.archive_dir = archive_dir
+        self.segment_max_bytes = segment_max_bytes
+        os.makedirs(archive_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(archive_dir, 'index.sqlite3'),
+                                  timeout=30, check_same_thread=False)
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS records (
+                url          TEXT PRIMARY KEY,
+                segment      TEXT NOT NULL,
+                offset       INTEGER NOT NULL,
+                length       INTEGER NOT NULL,
+                size         INTEGER NOT NULL,
+                sha256       TEXT NOT NULL,
+                content_type TEXT,
+                fetched_at   REAL NOT NULL
+            )
+        ''')
+        self.db.commit()
+
+        segments = sorted(glob.glob(os.path.join(archive_dir, 'pages-*.warc.gz')))
+        self.segment_no = int(os.path.basename(segments[-1])[6:11]) if segments else 1
+        self.stats = {'stored': 0, 'unchanged': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+    # ──────────────────────────────────────────────────────────────
+    # GHI
+    # ──────────────────────────────────────────────────────────────
+    def _segment_path(self) -> str:
+        path = os.path.join(self.archive_dir, SEGMENT_PATTERN.format(self.segment_no))
+        if os.path.isfile(path) and os.path.getsize(path) >= self.segment_max_bytes:
+            self.segment_no += 1
+            path = os.path.join(self.archive_dir, SEGMENT_PATTERN.format(self.segment_no))
+        return path
+
+    @staticmethod
+    def _encode(url: str, body: bytes, content_type: Optional[str], digest: str, now: float) -> bytes:
+        header = (
+            'WARC/1.0\r\n'
+            'WARC-Type: response\r\n'
+            f'WARC-Target-URI: {url}\r\n'
+            f"WARC-Date: {time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(now))}\r\n"
+            f'WARC-Payload-Digest: sha256:{digest}\r\n'
+            f'Content-Type: {content_type or "text/html"}\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            '\r\n'
+        )
+        return gzip.compress(header.encode('utf-8') + body + b'\r\n\r\n', compresslevel=6)
+
+    def append(self, url: str, body: bytes, content_type: str = None) -> bool:
+        """Lưu 1 trang; trả về False nếu bản mới nhất của URL đã giống hệt"""
+        digest = hashlib.sha256(body).hexdigest()
+        with self.lock:
+            row = self.db.execute('SELECT sha256 FROM records WHERE url = ?', (url,)).fetchone()
+            if row and row[0] == digest:
+                self.stats['unchanged'] += 1
+                return False
+
+            now = time.time()
+            record = self._encode(url, body, content_type, digest, now)
+            path = self._segment_path()
+            with open(path, 'ab') as f:
+                offset = f.tell()
+                f.write(record)
+                f.flush()
+                os.fsync(f.fileno())
+
+            self.db.execute(
+                'INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, os.path.basename(path), offset, len(record), len(body), digest,
+                 content_type, now))
+            self.db.commit()
+            self.stats['stored'] += 1
+            self.stats['bytes_in'] += len(body)
+            self.stats['bytes_out'] += len(record)
+        return True
+
+    # ──────────────────────────────────────────────────────────────
+    # ĐỌC
+    # ──────────────────────────────────────────────────────────────
+    @staticmethod
+    def _decode(record: bytes) -> Tuple[dict, bytes]:
+        """gzip member → (header WARC, nội dung)"""
+        data = gzip.decompress(record)
+        head, _, rest = data.partition(b'\r\n\r\n')
+        headers = {}
+        for line in head.decode('utf-8', 'replace').split('\r\n')[1:]:
+            key, _, value = line.partition(':')
+            headers[key.strip()] = value.strip()
+        size = int(headers.get('Content-Length', len(rest)))
+        return headers, rest[:size]
+
+    def _read_at(self, segment: str, offset: int, length: int) -> bytes:
+        with open(os.path.join(self.archive_dir, segment), 'rb') as f:
+            f.seek(offset)
+            return self._decode(f.read(length))[1]
+
+    def get(self, url: str) -> Optional[bytes]:
+        """Nội dung bản mới nhất của URL (None nếu chưa lưu)"""
+        with self.lock:
+            row = self.db.execute('SELECT segment, offset, length FROM records WHERE url = ?',
+                                  (url,)).fetchone()
+        if row is None:
+            return None
+        try:
+            return self._read_at(*row)
+        except (OSError, EOFError, gzip.BadGzipFile, ValueError):
+            return None
+
+    def __contains__(self, url: str) -> bool:
+        with self.lock:
+            return self.db.execute('SELECT 1 FROM records WHERE url = ?', (url,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.db.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+
+    def iter_pages(self, limit: int = None) -> Iterator[Tuple[str, bytes]]:
+        """Duyệt (url, nội dung) các bản mới nhất, đọc tuần tự theo file + offset"""
+        with self.lock:
+            rows = self.db.execute(
+                'SELECT url, segment, offset, length FROM records ORDER BY segment, offset'
+                + (' LIMIT ?' if limit else ''), (limit,) if limit else ()).fetchall()
+        for url, segment, offset, length in rows:
+            try:
+                yield url, self._read_at(segment, offset, length)
+            except (OSError, EOFError, gzip.BadGzipFile, ValueError):
+                continue
+
+    def print_stats(self):
+        s = self.stats
+        if not s['stored'] and not s['unchanged']:
+            return
+        ratio = s['bytes_out'] / s['bytes_in'] if s['bytes_in'] else 0.0
+        print(f"🗄  Archive HTML: lưu {s['stored']} trang "
+              f"({s['bytes_in'] / 1024 / 1024:.1f} MB → {s['bytes_out'] / 1024 / 1024:.1f} MB nén, "
+              f"{ratio:.0%}), {s['unchanged']} trang không đổi")
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache HTML trên đĩa dùng chung cho cao.py, caornn.py và app.py
+
+- Nội dung lưu theo hash (content-addressed): .cache/html/objects/ab/abcdef...
+- Index (URL → hash, ETag, Last-Modified, thời điểm fetch/truy cập) lưu trong SQLite
+- Hết hạn max_age thì gửi conditional GET (If-None-Match / If-Modified-Since),
+  server trả 304 thì dùng lại nội dung cũ
+- Giới hạn dung lượng, vượt quá thì xóa các URL lâu không dùng nhất (LRU)
+- Code tự đọc response (VD: cao.py chỉ stream tới </head>) dùng get_fresh / validators /
+  revalidated / put thay cho get
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+CACHE_DIR = os.environ.get('ML2_HTML_CACHE', os.path.join('.cache', 'html'))
+CACHE_MAX_BYTES = 512 * 1024 * 1024   # 512 MB
+CACHE_MAX_AGE = 24 * 3600             # trong 1 ngày dùng luôn bản cache, không hỏi lại server
+
+
+class HTMLCache:
+    """Cache response HTML theo URL, an toàn khi dùng từ nhiều thread"""
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES,
+                 max_age: float = CACHE_MAX_AGE):
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, 'objects')
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite3'),
+                                  timeout=30, check_same_thread=False)
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                url           TEXT PRIMARY KEY,
+                hash          TEXT NOT NULL,
+                size          INTEGER NOT NULL,
+                content_type  TEXT,
+                etag          TEXT,
+                last_modified TEXT,
+                fetched_at    REAL NOT NULL,
+                accessed_at   REAL NOT NULL
+            )
+        ''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS idx_accessed ON entries(accessed_at)')
+        self.db.commit()
+
+        # Thống kê trong lần chạy hiện tại
+        self.stats: Dict[str, int] = {
+            'hit': 0,          # còn hạn, không gọi mạng
+            'revalidated': 0,  # server trả 304
+            'miss': 0,         # tải mới (chưa có hoặc nội dung đã đổi)
+            'evicted': 0,
+            'bytes_saved': 0,
+        }
+
+    # ──────────────────────────────────────────────────────────────
+    # LƯU / ĐỌC OBJECT
+    # ──────────────────────────────────────────────────────────────
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def _read_object(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._object_path(digest), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_object(self, body: bytes) -> str:
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.isfile(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(body)
+            os.replace(tmp, path)
+        return digest
+
+    def _lookup(self, url: str):
+        with self.lock:
+            return self.db.execute(
+                'SELECT hash, size, content_type, etag, last_modified, fetched_at '
+                'FROM entries WHERE url = ?', (url,)).fetchone()
+
+    def _touch(self, url: str, refetched: bool = False):
+        now = time.time()
+        with self.lock:
+            if refetched:
+                self.db.execute('UPDATE entries SET accessed_at = ?, fetched_at = ? WHERE url = ?',
+                                (now, now, url))
+            else:
+                self.db.execute('UPDATE entries SET accessed_at = ? WHERE url = ?', (now, url))
+            self.db.commit()
+
+    def _store(self, url: str, resp: requests.Response):
+        self._store_body(url, resp.content, resp.headers)
+
+    def _store_body(self, url: str, body: bytes, headers):
+        digest = self._write_object(body)
+        now = time.time()
+        with self.lock:
+            old = self.db.execute('SELECT hash FROM entries WHERE url = ?', (url,)).fetchone()
+            self.db.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, digest, len(body), headers.get('Content-Type'),
+                 headers.get('ETag'), headers.get('Last-Modified'), now, now))
+            self.db.commit()
+            if old and old[0] != digest:
+                self._drop_object_if_unused(old[0])
+            self._evict()
+
+    def _drop_object_if_unused(self, digest: str):
+        """Xóa object nếu không còn URL nào trỏ tới (gọi khi đang giữ lock)"""
+        used = self.db.execute('SELECT 1 FROM entries WHERE hash = ? LIMIT 1', (digest,)).fetchone()
+        if not used:
+            try:
+                os.remove(self._object_path(digest))
+            except OSError:
+                pass
+
+    def _evict(self):
+        """Xóa các URL ít được truy cập gần đây nhất tới khi tổng dung lượng <= max_bytes"""
+        total = self.db.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT hash, size FROM entries)'
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self.db.execute('SELECT url, hash, size FROM entries ORDER BY accessed_at').fetchall()
+        for url, digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            self.db.execute('DELETE FROM entries WHERE url = ?', (url,))
+            used = self.db.execute('SELECT 1 FROM entries WHERE hash = ? LIMIT 1', (digest,)).fetchone()
+            if not used:
+                total -= size
+                try:
+                    os.remove(self._object_path(digest))
+                except OSError:
+                    pass
+            self.stats['evicted'] += 1
+        self.db.commit()
+
+    @staticmethod
+    def _make_response(url: str, body: bytes, content_type: Optional[str]) -> requests.Response:
+        """Tạo requests.Response từ dữ liệu cache để code gọi không cần phân biệt"""
+        resp = requests.models.Response()
+        resp.status_code = 200
+        resp.url = url
+        resp._content = body
+        resp.headers = CaseInsensitiveDict({'Content-Type': content_type} if content_type else {})
+        resp.from_cache = True
+        return resp
+
+    # ──────────────────────────────────────────────────────────────
+    # API CHÍNH
+    # ──────────────────────────────────────────────────────────────
+    def get(self, session: requests.Session, url: str, timeout: float = 10) -> requests.Response:
+        """
+        Thay cho session.get(url): trả về bản cache nếu còn hạn,
+        hết hạn thì revalidate bằng conditional GET, chưa có thì tải mới và lưu lại.
+        Response lỗi (4xx/5xx) không được cache, trả nguyên cho code gọi xử lý.
+        """
+        entry = self._lookup(url)
+        body = None
+        headers = {}
+
+        if entry:
+            digest, size, content_type, etag, last_modified, fetched_at = entry
+            body = self._read_object(digest)
+            if body is not None:
+                if time.time() - fetched_at < self.max_age:
+                    self._touch(url)
+                    with self.lock:
+                        self.stats['hit'] += 1
+                        self.stats['bytes_saved'] += size
+                    return self._make_response(url, body, content_type)
+                if etag:
+                    headers['If-None-Match'] = etag
+                if last_modified:
+                    headers['If-Modified-Since'] = last_modified
+
+        resp = session.get(url, timeout=timeout, headers=headers)
+
+        if resp.status_code == 304 and body is not None:
+            self._touch(url, refetched=True)
+            with self.lock:
+                self.stats['revalidated'] += 1
+                self.stats['bytes_saved'] += size
+            return self._make_response(url, body, content_type)
+
+        if resp.status_code == 200:
+            self._store(url, resp)
+        with self.lock:
+            self.stats['miss'] += 1
+        resp.from_cache = False
+        return resp
+
+    def get_fresh(self, url: str, count_miss: bool = True) -> Optional[bytes]:
+        """
+        Trả về nội dung cache nếu còn hạn (không gọi mạng), không có thì None.
+        count_miss=False: không tính miss (code gọi còn tra tiếp khóa khác)
+        """
+        entry = self._lookup(url)
+        body = None
+        if entry and time.time() - entry[5] < self.max_age:
+            body = self._read_object(entry[0])
+        with self.lock:
+            if body is None:
+                if count_miss:
+                    self.stats['miss'] += 1
+            else:
+                self.stats['hit'] += 1
+                self.stats['bytes_saved'] += entry[1]
+        if body is not None:
+            self._touch(url)
+        return body
+
+    def validators(self, url: str) -> Dict[str, str]:
+        """Header conditional GET (If-None-Match / If-Modified-Since) cho bản cache đã hết hạn"""
+        entry = self._lookup(url)
+        headers = {}
+        if entry and os.path.isfile(self._object_path(entry[0])):
+            if entry[3]:
+                headers['If-None-Match'] = entry[3]
+            if entry[4]:
+                headers['If-Modified-Since'] = entry[4]
+        return headers
+
+    def revalidated(self, url: str) -> Optional[bytes]:
+        """Server trả 304 cho request gửi kèm validators(url): dùng lại bản cache, gia hạn max_age"""
+        entry = self._lookup(url)
+        body = self._read_object(entry[0]) if entry else None
+        if body is None:
+            return None
+        self._touch(url, refetched=True)
+        with self.lock:
+            self.stats['revalidated'] += 1
+            self.stats['bytes_saved'] += entry[1]
+        return body
+
+    def put(self, url: str, body: bytes, headers):
+        """Lưu nội dung đã tải (kèm ETag / Last-Modified trong headers), tính là 1 miss"""
+        self._store_body(url, body, headers)
+        with self.lock:
+            self.stats['miss'] += 1
+
+    def hit_rate(self) -> float:
+        total = self.stats['hit'] + self.stats['revalidated'] + self.stats['miss']
+        return (self.stats['hit'] + self.stats['revalidated']) / total if total else 0.0
+
+    def print_stats(self):
+        """In thống kê cache của lần chạy"""
+        s = self.stats
+        print(f"💾 Cache HTML ({self.cache_dir}): "
+              f"{s['hit']} hit, {s['revalidated']} revalidate (304), {s['miss']} miss, "
+              f"{s['evicted']} evict — hit rate {self.hit_rate():.1%}, "
+              f"tiết kiệm {s['bytes_saved'] / 1024 / 1024:.1f} MB")
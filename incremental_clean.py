@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Làm sạch tăng dần, song song nhiều thư mục (dùng chung cho tienxuly.py và tienxuly_rnn.py)
+
+Mỗi thư mục có file trạng thái <base>_clean.state.json:
+    {"rule": hash của hàm is_error, "journal": {"offset", "head"},
+     "records": {url: [hash nội dung bản ghi, "clean" | "error"]}}
+
+- Input là journal <base>.journal.jsonl của cao.py / caornn.py (nếu không cũ hơn <base>.json):
+  chỉ đọc phần journal mới ghi thêm kể từ lần trước (append-only)
+- Input là <base>.json / .corpus: đọc hết, nhưng chỉ chạy is_error cho bản ghi mới hoặc đã đổi
+- Không có bản ghi nào mới / đổi mà file output vẫn còn → bỏ qua thư mục, không ghi lại
+- Đổi luật is_error → hash rule khác → đánh giá lại toàn bộ
+"""
+
+import hashlib
+import inspect
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from corpus_store import CORPUS_EXT, DataWriter, is_corpus, load_data
+from crawl_journal import CrawlJournal
+
+HEAD_BYTES = 4096
+
+
+def record_hash(record: dict) -> str:
+    return hashlib.sha1(json.dumps(record, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def rule_hash(is_error: Callable) -> str:
+    try:
+        source = inspect.getsource(is_error)
+    except (OSError, TypeError):
+        source = is_error.__qualname__
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+
+def file_head(path: Path) -> str:
+    """Hash HEAD_BYTES đầu file: journal bị xóa / ghi lại từ đầu thì head đổi"""
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read(HEAD_BYTES)).hexdigest()
+
+
+def read_journal_from(path: Path, offset: int) -> Tuple[List[Tuple[str, dict]], int]:
+    """Các entry (url, record) từ offset tới dòng hoàn chỉnh cuối cùng, và offset mới"""
+    entries = []
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break                   # dòng đang ghi dở → để lần sau
+            offset += len(line)
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and 'url' in entry and isinstance(entry.get('data'), dict):
+                entries.append((entry['url'], entry['data']))
+    return entries, offset
+
+
+def clean_folder(folder: str, base: str, is_error: Callable, full: bool = False) -> Dict:
+    """
+    Làm sạch 1 thư mục: <base>.json|.corpus (+ journal) → <base>_clean / <base>_error.
+    full=True: bỏ qua trạng thái cũ, đánh giá lại mọi bản ghi.
+    """
+    folder = Path(folder)
+    ext = CORPUS_EXT if (folder / f"{base}{CORPUS_EXT}").exists() else ".json"
+    source = folder / f"{base}{ext}"
+    journal = CrawlJournal(str(source))
+    journal_file = Path(journal.path)
+    output_file = folder / f"{base}_clean{ext}"
+    error_file = folder / f"{base}_error{ext}"
+    state_file = folder / f"{base}_clean.state.json"
+
+    state = {}
+    if not full and state_file.exists():
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except Exception:
+            state = {}
+    rule = rule_hash(is_error)
+    if state.get('rule') != rule:
+        state = {}
+    records: Dict[str, list] = state.get('records', {})
+
+    # Journal là nguồn khi file JSON không mới hơn nó (cao/caornn dựng JSON từ journal)
+    use_journal = (not is_corpus(source) and journal_file.exists()
+                   and (not source.exists() or source.stat().st_mtime <= journal_file.stat().st_mtime))
+    if not use_journal and not source.exists():
+        return {'folder': str(folder), 'missing': True}
+
+    evaluated = 0
+    data = None
+    journal_state = state.get('journal', {}) if use_journal else {}
+
+    if use_journal:
+        offset = journal_state.get('offset', 0)
+        head = file_head(journal_file)
+        if journal_state.get('head') != head or offset > journal_file.stat().st_size:
+            offset = 0
+            records = {}
+        entries, offset = read_journal_from(journal_file, offset)
+        for url, record in entries:
+            digest = record_hash(record)
+            if records.get(url, [None])[0] != digest:
+                records[url] = [digest, 'error' if is_error(record) else 'clean']
+                evaluated += 1
+        journal_state = {'offset': offset, 'head': head}
+    else:
+        data = load_data(source)
+        seen = set()
+        for url, record in data.items():
+            seen.add(url)
+            digest = record_hash(record)
+            if records.get(url, [None])[0] != digest:
+                records[url] = [digest, 'error' if is_error(record) else 'clean']
+                evaluated += 1
+        removed = [url for url in records if url not in seen]
+        for url in removed:
+            del records[url]
+        evaluated += len(removed)
+
+    clean_count = sum(1 for _, status in records.values() if status == 'clean')
+    result = {
+        'folder': str(folder), 'total': len(records), 'clean': clean_count,
+        'error': len(records) - clean_count, 'evaluated': evaluated,
+        'output': str(output_file), 'error_file': str(error_file),
+    }
+
+    if evaluated == 0 and output_file.exists() and error_file.exists():
+        result['skipped'] = True
+    else:
+        write_outputs(records, output_file, error_file, data, journal if use_journal else None)
+
+    state = {'rule': rule, 'journal': journal_state, 'records': records}
+    tmp = state_file.with_name(state_file.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp, state_file)
+    return result
+
+
+def iter_journal_records(journal: CrawlJournal) -> Iterator[Tuple[str, dict]]:
+    index = journal.index()
+    with open(journal.path, 'rb') as f:
+        for url, offset in index.items():
+            yield url, journal.read_at(f, offset)
+
+
+def write_outputs(records: Dict[str, list], output_file: Path, error_file: Path,
+                  data: Dict = None, journal: CrawlJournal = None):
+    """Ghi 2 file output theo phân loại đã có trong records (không chạy lại is_error)"""
+    items = data.items() if data is not None else iter_journal_records(journal)
+
+    with DataWriter(output_file) as clean_out, DataWriter(error_file) as error_out:
+        for url, record in items:
+            (clean_out if records[url][1] == 'clean' else error_out).write(url, record)
+
+
+def find_folders(base: str) -> List[str]:
+    """Thư mục thành viên (trong thư mục hiện tại) có <base>.json / .corpus / journal"""
+    names = (f"{base}.json", f"{base}{CORPUS_EXT}", f"{base}.journal.jsonl")
+    return sorted(
+        d for d in os.listdir('.')
+        if os.path.isdir(d) and not d.startswith(('.', '_'))
+        and any(os.path.isfile(os.path.join(d, name)) for name in names)
+    )
+
+
+def clean_folders(folders: List[str], base: str, is_error: Callable,
+                  workers: int = None, full: bool = False) -> List[Dict]:
+    """Làm sạch nhiều thư mục song song bằng process pool, in kết quả từng thư mục"""
+    results = []
+    if len(folders) == 1 or workers == 1:
+        results = [clean_folder(folder, base, is_error, full) for folder in folders]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(clean_folder, folders, [base] * len(folders),
+                                        [is_error] * len(folders), [full] * len(folders)))
+
+    for r in results:
+        if r.get('missing'):
+            print(f"⚠️  {r['folder']}: không có {base}.json / journal, bỏ qua")
+            continue
+        note = "không đổi, giữ nguyên output" if r.get('skipped') else f"đánh giá {r['evaluated']} bản ghi mới/đổi"
+        print(f"📂 {r['folder']}: ✅ {r['clean']} hợp lệ, ❌ {r['error']} lỗi — {note}")
+    return results
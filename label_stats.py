@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Thống kê nhãn tăng dần (thay cho demtag.py): đếm nhãn, ma trận nhãn đi cùng nhau,
+phân bố theo thư mục thành viên và theo domain, lịch sử thay đổi
+
+Mỗi file dữ liệu có 1 file index nhỏ đi kèm (SQLite):
+    data_rnn.json  →  data_rnn.labels.sqlite3
+
+- entries: URL → (thư mục, domain, nhãn đã chuẩn hóa) của bản ghi hiện tại
+- label_counts / pairs / folder_counts / domain_counts: số đếm cộng dồn, cập nhật theo chênh lệch
+  khi 1 URL được thêm / đổi nhãn / bị xóa → báo cáo đọc ngay, không parse lại JSON
+- history: ảnh chụp số đếm mỗi lần đồng bộ, để xem dataset thay đổi thế nào theo thời gian
+
+Được cập nhật bởi gop.py, chuanhoatag.py, cao.py / caornn.py (đọc phần journal mới) và
+reextract.py. File dữ liệu bị sửa bằng cách khác (size / mtime khác lần đồng bộ cuối) thì
+báo cáo tự đồng bộ lại từ file.
+
+Cách dùng:
+    python label_stats.py                       # data_rnn.json
+    python label_stats.py data.json NĐT/data_rnn.json
+    python label_stats.py --rebuild data_rnn.json
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from chuanhoatag import VALID_LABELS, split_and_normalize
+from corpus_store import iter_data
+from crawl_journal import CrawlJournal
+from telemetry import domain_of
+
+
+DEFAULT_FILE = 'data_rnn.json'
+HEAD_BYTES = 4096
+TOP_DOMAINS = 15
+
+
+def stats_path(data_path: str) -> str:
+    """data_rnn.json → data_rnn.labels.sqlite3 (cùng thư mục)"""
+    return os.path.splitext(data_path)[0] + '.labels.sqlite3'
+
+
+def file_signature(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def file_head(path: str) -> str:
+    """Hash HEAD_BYTES đầu file: journal bị xóa / ghi lại từ đầu thì head đổi"""
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read(HEAD_BYTES)).hexdigest()
+
+
+class LabelStats:
+    """Index thống kê nhãn của 1 file dữ liệu, cập nhật từng bản ghi"""
+
+    def __init__(self, data_path: str, folder: str = None):
+        self.data_path = data_path
+        self.path = stats_path(data_path)
+        # Thư mục mặc định của bản ghi: thư mục chứa file (file gộp ở gốc → '')
+        self.folder = os.path.basename(os.path.dirname(data_path)) if folder is None else folder
+        self.db = sqlite3.connect(self.path, timeout=30)
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS entries (
+                url    TEXT PRIMARY KEY,
+                folder TEXT NOT NULL,
+                domain TEXT NOT NULL,
+                labels TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS label_counts (
+                label TEXT PRIMARY KEY,
+                n     INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS pairs (
+                a TEXT NOT NULL, b TEXT NOT NULL, n INTEGER NOT NULL,
+                PRIMARY KEY (a, b)
+            );
+            CREATE TABLE IF NOT EXISTS folder_counts (
+                folder TEXT NOT NULL, label TEXT NOT NULL, n INTEGER NOT NULL,
+                PRIMARY KEY (folder, label)
+            );
+            CREATE TABLE IF NOT EXISTS domain_counts (
+                domain TEXT NOT NULL, label TEXT NOT NULL, n INTEGER NOT NULL,
+                PRIMARY KEY (domain, label)
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key   TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS history (
+                at     REAL NOT NULL,
+                total  INTEGER NOT NULL,
+                counts TEXT NOT NULL
+            );
+        ''')
+        self.db.commit()
+        self._in_batch = False
+        self.changed = 0
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @contextmanager
+    def batch(self):
+        """Gom nhiều put / prune vào 1 transaction"""
+        self._in_batch = True
+        try:
+            with self.db:
+                yield self
+        finally:
+            self._in_batch = False
+
+    def _commit(self):
+        if not self._in_batch:
+            self.db.commit()
+
+    def _meta(self, key: str):
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _set_meta(self, key: str, value):
+        self.db.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', (key, json.dumps(value)))
+
+    # ──────────────────────────────────────────────────────────────
+    # CẬP NHẬT
+    # ──────────────────────────────────────────────────────────────
+    def _apply(self, labels: List[str], folder: str, domain: str, sign: int):
+        """Cộng (sign=1) / trừ (sign=-1) đóng góp của 1 bản ghi vào các bảng đếm"""
+        execute = self.db.execute
+        for label in labels:
+            execute('INSERT INTO label_counts VALUES (?, ?) '
+                    'ON CONFLICT(label) DO UPDATE SET n = n + excluded.n', (label, sign))
+            execute('INSERT INTO folder_counts VALUES (?, ?, ?) '
+                    'ON CONFLICT(folder, label) DO UPDATE SET n = n + excluded.n', (folder, label, sign))
+            execute('INSERT INTO domain_counts VALUES (?, ?, ?) '
+                    'ON CONFLICT(domain, label) DO UPDATE SET n = n + excluded.n', (domain, label, sign))
+        for a, b in combinations(labels, 2):
+            execute('INSERT INTO pairs VALUES (?, ?, ?) '
+                    'ON CONFLICT(a, b) DO UPDATE SET n = n + excluded.n', (a, b, sign))
+
+    def put(self, url: str, tag: str, folder: str = None) -> bool:
+        """
+        Thêm / cập nhật 1 bản ghi. folder=None: giữ thư mục đã ghi nhận (bản ghi mới thì lấy
+        thư mục mặc định). Trả về False nếu không có gì thay đổi.
+        """
+        labels = split_and_normalize(tag)    # đã sắp xếp, nhớ theo chuỗi tag thô
+        joined = ', '.join(labels)
+        row = self.db.execute('SELECT folder, domain, labels FROM entries WHERE url = ?',
+                              (url,)).fetchone()
+        if folder is None:
+            folder = row[0] if row else self.folder
+        if row and row[0] == folder and row[2] == joined:
+            return False
+        if row:
+            self._apply(row[2].split(', ') if row[2] else [], row[0], row[1], -1)
+        domain = row[1] if row else domain_of(url)
+        self._apply(labels, folder, domain, 1)
+        self.db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)', (url, folder, domain, joined))
+        self.changed += 1
+        self._commit()
+        return True
+
+    def remove(self, url: str) -> bool:
+        row = self.db.execute('SELECT folder, domain, labels FROM entries WHERE url = ?',
+                              (url,)).fetchone()
+        if row is None:
+            return False
+        self._apply(row[2].split(', ') if row[2] else [], row[0], row[1], -1)
+        self.db.execute('DELETE FROM entries WHERE url = ?', (url,))
+        self.changed += 1
+        self._commit()
+        return True
+
+    def prune(self, keep: Iterable[str]) -> int:
+        """Xóa các URL không còn trong file dữ liệu (keep: mọi URL hiện có)"""
+        keep = set(keep)
+        stale = [url for url, in self.db.execute('SELECT url FROM entries') if url not in keep]
+        for url in stale:
+            self.remove(url)
+        return len(stale)
+
+    def update(self, items: Iterable[Tuple[str, str, Optional[str]]]) -> int:
+        """Đồng bộ theo toàn bộ nội dung mới của file: [(url, tag, thư mục | None)], xóa URL thừa"""
+        seen = set()
+        with self.batch():
+            for url, tag, folder in items:
+                seen.add(url)
+                self.put(url, tag, folder)
+            self.prune(seen)
+        return len(seen)
+
+    def sync_file(self) -> int:
+        """Đồng bộ lại từ chính file dữ liệu (khi file bị sửa ngoài các script có hook)"""
+        total = self.update((url, record.get('tag', ''), None) for url, record in iter_data(self.data_path))
+        self.mark_synced()
+        return total
+
+    def sync_journal(self, journal: CrawlJournal) -> int:
+        """
+        Đọc phần journal ghi thêm kể từ lần đồng bộ trước (journal append-only).
+        Journal bị xóa / ghi lại từ đầu (head khác, VD: cào --fresh) thì đọc lại từ đầu
+        và xóa các URL không còn trong journal.
+        """
+        if not journal.exists():
+            return 0
+        state = self._meta('journal') or {}
+        head = file_head(journal.path)
+        offset = state.get('offset', 0)
+        if state.get('head') != head or offset > os.path.getsize(journal.path):
+            offset = 0
+        seen = set() if offset == 0 else None
+        count = 0
+        with self.batch(), open(journal.path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break                   # dòng đang ghi dở → để lần sau
+                offset += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and 'url' in entry and isinstance(entry.get('data'), dict):
+                    self.put(entry['url'], entry['data'].get('tag', ''))
+                    if seen is not None:
+                        seen.add(entry['url'])
+                    count += 1
+            if seen is not None:
+                self.prune(seen)
+            self._set_meta('journal', {'offset': offset, 'head': head})
+        return count
+
+    def mark_synced(self):
+        """Ghi nhận index đã khớp file dữ liệu hiện tại + lưu ảnh chụp vào history nếu số đếm đổi"""
+        total, counts = self.total(), self.label_counts()
+        last = self.db.execute('SELECT total, counts FROM history ORDER BY at DESC LIMIT 1').fetchone()
+        with self.db:
+            self._set_meta('signature', file_signature(self.data_path))
+            if last is None or last[0] != total or json.loads(last[1]) != counts:
+                self.db.execute('INSERT INTO history VALUES (?, ?, ?)',
+                                (time.time(), total, json.dumps(counts, ensure_ascii=False)))
+
+    def is_fresh(self) -> bool:
+        return self._meta('signature') == file_signature(self.data_path)
+
+    def ensure_fresh(self) -> bool:
+        """Đồng bộ lại từ file nếu file đã bị sửa ngoài luồng; trả về True nếu phải đồng bộ"""
+        if self.is_fresh() or not os.path.exists(self.data_path):
+            return False
+        self.sync_file()
+        return True
+
+    # ──────────────────────────────────────────────────────────────
+    # ĐỌC
+    # ──────────────────────────────────────────────────────────────
+    def total(self) -> int:
+        return self.db.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def label_counts(self) -> Dict[str, int]:
+        return dict(self.db.execute('SELECT label, n FROM label_counts WHERE n > 0 ORDER BY label'))
+
+    def cooccurrence(self) -> Dict[Tuple[str, str], int]:
+        """(nhãn a, nhãn b) → số bài có cả 2 nhãn (a < b)"""
+        return {(a, b): n for a, b, n in self.db.execute('SELECT a, b, n FROM pairs WHERE n > 0')}
+
+    def by_folder(self) -> Dict[str, Dict[str, int]]:
+        result: Dict[str, Dict[str, int]] = {}
+        for folder, label, n in self.db.execute(
+                'SELECT folder, label, n FROM folder_counts WHERE n > 0 ORDER BY folder, label'):
+            result.setdefault(folder, {})[label] = n
+        return result
+
+    def by_domain(self) -> Dict[str, Dict[str, int]]:
+        result: Dict[str, Dict[str, int]] = {}
+        for domain, label, n in self.db.execute(
+                'SELECT domain, label, n FROM domain_counts WHERE n > 0 ORDER BY domain, label'):
+            result.setdefault(domain, {})[label] = n
+        return result
+
+    def folder_totals(self) -> Dict[str, int]:
+        return dict(self.db.execute('SELECT folder, COUNT(*) FROM entries GROUP BY folder ORDER BY folder'))
+
+    def domain_totals(self) -> Dict[str, int]:
+        return dict(self.db.execute(
+            'SELECT domain, COUNT(*) AS n FROM entries GROUP BY domain ORDER BY n DESC'))
+
+    def history(self, limit: int = 10) -> List[Tuple[float, int, Dict[str, int]]]:
+        rows = self.db.execute('SELECT at, total, counts FROM history ORDER BY at DESC LIMIT ?', (limit,))
+        return [(at, total, json.loads(counts)) for at, total, counts in rows][::-1]
+
+    # ──────────────────────────────────────────────────────────────
+    # BÁO CÁO
+    # ──────────────────────────────────────────────────────────────
+    def print_report(self):
+        total = self.total()
+        counts = self.label_counts()
+        labels = sorted(counts)
+
+        print(f"📊 {self.data_path}: {total} bài, {len(labels)} nhãn")
+        for label in labels:
+            mark = "✅" if label in VALID_LABELS else "❌"
+            share = counts[label] / total if total else 0.0
+            print(f"  {mark} {label:20s}: {counts[label]:7d}  {share:6.1%}  {'█' * round(share * 40)}")
+
+        pairs = self.cooccurrence()
+        if pairs:
+            print("\n🔗 Bài có nhiều nhãn (số bài có cả 2 nhãn):")
+            width = max(len(label) for label in labels)
+            print("  " + " " * width + "".join(f"{label[:12]:>14s}" for label in labels))
+            for a in labels:
+                cells = []
+                for b in labels:
+                    n = counts[a] if a == b else pairs.get((min(a, b), max(a, b)), 0)
+                    cells.append(f"{n:14d}")
+                print(f"  {a:{width}s}" + "".join(cells))
+
+        for title, totals, breakdown, limit, blank in (
+                ("📁 Theo thư mục", self.folder_totals(), self.by_folder(), None, '(gốc)'),
+                ("🌐 Theo domain", self.domain_totals(), self.by_domain(), TOP_DOMAINS, '(không rõ)')):
+            print(f"\n{title}:")
+            for name, n in list(totals.items())[:limit]:
+                detail = ", ".join(f"{label} {count}" for label, count in breakdown.get(name, {}).items())
+                print(f"  {name or blank:25s}: {n:6d}  {detail}")
+            if limit and len(totals) > limit:
+                print(f"  ... và {len(totals) - limit} domain khác")
+
+        history = self.history()
+        if len(history) > 1:
+            (_, prev_total, prev), (at, _, _) = history[-2], history[-1]
+            delta = ", ".join(f"{label} {counts.get(label, 0) - prev.get(label, 0):+d}"
+                              for label in sorted(set(counts) | set(prev))
+                              if counts.get(label, 0) != prev.get(label, 0))
+            print(f"\n🕒 So với lần đồng bộ trước: {total - prev_total:+d} bài"
+                  + (f" ({delta})" if delta else "")
+                  + f", cập nhật lúc {time.strftime('%Y-%m-%d %H:%M', time.localtime(at))}")
+
+
+# ──────────────────────────────────────────────────────────────────
+# HOOK CHO CÁC SCRIPT GHI DỮ LIỆU
+# ──────────────────────────────────────────────────────────────────
+def update_from_journal(data_path: str, journal: CrawlJournal):
+    """Sau khi dựng file dữ liệu từ journal (cao.py, caornn.py, reextract.py)"""
+    try:
+        with LabelStats(data_path) as stats:
+            if journal.exists():
+                stats.sync_journal(journal)
+                stats.mark_synced()
+            elif os.path.exists(data_path):
+                stats.sync_file()       # không có journal: đọc lại chính file dữ liệu
+    except Exception as e:
+        print(f"  ⚠️  Không cập nhật được thống kê nhãn {stats_path(data_path)}: {e}")
+
+
+def update_from_items(data_path: str, items: Iterable[Tuple[str, str, Optional[str]]]):
+    """Sau khi ghi lại toàn bộ file dữ liệu (gop.py, chuanhoatag.py): [(url, tag, thư mục | None)]"""
+    try:
+        with LabelStats(data_path) as stats:
+            stats.update(items)
+            stats.mark_synced()
+    except Exception as e:
+        print(f"  ⚠️  Không cập nhật được thống kê nhãn {stats_path(data_path)}: {e}")
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    rebuild = '--rebuild' in sys.argv[1:]
+    files = args or [DEFAULT_FILE]
+
+    missing = [f for f in files if not os.path.exists(f)]
+    if missing:
+        print(f"❌ Không tìm thấy: {', '.join(missing)}")
+        sys.exit(1)
+
+    for i, data_path in enumerate(files):
+        if i:
+            print("\n" + "=" * 60 + "\n")
+        with LabelStats(data_path) as stats:
+            start = time.perf_counter()
+            if rebuild:
+                stats.sync_file()
+                print(f"♻️  Đồng bộ lại từ {data_path}: {stats.changed} bản ghi thay đổi "
+                      f"({time.perf_counter() - start:.2f}s)\n")
+            elif stats.ensure_fresh():
+                print(f"♻️  {data_path} đã đổi ngoài luồng, đồng bộ lại: {stats.changed} bản ghi "
+                      f"thay đổi ({time.perf_counter() - start:.2f}s)\n")
+            stats.print_report()
+
+
+if __name__ == "__main__":
+    main()
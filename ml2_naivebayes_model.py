@@ -36,7 +36,12 @@ keywords= {
 
 import json
 import joblib
-from underthesea import word_tokenize
+try:
+    # Cache tách từ trên đĩa (upload thêm tokenize_cache.py): train / đánh giá lại không phải tách lại
+    from tokenize_cache import word_tokenize, print_stats as print_tokenize_stats
+except ImportError:
+    from underthesea import word_tokenize
+    print_tokenize_stats = lambda: None
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.pipeline import make_pipeline
@@ -77,6 +82,7 @@ def preprocess_drama(text):
     return cleaned_text
 # Sử dụng hàm preprocess của bạn trên X_train_final
 X_train_preprocessed = [preprocess_drama(t) for t in X_train]
+print_tokenize_stats()
 
 # HUẤN LUYỆN
 model = make_pipeline(TfidfVectorizer(ngram_range=(1, 2),min_df=1,max_df=0.8),OneVsRestClassifier(MultinomialNB(alpha=0.1)))
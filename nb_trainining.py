@@ -36,7 +36,14 @@ keywords= {
 
 import json
 import joblib
-from underthesea import word_tokenize
+try:
+    # Cache tách từ trên đĩa (upload thêm tokenize_cache.py): train / đánh giá lại không phải tách lại,
+    # tách cả lô song song nhiều process
+    from tokenize_cache import word_tokenize, tokenize_batch, print_stats as print_tokenize_stats
+except ImportError:
+    from underthesea import word_tokenize
+    tokenize_batch = lambda texts: [word_tokenize(t, format="text") for t in texts]
+    print_tokenize_stats = lambda: None
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.pipeline import make_pipeline
@@ -46,8 +53,13 @@ from sklearn.model_selection import train_test_split
 
 # Nạp dữ liệu
 file_path = '/content/data.json'
-with open(file_path, 'r', encoding='utf-8') as f:
-    data = json.load(f)
+# file_path là .corpus (corpus_store.py) thì upload thêm corpus_store.py, đọc nhanh hơn JSON
+if file_path.endswith('.corpus'):
+    from corpus_store import load_data
+    data = load_data(file_path)
+else:
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
 
 X=[]
 y=[]
@@ -57,7 +69,16 @@ for item in data.values():
     tags = [t.strip().lower() for t in item['tag'].split(',')]
     y.append(tags)
 
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+# Bài gần trùng (cùng 1 tin nhiều báo đăng lại) phải nằm cùng phía train/test, tránh rò rỉ
+# → upload thêm near_dup.py, chuanhoatag.py, corpus_store.py (MinHash + LSH, python near_dup.py để xem cụm)
+try:
+    from near_dup import group_ids, group_train_test_split
+    groups = group_ids(X)
+    print(f"Gần trùng: {len(X) - len(set(groups))} bài nằm chung cụm với bài khác")
+    X_train, X_test, y_train, y_test = group_train_test_split(X, y, groups=groups, test_size=0.2, random_state=42)
+except ImportError:
+    print("⚠️  Chưa có near_dup.py → chia train/test ngẫu nhiên (bài gần trùng có thể rơi vào cả 2 tập)")
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
 # TIẾN HÀNH MLB VÀ PREPROCESS TRÊN DỮ LIỆU TỔNG
 mlb = MultiLabelBinarizer()
@@ -75,8 +96,12 @@ def preprocess_drama(text):
     tokens = tokens_raw.split()
     cleaned_text = " ".join([t for t in tokens if t not in STOPWORDS])
     return cleaned_text
+def preprocess_drama_batch(texts):
+    # Như [preprocess_drama(t) for t in texts], tách từ cả lô 1 lần
+    tokenized = tokenize_batch([t.lower() for t in texts])
+    return [" ".join([t for t in tokens.split() if t not in STOPWORDS]) for tokens in tokenized]
 # Sử dụng hàm preprocess của bạn trên X_train_final
-X_train_preprocessed = [preprocess_drama(t) for t in X_train]
+X_train_preprocessed = preprocess_drama_batch(X_train)
 
 # HUẤN LUYỆN
 model = make_pipeline(TfidfVectorizer(ngram_range=(1, 2),min_df=1,max_df=0.8),OneVsRestClassifier(MultinomialNB(alpha=0.1)))
@@ -98,7 +123,8 @@ import joblib
 
 model, mlb = joblib.load('/content/model_phanloai_drama_nb.pkl')
 
-X_test_preprocessed = [preprocess_drama(t) for t in X_test]
+X_test_preprocessed = preprocess_drama_batch(X_test)
+print_tokenize_stats()
 y_pred_proba        = model.predict_proba(X_test_preprocessed)
 y_test_binarized    = mlb.transform(y_test)
 categories          = mlb.classes_
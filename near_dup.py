@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tìm bài gần trùng (cùng 1 tin, nhiều báo đăng lại dưới URL khác) bằng MinHash + LSH
+
+gop.py / url_index.py chỉ bắt trùng URL. Ở đây mỗi bài (tiêu đề + 100 từ đầu) được cắt thành
+các cụm SHINGLE từ liên tiếp, tóm tắt bằng chữ ký MinHash NUM_PERM số; chữ ký chia thành BANDS
+dải, 2 bài chung 1 dải mới được so sánh → không phải so từng cặp (O(n²)).
+Cặp có độ giống (ước lượng Jaccard) ≥ threshold thuộc cùng 1 cụm.
+
+Index lưu cạnh file dữ liệu, cập nhật tăng dần (chỉ tính lại bài mới / đổi nội dung):
+    data_rnn.json  →  data_rnn.neardup.sqlite3
+
+- Cụm có bài bị gắn nhãn khác nhau → báo "mâu thuẫn nhãn" để xem lại
+- --dedupe=FILE: ghi bản dữ liệu chỉ giữ bài đầu tiên của mỗi cụm
+- nb_trainining.py / rnn_trainining.py dùng group_ids + group_train_test_split để các bài
+  cùng cụm luôn nằm cùng phía train/test (tránh rò rỉ)
+
+Cách dùng:
+    python near_dup.py                          # data_rnn.json
+    python near_dup.py data_rnn.json --threshold=0.7
+    python near_dup.py data_rnn.json --dedupe=data_rnn_dedup.json
+    python near_dup.py data_rnn.json --full     # tính lại toàn bộ index
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from chuanhoatag import split_and_normalize
+from corpus_store import DataWriter, iter_data
+
+
+DEFAULT_FILE = 'data_rnn.json'
+NEAR_DUP_REPORT_FILE = os.path.join('.cache', 'near_dup_report.json')
+
+NUM_PERM = 128
+BANDS = 16               # 16 dải × 8 số: cặp giống ~0.7 trở lên gần như chắc chắn được so
+SHINGLE = 3              # số từ mỗi shingle
+THRESHOLD = 0.8
+MIN_STORED = 0.5         # index lưu mọi cặp ≥ MIN_STORED → đổi --threshold không phải tính lại
+PRIME = 4294967291       # số nguyên tố lớn nhất < 2^32: a·x + b vẫn vừa uint64
+SEED = 42
+
+WORD_RE = re.compile(r'\w+')
+
+
+def shingles(text: str, size: int = SHINGLE) -> set:
+    """Các cụm size từ liên tiếp (chữ thường, bỏ dấu câu); văn bản ngắn hơn size thì lấy cả câu"""
+    words = WORD_RE.findall(unicodedata.normalize('NFC', str(text or '')).lower())
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """Chữ ký MinHash: NUM_PERM hàm băm h(x) = (a·x + b) mod PRIME, lấy min trên các shingle"""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = SEED):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, PRIME, size=num_perm, dtype=np.int64).astype(np.uint64)[:, None]
+        self.b = rng.randint(0, PRIME, size=num_perm, dtype=np.int64).astype(np.uint64)[:, None]
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """Chữ ký uint32[num_perm]; None nếu văn bản rỗng"""
+        shs = shingles(text)
+        if not shs:
+            return None
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little') % PRIME
+             for s in shs), dtype=np.uint64, count=len(shs))
+        return ((self.a * hashes + self.b) % PRIME).min(axis=1).astype(np.uint32)
+
+
+def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Ước lượng độ giống Jaccard = tỉ lệ vị trí trùng nhau của 2 chữ ký"""
+    return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+
+def band_keys(sig: np.ndarray, bands: int = BANDS) -> List[bytes]:
+    rows = len(sig) // bands
+    return [sig[i * rows:(i + 1) * rows].tobytes() for i in range(bands)]
+
+
+def record_text(record: dict) -> str:
+    return f"{record.get('title', '')} {record.get('content', '')}"
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent: Dict[Hashable, Hashable] = {}
+
+    def find(self, x):
+        self.parent.setdefault(x, x)
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[rb] = ra
+
+    def groups(self, order: Iterable[Hashable]) -> List[List[Hashable]]:
+        """Các cụm ≥ 2 phần tử, phần tử trong cụm theo thứ tự order"""
+        clusters: Dict[Hashable, list] = {}
+        for x in order:
+            if x in self.parent:
+                clusters.setdefault(self.find(x), []).append(x)
+        return [members for members in clusters.values() if len(members) > 1]
+
+
+# ──────────────────────────────────────────────────────────────────
+# TRONG RAM (dùng khi train)
+# ──────────────────────────────────────────────────────────────────
+def find_clusters(items: Iterable[Tuple[Hashable, str]], threshold: float = THRESHOLD,
+                  hasher: MinHasher = None) -> List[List[Hashable]]:
+    """[(khóa, văn bản)] → các cụm khóa gần trùng (chỉ cụm ≥ 2 bài)"""
+    hasher = hasher or MinHasher()
+    buckets: Dict[Tuple[int, bytes], list] = defaultdict(list)
+    sigs = {}
+    uf = UnionFind()
+    order = []
+    for key, text in items:
+        order.append(key)
+        sig = hasher.signature(text)
+        if sig is None:
+            continue
+        sigs[key] = sig
+        candidates = set()
+        for band, band_key in enumerate(band_keys(sig)):
+            bucket = buckets[(band, band_key)]
+            candidates.update(bucket)
+            bucket.append(key)
+        for other in candidates:
+            if similarity(sig, sigs[other]) >= threshold:
+                uf.union(other, key)
+    return uf.groups(order)
+
+
+def group_ids(texts: Sequence[str], threshold: float = THRESHOLD) -> List[int]:
+    """Mã cụm cho từng văn bản: bài gần trùng nhau cùng mã, bài không trùng có mã riêng"""
+    ids = list(range(len(texts)))
+    for members in find_clusters(enumerate(texts), threshold):
+        for i in members:
+            ids[i] = members[0]
+    return ids
+
+
+def group_train_test_split(*arrays, groups: Sequence[Hashable], test_size: float = 0.2,
+                           random_state: int = None):
+    """
+    Như sklearn train_test_split nhưng chia theo nhóm: mọi mẫu cùng nhóm nằm cùng 1 phía.
+    Nhóm được xáo ngẫu nhiên rồi dồn vào test tới khi đủ test_size (tỉ lệ số mẫu).
+    Trả về [a_train, a_test, b_train, b_test, ...] như train_test_split.
+    """
+    n = len(groups)
+    members: Dict[Hashable, List[int]] = {}
+    for i, group in enumerate(groups):
+        members.setdefault(group, []).append(i)
+    keys = list(members)
+    order = np.random.RandomState(random_state).permutation(len(keys))
+
+    n_test = int(np.ceil(test_size * n)) if test_size < 1 else int(test_size)
+    test_idx: List[int] = []
+    for k in order:
+        if len(test_idx) >= n_test:
+            break
+        test_idx.extend(members[keys[k]])
+    test_set = set(test_idx)
+    train_idx = [i for i in range(n) if i not in test_set]
+    test_idx.sort()
+
+    result = []
+    for array in arrays:
+        if isinstance(array, np.ndarray):
+            result.extend((array[train_idx], array[test_idx]))
+        else:
+            result.extend(([array[i] for i in train_idx], [array[i] for i in test_idx]))
+    return result
+
+
+# ──────────────────────────────────────────────────────────────────
+# INDEX TĂNG DẦN TRÊN ĐĨA
+# ──────────────────────────────────────────────────────────────────
+def index_path(data_path: str) -> str:
+    """data_rnn.json → data_rnn.neardup.sqlite3 (cùng thư mục)"""
+    return os.path.splitext(data_path)[0] + '.neardup.sqlite3'
+
+
+class NearDupIndex:
+    """
+    docs:  URL → (hash nội dung, tag, chữ ký MinHash)
+    bands: (dải, khóa dải) → URL, tra ứng viên của 1 bài bằng index
+    pairs: cặp URL đã kiểm tra có độ giống ≥ MIN_STORED
+    """
+
+    def __init__(self, data_path: str):
+        self.data_path = data_path
+        self.path = index_path(data_path)
+        self.hasher = MinHasher()
+        self.db = sqlite3.connect(self.path, timeout=30)
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS docs (
+                id     INTEGER PRIMARY KEY,
+                url    TEXT NOT NULL UNIQUE,
+                digest TEXT NOT NULL,
+                tag    TEXT,
+                sig    BLOB
+            );
+            CREATE TABLE IF NOT EXISTS bands (
+                band INTEGER NOT NULL,
+                key  BLOB NOT NULL,
+                url  TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS bands_key ON bands (band, key);
+            CREATE INDEX IF NOT EXISTS bands_url ON bands (url);
+            CREATE TABLE IF NOT EXISTS pairs (
+                a   TEXT NOT NULL,
+                b   TEXT NOT NULL,
+                sim REAL NOT NULL,
+                PRIMARY KEY (a, b)
+            );
+            CREATE INDEX IF NOT EXISTS pairs_b ON pairs (b);
+        ''')
+        self.db.commit()
+        self.stats = {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 0, 'compared': 0}
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.db.execute('SELECT COUNT(*) FROM docs').fetchone()[0]
+
+    def _sig(self, url: str) -> Optional[np.ndarray]:
+        row = self.db.execute('SELECT sig FROM docs WHERE url = ?', (url,)).fetchone()
+        return np.frombuffer(row[0], dtype=np.uint32) if row and row[0] is not None else None
+
+    def _unlink(self, url: str):
+        self.db.execute('DELETE FROM bands WHERE url = ?', (url,))
+        self.db.execute('DELETE FROM pairs WHERE a = ? OR b = ?', (url, url))
+
+    def _add(self, url: str, sig: np.ndarray):
+        """Ghi dải của bài + so với các bài chung dải (đã có trong index)"""
+        candidates = set()
+        for band, key in enumerate(band_keys(sig)):
+            candidates.update(other for other, in self.db.execute(
+                'SELECT url FROM bands WHERE band = ? AND key = ?', (band, key)))
+            self.db.execute('INSERT INTO bands VALUES (?, ?, ?)', (band, key, url))
+        candidates.discard(url)
+        for other in candidates:
+            other_sig = self._sig(other)
+            self.stats['compared'] += 1
+            sim = similarity(sig, other_sig)
+            if sim >= MIN_STORED:
+                self.db.execute('INSERT OR REPLACE INTO pairs VALUES (?, ?, ?)',
+                                (min(url, other), max(url, other), sim))
+
+    def update(self, full: bool = False) -> Dict[str, int]:
+        """Đồng bộ index với file dữ liệu: chỉ tính chữ ký cho bài mới / đổi tiêu đề + nội dung"""
+        with self.db:
+            if full:
+                for table in ('docs', 'bands', 'pairs'):
+                    self.db.execute(f'DELETE FROM {table}')
+            seen = set()
+            for url, record in iter_data(self.data_path):
+                if url in seen:
+                    continue
+                seen.add(url)
+                text = record_text(record)
+                digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+                tag = record.get('tag', '')
+                row = self.db.execute('SELECT digest, tag FROM docs WHERE url = ?', (url,)).fetchone()
+                if row and row[0] == digest:
+                    if row[1] != tag:
+                        self.db.execute('UPDATE docs SET tag = ? WHERE url = ?', (tag, url))
+                    self.stats['unchanged'] += 1
+                    continue
+
+                sig = self.hasher.signature(text)
+                if row:
+                    self._unlink(url)
+                    self.db.execute('UPDATE docs SET digest = ?, tag = ?, sig = ? WHERE url = ?',
+                                    (digest, tag, sig.tobytes() if sig is not None else None, url))
+                    self.stats['changed'] += 1
+                else:
+                    self.db.execute('INSERT INTO docs (url, digest, tag, sig) VALUES (?, ?, ?, ?)',
+                                    (url, digest, tag, sig.tobytes() if sig is not None else None))
+                    self.stats['added'] += 1
+                if sig is not None:
+                    self._add(url, sig)
+
+            stale = [url for url, in self.db.execute('SELECT url FROM docs') if url not in seen]
+            for url in stale:
+                self._unlink(url)
+                self.db.execute('DELETE FROM docs WHERE url = ?', (url,))
+            self.stats['removed'] = len(stale)
+        return self.stats
+
+    def clusters(self, threshold: float = THRESHOLD) -> List[List[str]]:
+        """Các cụm bài gần trùng (URL theo thứ tự trong file dữ liệu)"""
+        uf = UnionFind()
+        for a, b in self.db.execute('SELECT a, b FROM pairs WHERE sim >= ?', (threshold,)):
+            uf.union(a, b)
+        order = [url for url, in self.db.execute('SELECT url FROM docs ORDER BY id')]
+        return uf.groups(order)
+
+    def tags(self, urls: Iterable[str]) -> Dict[str, str]:
+        return {url: self.db.execute('SELECT tag FROM docs WHERE url = ?', (url,)).fetchone()[0]
+                for url in urls}
+
+    def conflicts(self, clusters: List[List[str]]) -> List[List[str]]:
+        """Cụm có bài bị gắn nhãn khác nhau (so sau khi chuẩn hóa tag)"""
+        result = []
+        for members in clusters:
+            tags = self.tags(members)
+            if len({tuple(split_and_normalize(tag)) for tag in tags.values()}) > 1:
+                result.append(members)
+        return result
+
+    def report(self, threshold: float = THRESHOLD, path: str = NEAR_DUP_REPORT_FILE, limit: int = 10):
+        """In tóm tắt cụm gần trùng / mâu thuẫn nhãn và ghi chi tiết ra file JSON"""
+        clusters = self.clusters(threshold)
+        conflicts = self.conflicts(clusters)
+        conflict_set = {members[0] for members in conflicts}
+        extra = sum(len(members) - 1 for members in clusters)
+
+        print(f"🧬 Gần trùng (≥ {threshold:.0%}): {len(self)} bài, {len(clusters)} cụm "
+              f"({extra} bài thừa), {len(conflicts)} cụm bị gắn nhãn khác nhau")
+        for members in conflicts[:limit]:
+            tags = self.tags(members)
+            print(f"  ⚠️  {len(members)} bài:")
+            for url in members:
+                print(f"       {url[:70]}  [{tags[url]}]")
+        if len(conflicts) > limit:
+            print(f"  ... và {len(conflicts) - limit} cụm nữa")
+
+        if not clusters:
+            return
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump([
+                    {
+                        'conflict': members[0] in conflict_set,
+                        'links': [{'url': url, 'tag': tag} for url, tag in self.tags(members).items()],
+                    }
+                    for members in clusters
+                ], f, ensure_ascii=False, indent=2)
+            print(f"  📄 Chi tiết: {path}")
+        except Exception as e:
+            print(f"  ⚠️  Không ghi được {path}: {e}")
+
+    def dedupe(self, output_path: str, threshold: float = THRESHOLD) -> Tuple[int, int]:
+        """Ghi bản dữ liệu chỉ giữ bài đầu tiên của mỗi cụm; trả về (số bài giữ, số bài bỏ)"""
+        dropped = {url for members in self.clusters(threshold) for url in members[1:]}
+        kept = 0
+        with DataWriter(output_path) as writer:
+            for url, record in iter_data(self.data_path):
+                if url not in dropped:
+                    writer.write(url, record)
+                    kept += 1
+        return kept, len(dropped)
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    options = dict(a[2:].partition('=')[::2] for a in sys.argv[1:] if a.startswith('--'))
+    data_path = args[0] if args else DEFAULT_FILE
+    if not os.path.exists(data_path):
+        print(f"❌ Không tìm thấy {data_path}")
+        print(__doc__)
+        sys.exit(1)
+    try:
+        threshold = float(options.get('threshold') or THRESHOLD)
+    except ValueError:
+        print("❌ --threshold không hợp lệ!")
+        sys.exit(1)
+    if threshold < MIN_STORED:
+        print(f"⚠️  --threshold nhỏ hơn {MIN_STORED}: cặp giống dưới {MIN_STORED:.0%} không được lưu")
+
+    with NearDupIndex(data_path) as index:
+        start = time.perf_counter()
+        s = index.update(full='full' in options)
+        print(f"🔄 Index {index.path}: +{s['added']} mới, {s['changed']} đổi, {s['removed']} xoá, "
+              f"{s['unchanged']} giữ nguyên, {s['compared']} lần so chữ ký "
+              f"({time.perf_counter() - start:.2f}s)")
+        index.report(threshold)
+
+        if options.get('dedupe'):
+            kept, dropped = index.dedupe(options['dedupe'], threshold)
+            print(f"✅ Đã ghi {kept} bài (bỏ {dropped} bài gần trùng) → {options['dedupe']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pool process parse HTML, tách khỏi phần tải trang (dùng trong caornn.py --parse-workers)
+
+Parse + trích nội dung (nhất là BeautifulSoup) tốn CPU và giữ GIL, nên dù fetch song song
+bằng thread thì phần parse vẫn chỉ chạy trên 1 lõi. ParsePool cho thread fetch chỉ tải bytes
+rồi đẩy sang N process con để parse:
+
+    thread fetch ──(bytes)──▶ [hàng đợi giới hạn max_pending trang] ──▶ process parse ──▶ bản ghi
+
+Backpressure: thread fetch phải giữ 1 chỗ (reserve) trước khi tải; hết chỗ thì chờ tới khi
+process parse xong bớt trang, nên bộ nhớ không phình ra khi mạng nhanh hơn CPU.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+
+from extractors import extract_with_hint, get_extractor
+
+
+# Backend parse của từng process con (tạo 1 lần khi process khởi động)
+_extractor = None
+
+
+def _init_worker(parser: str):
+    global _extractor
+    _extractor = get_extractor(parser)
+
+
+def parse_page(raw: bytes, with_nb_title: bool, cached_selector: Optional[str]) -> dict:
+    """
+    Chạy trong process con: parse bytes của trang → tiêu đề + 100 từ đầu.
+    cached_selector: selector đã học của host (SelectorCache nằm ở process chính).
+    """
+    start = time.perf_counter()
+    doc = _extractor.parse(raw)
+
+    # Lấy tiêu đề trước: trích nội dung xoá bớt thẻ trong doc
+    title    = _extractor.title(doc)
+    nb_title = _extractor.nb_title(doc) if with_nb_title else ""
+    content, winner, extract_seconds = extract_with_hint(_extractor, doc, cached_selector)
+    return {
+        'title':           title,
+        'content':         content,
+        'nb_title':        nb_title,
+        'winner':          winner,
+        'extract_seconds': extract_seconds,
+        'parse_seconds':   time.perf_counter() - start,
+    }
+
+
+class ParsePool:
+    """ProcessPoolExecutor parse HTML + giới hạn số trang đã tải mà chưa parse xong"""
+
+    def __init__(self, processes: int = None, parser: str = 'lxml', max_pending: int = None):
+        # Tạo thử ở process chính: tên backend sai báo lỗi ngay thay vì làm hỏng pool
+        parser = get_extractor(parser).name
+        self.processes = processes or os.cpu_count() or 1
+        self.max_pending = max_pending or self.processes * 4
+        self.slots = threading.BoundedSemaphore(self.max_pending)
+        # Không fork từ process đang có nhiều thread fetch (dễ kẹt lock): dùng forkserver / spawn
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        self.executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=context,
+                                            initializer=_init_worker, initargs=(parser,))
+        self.waits = 0          # số lần thread fetch phải chờ vì hàng đợi parse đầy
+        self.wait_time = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Gọi trước khi tải 1 trang; chặn khi đã có max_pending trang chờ parse"""
+        if self.slots.acquire(blocking=False):
+            return
+        start = time.perf_counter()
+        self.slots.acquire()
+        with self.lock:
+            self.waits += 1
+            self.wait_time += time.perf_counter() - start
+
+    def release(self):
+        """Trả chỗ khi tải lỗi (không có gì để parse)"""
+        self.slots.release()
+
+    def submit(self, raw: bytes, with_nb_title: bool = False,
+               cached_selector: Optional[str] = None) -> Future:
+        """Đưa bytes đã tải (đã reserve) sang process parse; chỗ được trả khi parse xong"""
+        try:
+            future = self.executor.submit(parse_page, raw, with_nb_title, cached_selector)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def print_stats(self):
+        print(f"🧩 Parse: {self.processes} process, hàng đợi tối đa {self.max_pending} trang, "
+              f"fetch phải chờ {self.waits} lần ({self.wait_time:.1f}s)")
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Chạy cả pipeline (cào → làm sạch → gộp → chuẩn hóa tag) và chỉ chạy lại phần bị ảnh hưởng
+
+Mỗi bước ghi lại hash nội dung (sha256) của các file input + script của nó vào
+.cache/pipeline/state.json. Lần chạy sau, bước nào input không đổi và output còn nguyên thì bỏ qua;
+bước theo thư mục (làm sạch, cào) chỉ chạy cho các thư mục có thay đổi và chạy song song.
+
+    [cào]        cao/caornn theo thư mục   (chỉ khi có --crawl, chạy lần lượt từng thư mục)
+    làm sạch     tienxuly.py / tienxuly_rnn.py   theo thư mục, song song
+    gộp          gop.py data_clean.json / data_rnn_clean.json  → data.json / data_rnn.json
+    chuẩn tag    chuanhoatag.py data.json / data_rnn.json
+    gần trùng    near_dup.py data_rnn.json   (cập nhật index MinHash, báo cụm gần trùng / mâu thuẫn nhãn)
+
+Log của từng bước: .cache/pipeline/logs/<bước>.log
+
+Cách dùng:
+    python pipeline.py                      # mọi thư mục thành viên trong thư mục hiện tại
+    python pipeline.py NĐT Thiện Q.Huy
+    python pipeline.py --crawl --jobs=4 NĐT Thiện
+    python pipeline.py --dry-run            # chỉ in các bước sẽ chạy
+    python pipeline.py --force              # bỏ qua cache, chạy lại tất cả
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from cao import parse_args
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PIPELINE_DIR = os.path.join('.cache', 'pipeline')
+STATE_FILE = os.path.join(PIPELINE_DIR, 'state.json')
+LOG_DIR = os.path.join(PIPELINE_DIR, 'logs')
+
+# File đánh dấu 1 thư mục là thư mục thành viên
+MEMBER_FILES = ('links.txt', 'linksnew.txt', 'data.json', 'data_rnn.json')
+
+
+class Stage:
+    """1 lệnh python <script> <args> với danh sách file input / output"""
+
+    def __init__(self, name: str, script: str, args: List[str], inputs: List[str],
+                 outputs: List[str], serial: bool = False):
+        self.name = name
+        self.script = script
+        self.args = args
+        self.inputs = inputs
+        self.outputs = outputs
+        self.serial = serial      # True: không chạy song song với bước khác cùng nhóm (VD: cào)
+
+    def command(self) -> List[str]:
+        return [sys.executable, os.path.join(ROOT, self.script), *self.args]
+
+
+# ──────────────────────────────────────────────────────────────────
+# HASH + TRẠNG THÁI
+# ──────────────────────────────────────────────────────────────────
+class PipelineState:
+    """
+    stages: tên bước → {file input: sha256} lần chạy thành công gần nhất
+    files:  đường dẫn → [size, mtime_ns, sha256] để không phải hash lại file không đổi
+    """
+
+    def __init__(self, path: str = STATE_FILE):
+        self.path = path
+        self.stages: Dict[str, Dict[str, str]] = {}
+        self.files: Dict[str, list] = {}
+        if os.path.isfile(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.stages = data.get('stages', {})
+                self.files = data.get('files', {})
+            except Exception as e:
+                print(f"⚠️  Không đọc được {path}: {e}")
+
+    def digest(self, path: str) -> Optional[str]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        cached = self.files.get(path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(block)
+        self.files[path] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+        return h.hexdigest()
+
+    def fingerprint(self, stage: Stage) -> Dict[str, Optional[str]]:
+        paths = [os.path.join(ROOT, stage.script), *stage.inputs]
+        return {path: self.digest(path) for path in paths}
+
+    def is_fresh(self, stage: Stage) -> bool:
+        recorded = self.stages.get(stage.name)
+        return (recorded is not None
+                and recorded == self.fingerprint(stage)
+                and all(os.path.exists(path) for path in stage.outputs))
+
+    def record(self, stage: Stage):
+        # Hash sau khi chạy: bước sửa tại chỗ (chuẩn hóa tag) có input = output
+        self.stages[stage.name] = self.fingerprint(stage)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'stages': self.stages, 'files': self.files}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+
+# ──────────────────────────────────────────────────────────────────
+# CÁC BƯỚC
+# ──────────────────────────────────────────────────────────────────
+def find_member_folders() -> List[str]:
+    return sorted(
+        d for d in os.listdir('.')
+        if os.path.isdir(d) and not d.startswith(('.', '_'))
+        and any(os.path.isfile(os.path.join(d, name)) for name in MEMBER_FILES)
+    )
+
+
+def build_groups(folders: List[str], crawl: bool = False) -> List[List[Stage]]:
+    """Các nhóm bước theo thứ tự; bước trong cùng 1 nhóm độc lập với nhau"""
+    groups = []
+
+    if crawl:
+        groups.append([
+            Stage(f'crawl:{folder}', 'caornn.py', ['--both', '--links=links.txt', folder],
+                  [os.path.join(folder, 'links.txt')],
+                  [os.path.join(folder, 'data.json'), os.path.join(folder, 'data_rnn.json')],
+                  serial=True)
+            for folder in folders
+            if os.path.isfile(os.path.join(folder, 'links.txt'))
+        ])
+
+    clean = []
+    for folder in folders:
+        for script, base in (('tienxuly.py', 'data'), ('tienxuly_rnn.py', 'data_rnn')):
+            source = os.path.join(folder, f'{base}.json')
+            if os.path.isfile(source) or crawl:
+                clean.append(Stage(f'{script[:-3]}:{folder}', script, [folder], [source],
+                                   [os.path.join(folder, f'{base}_clean.json'),
+                                    os.path.join(folder, f'{base}_error.json')]))
+    groups.append(clean)
+
+    merge = []
+    tags = []
+    for base in ('data', 'data_rnn'):
+        # Thư mục đã có file sạch, hoặc sẽ có sau bước làm sạch ở trên
+        sources = [f for f in folders
+                   if crawl or any(os.path.isfile(os.path.join(f, f'{base}{suffix}.json'))
+                                   for suffix in ('', '_clean'))]
+        if not sources:
+            continue
+        merge.append(Stage(f'gop:{base}', 'gop.py',
+                           [f'{base}_clean.json', *sources, f'--output={base}.json'],
+                           [os.path.join(f, f'{base}_clean.json') for f in sources],
+                           [f'{base}.json']))
+        tags.append(Stage(f'chuanhoatag:{base}', 'chuanhoatag.py', [f'{base}.json'],
+                          [f'{base}.json'], [f'{base}.json']))
+    groups.append(merge)
+    groups.append(tags)
+    if any(stage.name == 'chuanhoatag:data_rnn' for stage in tags):
+        groups.append([Stage('near_dup:data_rnn', 'near_dup.py', ['data_rnn.json'], ['data_rnn.json'],
+                             ['data_rnn.neardup.sqlite3'])])
+    return [group for group in groups if group]
+
+
+def run_stage(stage: Stage) -> bool:
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_path = os.path.join(LOG_DIR, stage.name.replace(':', '_').replace(os.sep, '_') + '.log')
+    with open(log_path, 'w', encoding='utf-8') as log:
+        proc = subprocess.run(stage.command(), stdout=log, stderr=subprocess.STDOUT,
+                              env=dict(os.environ, PYTHONIOENCODING='utf-8'))
+    if proc.returncode != 0:
+        with open(log_path, 'r', encoding='utf-8', errors='replace') as f:
+            tail = f.read().strip().splitlines()[-5:]
+        print(f"   ❌ {stage.name} lỗi (exit {proc.returncode}), log: {log_path}")
+        for line in tail:
+            print(f"      {line}")
+        return False
+    return True
+
+
+def run_pipeline(groups: List[List[Stage]], state: PipelineState, jobs: int,
+                 force: bool = False, dry_run: bool = False) -> bool:
+    for group in groups:
+        # Bước trước đã chạy làm đổi input → is_fresh tự phát hiện qua hash
+        stale = [stage for stage in group if force or not state.is_fresh(stage)]
+        skipped = len(group) - len(stale)
+        label = group[0].name.split(':')[0]
+        print(f"\n▶ {label}: {len(stale)} bước cần chạy, {skipped} bước không đổi (bỏ qua)")
+        for stage in stale:
+            print(f"   • {stage.name}")
+        if dry_run or not stale:
+            continue
+
+        start = time.perf_counter()
+        serial = [s for s in stale if s.serial]
+        parallel = [s for s in stale if not s.serial]
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            for stage, ok in zip(parallel, executor.map(run_stage, parallel)):
+                results[stage] = ok
+        for stage in serial:
+            results[stage] = run_stage(stage)
+
+        failed = 0
+        for stage, ok in results.items():
+            if ok:
+                state.record(stage)
+            else:
+                failed += 1
+        state.save()
+        print(f"   ⏱  {time.perf_counter() - start:.1f}s")
+        if failed:
+            print(f"\n❌ {failed} bước lỗi, dừng pipeline")
+            return False
+    return True
+
+
+def main():
+    folders, options = parse_args(sys.argv[1:])
+    try:
+        jobs = int(options.get('jobs', os.cpu_count() or 1))
+    except ValueError:
+        print("❌ --jobs không hợp lệ!")
+        sys.exit(1)
+
+    if not folders:
+        folders = find_member_folders()
+    invalid = [f for f in folders if not os.path.isdir(f)]
+    if invalid:
+        print("⚠️  Thư mục không tồn tại (bỏ qua):", ', '.join(invalid))
+    folders = [f for f in folders if os.path.isdir(f)]
+    if not folders:
+        print("❌ Không có thư mục thành viên nào!")
+        print(__doc__)
+        sys.exit(1)
+
+    print("=" * 60)
+    print(f"🔗 PIPELINE: {len(folders)} thư mục ({', '.join(folders)})")
+    print("=" * 60)
+
+    state = PipelineState()
+    start = time.perf_counter()
+    ok = run_pipeline(build_groups(folders, bool(options.get('crawl'))), state, jobs,
+                      force=bool(options.get('force')), dry_run=bool(options.get('dry-run')))
+
+    print("\n" + "=" * 60)
+    print(f"{'🎉 HOÀN TẤT' if ok else '❌ DỪNG'} sau {time.perf_counter() - start:.1f}s")
+    print("=" * 60)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cào lại các bản ghi bị tienxuly.py / tienxuly_rnn.py loại ra
+
+Đọc <thư_mục>/data_error.json (hoặc data_rnn_error.json với --rnn), chỉ fetch lại các URL
+trong đó với timeout dài hơn và nhiều lần thử lại hơn. Bản ghi sửa được:
+    - thêm vào data_clean.json / data_rnn_clean.json
+    - xóa khỏi data_error.json / data_rnn_error.json
+    - cập nhật luôn trong data.json / data_rnn.json (và journal của scraper nếu có)
+để chạy lại tienxuly không làm mất kết quả. Bản ghi vẫn lỗi được giữ lại trong file lỗi
+kèm thông tin lỗi mới.
+
+Cách dùng:
+    python recrawl.py thinh                  # dữ liệu Naive Bayes (data_error.json)
+    python recrawl.py --rnn thinh thien      # dữ liệu RNN (data_rnn_error.json)
+    python recrawl.py --timeout=60 --retries=5 thinh
+    python recrawl.py --cache thinh          # dùng cache HTML nhưng luôn hỏi lại server (ETag/Last-Modified)
+
+Mặc định không dùng cache HTML: bản ghi bị loại vì nội dung hỏng (trang vẫn trả 200) sẽ nhận lại
+đúng bản cache hỏng đó mà không gọi mạng.
+"""
+
+import json
+import os
+import sys
+import time
+from typing import Dict
+
+from cao import TitleScraper, parse_args
+from caornn import RNNScraper
+from crawl_errors import FetchGuard, NegativeCache
+from crawl_journal import CrawlJournal
+from http_cache import HTMLCache
+import tienxuly
+import tienxuly_rnn
+
+
+# (file gốc, file sạch, file lỗi) của từng loại dữ liệu
+FILES = {
+    'nb':  ('data.json', 'data_clean.json', 'data_error.json'),
+    'rnn': ('data_rnn.json', 'data_rnn_clean.json', 'data_rnn_error.json'),
+}
+
+
+def load_json(path: str) -> Dict[str, dict]:
+    if not os.path.isfile(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_json(path: str, data: Dict[str, dict]):
+    """Ghi ra file tạm rồi os.replace để không làm hỏng file cũ khi bị ngắt"""
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+class Recrawler:
+    """Fetch lại danh sách URL lỗi bằng TitleScraper (NB) hoặc RNNScraper (RNN)"""
+
+    def __init__(self, rnn: bool = False, timeout: int = 30, retries: int = 5,
+                 cache: HTMLCache = None):
+        self.rnn = rnn
+        self.timeout = timeout
+        # Không đọc negative cache: mục đích của lần chạy này chính là thử lại các link đó
+        guard = FetchGuard(retries=retries, backoff=2.0, max_backoff=60.0)
+        if rnn:
+            self.scraper = RNNScraper(cache=cache, guard=guard)
+            self.is_error = tienxuly_rnn.is_error
+        else:
+            self.scraper = TitleScraper(cache=cache, guard=guard)
+            self.is_error = tienxuly.is_error
+        self.guard = guard
+        self.negative_cache = NegativeCache()
+
+    def fetch(self, url: str, tag: str) -> dict:
+        """Fetch lại 1 URL, trả về bản ghi mới (cùng format với scraper)"""
+        if self.rnn:
+            title, content, _, failure = self.scraper.fetch_result(url, self.timeout)
+            record = {"title": title, "content": content, "tag": tag}
+        else:
+            title, failure = self.scraper.get_title_result(url, self.timeout)
+            record = {"title": title, "tag": tag}
+        if failure is not None:
+            record["error"] = failure.to_dict()
+        return record
+
+    def recrawl_folder(self, folder: str, delay: float = 1.0) -> bool:
+        source_name, clean_name, error_name = FILES['rnn' if self.rnn else 'nb']
+        source_file = os.path.join(folder, source_name)
+        clean_file = os.path.join(folder, clean_name)
+        error_file = os.path.join(folder, error_name)
+
+        if not os.path.isfile(error_file):
+            print(f"⚠️  Không tìm thấy {error_file} (chạy tienxuly trước)")
+            return False
+
+        errors = load_json(error_file)
+        if not errors:
+            print(f"✅ {error_file} không có bản ghi lỗi nào")
+            return True
+
+        print(f"📂 {error_file}: {len(errors)} bản ghi lỗi, timeout {self.timeout}s\n")
+
+        fixed: Dict[str, dict] = {}
+        still_broken: Dict[str, dict] = {}
+        for i, (url, info) in enumerate(errors.items(), 1):
+            print(f"[{i}/{len(errors)}] 🔍 {url[:70]}")
+            record = self.fetch(url, info.get("tag", ""))
+            if self.is_error(record):
+                still_broken[url] = record
+                print(f"  ❌ {record['title'][:80]}")
+            else:
+                fixed[url] = record
+                self.negative_cache.remove(url)
+                print(f"  ✓ {record['title'][:80]}")
+            if i < len(errors):
+                time.sleep(delay)
+
+        if fixed:
+            # File sạch: thêm bản ghi đã sửa vào cuối
+            clean = load_json(clean_file)
+            clean.update(fixed)
+            save_json(clean_file, clean)
+
+            # File gốc: thay bản ghi lỗi tại chỗ, giữ nguyên thứ tự
+            if os.path.isfile(source_file):
+                source = load_json(source_file)
+                source.update(fixed)
+                save_json(source_file, source)
+
+            # Journal của scraper: lần export sau không ghi đè lại bản ghi lỗi cũ
+            journal = CrawlJournal(source_file)
+            if journal.exists():
+                for url, record in fixed.items():
+                    journal.append(url, record)
+
+        save_json(error_file, still_broken)
+
+        print(f"\n✅ Sửa được: {len(fixed)} → {clean_file}")
+        print(f"❌ Vẫn lỗi : {len(still_broken)} → {error_file}")
+        return True
+
+
+def main():
+    folders, options = parse_args(sys.argv[1:])
+
+    if not folders:
+        print("❌ Thiếu tên thư mục")
+        print("Ví dụ: python recrawl.py thinh")
+        print("       python recrawl.py --rnn thinh")
+        print("\n⚙️  Tùy chọn:")
+        print("   --rnn          Cào lại data_rnn_error.json thay vì data_error.json")
+        print("   --timeout=N    Timeout mỗi request (mặc định 30 giây)")
+        print("   --retries=N    Số lần thử lại khi lỗi tạm thời (mặc định 5)")
+        print("   --cache        Dùng cache HTML (.cache/html), luôn hỏi lại server trước khi dùng bản cũ")
+        sys.exit(1)
+
+    try:
+        timeout = max(1, int(options.get('timeout', 30)))
+        retries = max(0, int(options.get('retries', 5)))
+    except ValueError:
+        print("❌ --timeout / --retries không hợp lệ!")
+        sys.exit(1)
+
+    # max_age=0: không bao giờ dùng thẳng bản cache, chỉ dùng lại khi server trả 304
+    cache = HTMLCache(max_age=0) if options.get('cache') else None
+    recrawler = Recrawler(rnn=bool(options.get('rnn')), timeout=timeout,
+                          retries=retries, cache=cache)
+
+    for folder in folders:
+        if not os.path.isdir(folder):
+            print(f"❌ Thư mục '{folder}' không tồn tại")
+            continue
+        print("=" * 60)
+        print(f"🔁 CÀO LẠI: {folder}")
+        print("=" * 60)
+        recrawler.recrawl_folder(folder)
+
+    print("=" * 60)
+    if cache is not None:
+        cache.print_stats()
+    recrawler.guard.print_stats()
+
+
+if __name__ == "__main__":
+    main()
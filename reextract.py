@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Trích xuất lại tiêu đề + 100 từ đầu từ kho HTML thô (.cache/archive), không gọi mạng
+
+Dùng sau khi sửa CONTENT_SELECTORS / luật 100 từ trong extractors.py: thay vì cào lại cả
+thư mục, chạy lại get_title + get_content_100_words trên các trang caornn.py đã lưu,
+song song trên mọi lõi CPU (parse_pool.ParsePool).
+
+Link chưa có trong kho (cào trước khi có kho, hoặc bị lỗi) giữ nguyên bản ghi cũ.
+Kết quả ghi qua journal như caornn.py nên lần cào tiếp theo vẫn resume đúng.
+
+Cách dùng:
+    python reextract.py NĐT Thiện
+    python reextract.py --both --links=links.txt NĐT     # ghi cả data.json + data_rnn.json
+    python reextract.py --workers=4 --parser=soup NĐT
+"""
+
+import os
+import sys
+import time
+
+from caornn import RNNScraper, output_names, parse_args
+from crawl_errors import classify
+from crawl_journal import CrawlJournal
+from html_archive import HTMLArchive
+from label_stats import update_from_journal
+from parse_pool import ParsePool
+
+
+def reextract_folder(folder: str, archive: HTMLArchive, pool: ParsePool,
+                     links_name: str = 'linksnew.txt', both: bool = False) -> bool:
+    rnn_name, nb_name = output_names(links_name, both)
+    input_file = os.path.join(folder, links_name)
+    output_file = os.path.join(folder, rnn_name)
+    nb_output_file = os.path.join(folder, nb_name) if nb_name else None
+
+    if not os.path.isfile(input_file):
+        print(f"❌ Không tìm thấy '{input_file}'")
+        return False
+
+    print("=" * 60)
+    print(f"🎯 THƯ MỤC: {folder.upper()}")
+    print(f"   Input : {input_file} + {archive.archive_dir}")
+    print(f"   Output: {output_file}" + (f", {nb_output_file}" if nb_output_file else ""))
+    print("=" * 60)
+
+    links = list(dict.fromkeys(RNNScraper.read_links(input_file)))
+    journal = CrawlJournal(output_file)
+    journal.seed_from(output_file)
+    nb_journal = None
+    if nb_output_file:
+        nb_journal = CrawlJournal(nb_output_file)
+        nb_journal.seed_from(nb_output_file)
+
+    # Đọc kho tuần tự ở thread chính, parse song song; reserve() chặn khi parse không theo kịp
+    jobs = []
+    missing = 0
+    for url, tag in links:
+        pool.reserve()
+        raw = archive.get(url)
+        if raw is None:
+            pool.release()
+            missing += 1
+            continue
+        jobs.append((url, tag, pool.submit(raw, both, None)))
+
+    failed = 0
+    for url, tag, future in jobs:
+        try:
+            parsed = future.result()
+        except Exception as e:
+            failed += 1
+            print(f"  ⚠️  {url[:70]}: {classify(url, e).title}")
+            continue
+        journal.append(url, {
+            "title":   parsed['title'],
+            "content": parsed['content'],
+            "tag":     tag,
+        })
+        if nb_journal is not None:
+            nb_journal.append(url, {
+                "title": parsed['nb_title'],
+                "tag":   tag,
+            })
+
+    order = [url for url, _ in links]
+    total = journal.export(output_file, order)
+    update_from_journal(output_file, journal)
+    if nb_journal is not None:
+        nb_journal.export(nb_output_file, order)
+        update_from_journal(nb_output_file, nb_journal)
+
+    print(f"✅ Trích xuất lại {len(jobs) - failed}/{len(links)} bài, "
+          f"{missing} link chưa có trong kho (giữ bản cũ), {failed} lỗi parse")
+    print(f"✅ Đã lưu {total} bài vào: {output_file}\n")
+    return True
+
+
+def main():
+    folder_names, options = parse_args(sys.argv[1:])
+
+    if not folder_names:
+        print("❌ Thiếu tên thư mục!")
+        print(__doc__)
+        sys.exit(1)
+
+    try:
+        workers = int(options.get('workers', 0)) or None
+    except ValueError:
+        print("❌ --workers không hợp lệ!")
+        sys.exit(1)
+
+    valid = [f for f in folder_names if os.path.isdir(f)]
+    invalid = [f for f in folder_names if not os.path.isdir(f)]
+    if invalid:
+        print("⚠️  Thư mục không tồn tại (bỏ qua):", ', '.join(invalid))
+    if not valid:
+        print("❌ Không có thư mục hợp lệ!")
+        sys.exit(1)
+
+    archive = HTMLArchive()
+    if not len(archive):
+        print(f"❌ Kho {archive.archive_dir} trống — cào bằng caornn.py trước")
+        sys.exit(1)
+
+    try:
+        pool = ParsePool(workers, str(options.get('parser', 'lxml')))
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print(f"♻️  TRÍCH XUẤT LẠI {len(valid)} THƯ MỤC từ {len(archive)} trang đã lưu "
+          f"({pool.processes} process)")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    success = 0
+    try:
+        for folder in valid:
+            if reextract_folder(folder, archive, pool, str(options.get('links', 'linksnew.txt')),
+                                bool(options.get('both'))):
+                success += 1
+    finally:
+        pool.close()
+
+    print("=" * 60)
+    print(f"📊 TỔNG KẾT: {success}/{len(valid)} thư mục, {time.perf_counter() - start:.1f}s")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import tensorflow as tf
 from keras.saving import register_keras_serializable
-from underthesea import word_tokenize
+
+from tokenize_cache import tokenize_batch, word_tokenize   # word_tokenize của underthesea + cache trên đĩa
 
 # Danh sách stopwords dùng khi train RNN
 STOPWORDS = {
@@ -34,6 +35,36 @@ def build_input(title: str, content: str) -> str:
     return title_proc
 
 
+def preprocess_batch(texts, stopwords=STOPWORDS, workers: int = None) -> list:
+    """
+    Như [preprocess(t) for t in texts], giữ nguyên thứ tự.
+    Tách từ cả lô qua tokenize_batch: văn bản chưa có trong cache được tách song song
+    trên nhiều process, lô nhỏ tách ngay trong process hiện tại. Module này đã import
+    TensorFlow nên không fork nữa: notebook dùng forkserver / spawn, script tách tại chỗ
+    (xem tokenize_cache._pool_context).
+    stopwords: script train dùng danh sách riêng thì truyền vào.
+    """
+    tokenized = tokenize_batch([str(text).lower() for text in texts], workers=workers)
+    return [" ".join(t for t in line.split() if t not in stopwords) for line in tokenized]
+
+
+def build_input_batch(titles, contents=None, stopwords=STOPWORDS, workers: int = None) -> list:
+    """
+    Như [build_input(t, c) for t, c in zip(titles, contents)], giữ nguyên thứ tự.
+    Tiêu đề và nội dung (khác rỗng) được tách từ chung 1 lô.
+    """
+    titles = list(titles)
+    contents = list(contents) if contents is not None else [""] * len(titles)
+    has_content = [i for i, content in enumerate(contents) if content]
+    processed = preprocess_batch(titles + [contents[i] for i in has_content], stopwords, workers)
+
+    results = processed[:len(titles)]
+    for i, content_proc in zip(has_content, processed[len(titles):]):
+        if content_proc:
+            results[i] = f"{results[i]} [SEP] {content_proc}"
+    return results
+
+
 @register_keras_serializable(package="custom")
 class AttentionLayer(tf.keras.layers.Layer):
     """
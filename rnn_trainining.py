@@ -26,13 +26,16 @@ import numpy as np
 import matplotlib.pyplot as plt
 import joblib
 
-import tensorflow as tf
-from tensorflow.keras import layers, Model
-from tensorflow.keras.preprocessing.text import Tokenizer
-from tensorflow.keras.preprocessing.sequence import pad_sequences
-from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau, ModelCheckpoint
-
-from underthesea import word_tokenize
+# TensorFlow được import ở CELL 6, sau bước tách từ: tokenize_batch chạy song song bằng cách fork
+# process con, mà fork sau khi TensorFlow đã khởi tạo (thread nền) có thể làm process con bị treo
+try:
+    # Cache tách từ trên đĩa (upload thêm tokenize_cache.py): train / đánh giá lại không phải tách lại,
+    # tách cả lô song song nhiều process
+    from tokenize_cache import word_tokenize, tokenize_batch, print_stats as print_tokenize_stats
+except ImportError:
+    from underthesea import word_tokenize
+    tokenize_batch = lambda texts: [word_tokenize(t, format="text") for t in texts]
+    print_tokenize_stats = lambda: None
 from sklearn.preprocessing import MultiLabelBinarizer
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import (
@@ -40,9 +43,6 @@ from sklearn.metrics import (
     roc_curve, auc, classification_report
 )
 
-print("TensorFlow:", tf.__version__)
-print("GPU:", tf.config.list_physical_devices('GPU'))
-
 # ── CELL 3: CẤU HÌNH ────────────────────────────────────────────
 # Chỉnh các thông số tại đây, không cần sửa ở chỗ khác
 
@@ -92,13 +92,37 @@ def build_input(title: str, content: str) -> str:
         return f"{title_proc} [SEP] {content_proc}"
     return title_proc
 
+def preprocess_batch(texts: list) -> list:
+    """
+    Như [preprocess(t) for t in texts]: tách từ cả lô 1 lần qua tokenize_batch
+    (văn bản chưa có trong cache được tách song song trên nhiều process)
+    """
+    tokenized = tokenize_batch([text.lower() for text in texts])
+    return [" ".join(t for t in line.split() if t not in STOPWORDS) for line in tokenized]
+
+def build_input_batch(titles: list, contents: list = None) -> list:
+    """Như [build_input(t, c) for t, c in zip(titles, contents)]; tiêu đề + nội dung tách chung 1 lô"""
+    contents = contents if contents is not None else [""] * len(titles)
+    has_content = [i for i, content in enumerate(contents) if content]
+    processed = preprocess_batch(list(titles) + [contents[i] for i in has_content])
+    results = processed[:len(titles)]
+    for i, content_proc in zip(has_content, processed[len(titles):]):
+        if content_proc:
+            results[i] = f"{results[i]} [SEP] {content_proc}"
+    return results
+
 # ── CELL 5: NẠP DỮ LIỆU ─────────────────────────────────────────
 # Upload data_rnn.json lên Colab trước:
 # from google.colab import files
 # files.upload()
 
-with open(FILE_PATH, 'r', encoding='utf-8') as f:
-    data = json.load(f)
+# FILE_PATH là .corpus (corpus_store.py) thì upload thêm corpus_store.py, đọc nhanh hơn JSON
+if FILE_PATH.endswith('.corpus'):
+    from corpus_store import load_data
+    data = load_data(FILE_PATH)
+else:
+    with open(FILE_PATH, 'r', encoding='utf-8') as f:
+        data = json.load(f)
 
 # Keyword augmentation — bổ sung mẫu cho nhãn ít dữ liệu
 # Chỉ dùng tiêu đề (không có content) vì là mẫu tổng hợp
@@ -152,8 +176,10 @@ EXTENDED = [
 
 # ── Xây dựng X (text) và y (nhãn) ──
 X_all, y_all_raw = [], []
+texts_raw = []   # tiêu đề + nội dung gốc, để tìm bài gần trùng
 
 # Dữ liệu thật từ data_rnn.json — dùng title + content
+titles, contents = [], []
 for url, item in data.items():
     title   = item.get('title', '')
     content = item.get('content', '')
@@ -162,26 +188,34 @@ for url, item in data.items():
     if not title or not tag_str or title.startswith('Lỗi'):
         continue
 
-    combined = build_input(title, content)
     tags = [t.strip().lower() for t in tag_str.split(',')]
 
-    X_all.append(combined)
+    titles.append(title)
+    contents.append(content)
     y_all_raw.append(tags)
+    texts_raw.append(f"{title} {content}")
+
+# Tách từ cả lô 1 lần (song song, có cache) thay vì gọi build_input từng bài
+X_all.extend(build_input_batch(titles, contents))
 
 n_real = len(X_all)
 print(f"Dữ liệu thật: {n_real} bài")
 
 # Keyword augmentation — chỉ dùng tiêu đề ngắn
+augmented = []
 for tag, words in KEYWORDS.items():
     for word in words:
-        X_all.append(preprocess(f"Thông tin về {word} gây chú ý"))
+        augmented.append(f"Thông tin về {word} gây chú ý")
         y_all_raw.append([tag])
 
 for title, tag_str in EXTENDED:
-    X_all.append(preprocess(title))
+    augmented.append(title)
     y_all_raw.append([t.strip().lower() for t in tag_str.split(',')])
 
+X_all.extend(preprocess_batch(augmented))
+
 print(f"Sau augmentation : {len(X_all)} mẫu  (+{len(X_all)-n_real} mẫu tổng hợp)")
+print_tokenize_stats()
 
 # MLB
 mlb = MultiLabelBinarizer(classes=CATEGORIES)
@@ -193,13 +227,37 @@ label_counts = y_all.sum(axis=0)
 for cat, cnt in zip(mlb.classes_, label_counts):
     print(f"  {cat:<15}: {int(cnt)} mẫu")
 
-# Train / Test split
-X_train_raw, X_test_raw, y_train, y_test = train_test_split(
-    X_all, y_all, test_size=TEST_SIZE, random_state=42
-)
+# Nhóm gần trùng: bài thật cùng 1 tin (nhiều báo đăng lại) chung nhóm, mẫu tổng hợp mỗi mẫu 1 nhóm
+# → upload thêm near_dup.py, chuanhoatag.py, corpus_store.py (MinHash + LSH)
+try:
+    from near_dup import group_ids, group_train_test_split
+    groups = group_ids(texts_raw) + list(range(n_real, len(X_all)))
+    print(f"Gần trùng: {n_real - len(set(groups[:n_real]))} bài thật nằm chung cụm với bài khác")
+except ImportError:
+    print("⚠️  Chưa có near_dup.py → chia ngẫu nhiên (bài gần trùng có thể rơi vào cả train lẫn test)")
+    groups = None
+
+# Train / Test split — theo nhóm gần trùng nếu có
+if groups is not None:
+    X_train_raw, X_test_raw, y_train, y_test, groups_train, _ = group_train_test_split(
+        X_all, y_all, groups, groups=groups, test_size=TEST_SIZE, random_state=42
+    )
+else:
+    X_train_raw, X_test_raw, y_train, y_test = train_test_split(
+        X_all, y_all, test_size=TEST_SIZE, random_state=42
+    )
 print(f"\nTrain: {len(X_train_raw)} | Test: {len(X_test_raw)}")
 
 # ── CELL 6: TOKENIZE & PADDING ──────────────────────────────────
+import tensorflow as tf
+from tensorflow.keras import layers, Model
+from tensorflow.keras.preprocessing.text import Tokenizer
+from tensorflow.keras.preprocessing.sequence import pad_sequences
+from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau, ModelCheckpoint
+
+print("TensorFlow:", tf.__version__)
+print("GPU:", tf.config.list_physical_devices('GPU'))
+
 # Fit tokenizer chỉ trên tập train để tránh data leakage
 tokenizer = Tokenizer(
     num_words=VOCAB_SIZE,
@@ -494,9 +552,14 @@ class MacroF1Callback(tf.keras.callbacks.Callback):
         print(f"  val_f1={f1:.4f} (best={self.best:.4f})")
 
 # Tách validation từ train
-X_tr, X_val, y_tr, y_val = train_test_split(
-    X_train_seq, y_train, test_size=VAL_SIZE, random_state=42
-)
+if groups is not None:
+    X_tr, X_val, y_tr, y_val = group_train_test_split(
+        X_train_seq, y_train, groups=groups_train, test_size=VAL_SIZE, random_state=42
+    )
+else:
+    X_tr, X_val, y_tr, y_val = train_test_split(
+        X_train_seq, y_train, test_size=VAL_SIZE, random_state=42
+    )
 print(f"Train thực: {len(X_tr)} | Val: {len(X_val)} | Test: {len(X_test_seq)}")
 
 f1_callback = MacroF1Callback(X_val, y_val)
@@ -749,7 +812,7 @@ def predict(titles: list, contents: list = None, threshold: float = None) -> lis
     if contents is None:
         contents = [''] * len(titles)
 
-    texts = [build_input(t, c) for t, c in zip(titles, contents)]
+    texts = build_input_batch(titles, contents)
     seqs  = pad_sequences(
         tokenizer.texts_to_sequences(texts),
         maxlen=MAX_LEN, padding='post', truncating='post'
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Đo đạc quá trình cào cho cao.py và caornn.py
+
+- Thời gian từng giai đoạn của mỗi request, theo tên miền:
+    dns       phân giải tên miền (chỉ khi mở kết nối mới)
+    connect   bắt tay TCP
+    tls       bắt tay TLS (https)
+    ttfb      từ lúc gửi request tới khi nhận header (gồm cả dns/connect/tls nếu có)
+    download  đọc body
+    parse     parse HTML + trích xuất tiêu đề/nội dung
+    total     cả lần fetch 1 URL, gồm cả các lần thử lại (giữ từng mẫu → p50/p99 chính xác)
+- Bộ đếm theo tên miền: số trang thành công/lỗi (theo loại lỗi), cache hit, số byte tải
+- Cuối lần chạy: in bảng tóm tắt, ghi file JSON + file Prometheus text format
+  (.cache/metrics/<tên>-<thời điểm>.json và <tên>.prom) để so sánh giữa các lần chạy
+"""
+
+import bisect
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from crawl_errors import host_of
+
+
+METRICS_DIR = os.path.join('.cache', 'metrics')
+
+# Cận trên (giây) của các bucket histogram
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float('inf'))
+
+# Giai đoạn giữ lại từng mẫu (1 số / URL) để tính phân vị chính xác thay vì nội suy trong bucket
+SAMPLED_STAGES = ('total',)
+
+
+def domain_of(url: str) -> str:
+    host = host_of(url)
+    return host[4:] if host.startswith('www.') else host
+
+
+class Histogram:
+    """
+    Histogram theo BUCKETS, ước lượng phân vị bằng nội suy tuyến tính trong bucket.
+    keep_samples=True: giữ thêm từng mẫu, phân vị tính chính xác từ các mẫu đó.
+    """
+
+    def __init__(self, keep_samples: bool = False):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.samples: Optional[List[float]] = [] if keep_samples else None
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if self.samples is not None:
+            self.samples.append(seconds)
+
+    def merge(self, other: 'Histogram'):
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.count += other.count
+        self.sum += other.sum
+        if self.samples is not None:
+            # Gộp với histogram không giữ mẫu → chỉ còn ước lượng theo bucket
+            self.samples = self.samples + other.samples if other.samples is not None else None
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        if self.samples is not None:
+            # Nội suy giữa 2 mẫu kề nhau (như numpy.quantile mặc định)
+            ordered = sorted(self.samples)
+            position = q * (len(ordered) - 1)
+            lower = int(position)
+            upper = min(lower + 1, len(ordered) - 1)
+            return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if BUCKETS[i] != float('inf') else lower * 2 or 1.0
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return BUCKETS[-2]
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'p50': round(self.quantile(0.5), 6),
+            'p95': round(self.quantile(0.95), 6),
+            'p99': round(self.quantile(0.99), 6),
+            'exact': self.samples is not None,
+            'buckets': {('+Inf' if le == float('inf') else str(le)): n
+                        for le, n in zip(BUCKETS, self.counts)},
+        }
+
+
+class CrawlMetrics:
+    """Gom số liệu của 1 lần chạy, an toàn khi gọi từ nhiều thread"""
+
+    def __init__(self, name: str = 'crawl'):
+        self.name = name
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.stages: Dict[str, Dict[str, Histogram]] = {}   # domain → stage → Histogram
+        self.counters: Dict[str, Dict[str, int]] = {}      # domain → tên bộ đếm → giá trị
+
+    # ──────────────────────────────────────────────────────────────
+    # GHI NHẬN
+    # ──────────────────────────────────────────────────────────────
+    def observe(self, domain: str, stage: str, seconds: float):
+        with self.lock:
+            stages = self.stages.setdefault(domain, {})
+            histogram = stages.get(stage)
+            if histogram is None:
+                histogram = stages[stage] = Histogram(keep_samples=stage in SAMPLED_STAGES)
+            histogram.observe(max(0.0, seconds))
+
+    def count(self, domain: str, key: str, n: int = 1):
+        with self.lock:
+            counters = self.counters.setdefault(domain, {})
+            counters[key] = counters.get(key, 0) + n
+
+    @contextmanager
+    def timer(self, url: str, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(domain_of(url), stage, time.perf_counter() - start)
+
+    def record_response(self, url: str, resp, elapsed: float):
+        """
+        Ghi nhận 1 response đã đọc xong body (session.get hoặc HTMLCache.get).
+        elapsed: thời gian cả lời gọi; ttfb lấy từ resp.elapsed, phần còn lại là download.
+        """
+        domain = domain_of(url)
+        if getattr(resp, 'from_cache', False):
+            self.count(domain, 'cache_hit')
+            return
+        ttfb = resp.elapsed.total_seconds()
+        self.observe(domain, 'ttfb', ttfb)
+        self.observe(domain, 'download', elapsed - ttfb)
+        self.count(domain, 'bytes', len(resp.content))
+        self.count(domain, 'requests')
+
+    def record_result(self, url: str, seconds: float, failure=None):
+        """Ghi nhận kết quả cuối cùng của 1 URL (sau FetchGuard)"""
+        domain = domain_of(url)
+        if failure is None:
+            self.count(domain, 'ok')
+        else:
+            self.count(domain, 'failed')
+            self.count(domain, 'error_' + failure.kind)
+            if failure.cached:
+                return
+        self.observe(domain, 'total', seconds)
+
+    # ──────────────────────────────────────────────────────────────
+    # TỔNG HỢP / XUẤT
+    # ──────────────────────────────────────────────────────────────
+    def _totals(self):
+        """(histogram gộp theo stage, bộ đếm gộp) của mọi tên miền"""
+        stages: Dict[str, Histogram] = {}
+        counters: Dict[str, int] = {}
+        with self.lock:
+            for per_domain in self.stages.values():
+                for stage, histogram in per_domain.items():
+                    if stage not in stages:
+                        stages[stage] = Histogram(keep_samples=stage in SAMPLED_STAGES)
+                    stages[stage].merge(histogram)
+            for per_domain in self.counters.values():
+                for key, value in per_domain.items():
+                    counters[key] = counters.get(key, 0) + value
+        return stages, counters
+
+    def to_dict(self) -> dict:
+        duration = time.time() - self.started
+        stages, counters = self._totals()
+        pages = counters.get('ok', 0) + counters.get('failed', 0)
+        with self.lock:
+            domains = {
+                domain: {
+                    'counters': dict(self.counters.get(domain, {})),
+                    'stages': {stage: h.to_dict() for stage, h in self.stages.get(domain, {}).items()},
+                }
+                for domain in sorted(set(self.stages) | set(self.counters))
+            }
+        return {
+            'name': self.name,
+            'started': self.started,
+            'duration_seconds': round(duration, 3),
+            'pages': pages,
+            'pages_per_second': round(pages / duration, 3) if duration > 0 else 0.0,
+            'counters': counters,
+            'stages': {stage: h.to_dict() for stage, h in stages.items()},
+            'domains': domains,
+        }
+
+    def to_prometheus(self) -> str:
+        """Số liệu dạng Prometheus text exposition format"""
+        data = self.to_dict()
+        prefix = 'ml2_crawl'
+        lines = [
+            f'# HELP {prefix}_duration_seconds Thời gian chạy',
+            f'# TYPE {prefix}_duration_seconds gauge',
+            f'{prefix}_duration_seconds{{job="{self.name}"}} {data["duration_seconds"]}',
+            f'# HELP {prefix}_pages_per_second Số trang xử lý mỗi giây',
+            f'# TYPE {prefix}_pages_per_second gauge',
+            f'{prefix}_pages_per_second{{job="{self.name}"}} {data["pages_per_second"]}',
+            f'# HELP {prefix}_events_total Bộ đếm theo tên miền (ok, failed, error_*, cache_hit, requests, bytes)',
+            f'# TYPE {prefix}_events_total counter',
+        ]
+        for domain, info in data['domains'].items():
+            for key, value in sorted(info['counters'].items()):
+                lines.append(f'{prefix}_events_total{{job="{self.name}",domain="{domain}",event="{key}"}} {value}')
+
+        lines += [
+            f'# HELP {prefix}_stage_seconds Thời gian từng giai đoạn fetch',
+            f'# TYPE {prefix}_stage_seconds histogram',
+        ]
+        for domain, info in data['domains'].items():
+            for stage, h in sorted(info['stages'].items()):
+                labels = f'job="{self.name}",domain="{domain}",stage="{stage}"'
+                cumulative = 0
+                for le, n in h['buckets'].items():
+                    cumulative += n
+                    lines.append(f'{prefix}_stage_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_sum{{{labels}}} {h["sum"]}')
+                lines.append(f'{prefix}_stage_seconds_count{{{labels}}} {h["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def save(self, prefix: str = None) -> str:
+        """
+        Ghi <prefix>.json và <prefix>.prom (mặc định .cache/metrics/<name>-<thời điểm>),
+        kèm bản .cache/metrics/<name>.prom luôn là lần chạy mới nhất. Trả về prefix đã dùng.
+        """
+        if prefix is None:
+            stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started))
+            prefix = os.path.join(METRICS_DIR, f'{self.name}-{stamp}')
+        os.makedirs(os.path.dirname(prefix) or '.', exist_ok=True)
+        with open(prefix + '.json', 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        prometheus = self.to_prometheus()
+        with open(prefix + '.prom', 'w', encoding='utf-8') as f:
+            f.write(prometheus)
+        if prefix.startswith(METRICS_DIR):
+            with open(os.path.join(METRICS_DIR, f'{self.name}.prom'), 'w', encoding='utf-8') as f:
+                f.write(prometheus)
+        return prefix
+
+    def print_summary(self, top: int = 15):
+        """Bảng tóm tắt: tổng theo giai đoạn + các tên miền nhiều trang nhất"""
+        data = self.to_dict()
+        counters = data['counters']
+        print(f"📈 Đo đạc: {data['pages']} trang trong {data['duration_seconds']:.1f}s "
+              f"({data['pages_per_second']:.2f} trang/s), "
+              f"tải {counters.get('bytes', 0) / 1024 / 1024:.1f} MB qua {counters.get('requests', 0)} request, "
+              f"{counters.get('cache_hit', 0)} cache hit")
+
+        # ttfb gồm cả dns/connect/tls → phần còn lại là thời gian chờ server trả lời
+        spent = {stage: data['stages'].get(stage, {}).get('sum', 0.0)
+                 for stage in ('dns', 'connect', 'tls', 'ttfb', 'download', 'parse')}
+        spent['ttfb'] = max(0.0, spent['ttfb'] - spent['dns'] - spent['connect'] - spent['tls'])
+        spent_total = sum(spent.values())
+        if spent_total:
+            parts = ', '.join(f"{'chờ server' if stage == 'ttfb' else stage} {seconds:.1f}s ({seconds / spent_total:.0%})"
+                              for stage, seconds in spent.items())
+            print(f"   Thời gian theo giai đoạn (cộng dồn các luồng): {parts}")
+
+        domains = sorted(data['domains'].items(),
+                         key=lambda item: -(item[1]['counters'].get('ok', 0) + item[1]['counters'].get('failed', 0)))
+        if not domains:
+            return
+        print(f"   {'Tên miền':30s} {'ok':>5s} {'lỗi':>5s} {'MB':>7s} {'ttfb p50':>9s} {'p95':>7s} {'total p99':>10s}")
+        for domain, info in domains[:top]:
+            c = info['counters']
+            ttfb = info['stages'].get('ttfb', {})
+            total = info['stages'].get('total', {})
+            print(f"   {domain[:30]:30s} {c.get('ok', 0):5d} {c.get('failed', 0):5d} "
+                  f"{c.get('bytes', 0) / 1024 / 1024:7.2f} "
+                  f"{ttfb.get('p50', 0) * 1000:7.0f}ms {ttfb.get('p95', 0) * 1000:5.0f}ms "
+                  f"{total.get('p99', 0) * 1000:8.0f}ms")
+        if len(domains) > top:
+            print(f"   ... và {len(domains) - top} tên miền khác")
+
+
+# ──────────────────────────────────────────────────────────────────
+# ĐO DNS / CONNECT / TLS Ở TẦNG KẾT NỐI urllib3
+# ──────────────────────────────────────────────────────────────────
+class _TimedConnectionMixin:
+    """
+    Tách phân giải DNS ra khỏi create_connection để đo riêng dns và connect:
+    tự gọi getaddrinfo rồi thử kết nối lần lượt từng địa chỉ (như create_connection của urllib3)
+    """
+
+    metrics: Optional[CrawlMetrics] = None
+
+    def _new_conn(self):
+        domain = domain_of(f'//{self.host}')
+        start = time.perf_counter()
+        try:
+            infos = socket.getaddrinfo(self._dns_host, self.port, 0, socket.SOCK_STREAM)
+        except OSError:
+            # Để urllib3 tự ném NameResolutionError như bình thường
+            return super()._new_conn()
+        resolved = time.perf_counter()
+        self.metrics.observe(domain, 'dns', resolved - start)
+
+        dns_host = self._dns_host
+        error = None
+        try:
+            for address in dict.fromkeys(info[4][0] for info in infos):
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except (NewConnectionError, ConnectTimeoutError) as e:
+                    error = e       # địa chỉ này không vào được (VD: IPv6 / 1 bản ghi A hỏng) → thử địa chỉ sau
+            else:
+                self._dns_host = dns_host
+                # Ném lại lỗi của địa chỉ cuối, thông báo mang tên miền thay vì IP
+                raise type(error)(self, f"Failed to establish a new connection: "
+                                        f"{error.__cause__ or error}") from error.__cause__
+        finally:
+            self._dns_host = dns_host
+        self._conn_seconds = time.perf_counter() - start
+        self.metrics.observe(domain, 'connect', time.perf_counter() - resolved)
+        return sock
+
+
+class _TimedHTTPSConnectionMixin(_TimedConnectionMixin):
+
+    def connect(self):
+        start = time.perf_counter()
+        self._conn_seconds = 0.0
+        super().connect()
+        # Phần còn lại sau khi mở socket là bắt tay TLS
+        self.metrics.observe(domain_of(f'//{self.host}'), 'tls',
+                             time.perf_counter() - start - self._conn_seconds)
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter dùng connection có đo dns/connect/tls, ghi vào `metrics`"""
+
+    def __init__(self, metrics: CrawlMetrics, *args, **kwargs):
+        http_conn = type('TimedHTTPConnection', (_TimedConnectionMixin, HTTPConnection),
+                         {'metrics': metrics})
+        https_conn = type('TimedHTTPSConnection', (_TimedHTTPSConnectionMixin, HTTPSConnection),
+                          {'metrics': metrics})
+        self._pool_classes = {
+            'http': type('TimedHTTPConnectionPool', (HTTPConnectionPool,), {'ConnectionCls': http_conn}),
+            'https': type('TimedHTTPSConnectionPool', (HTTPSConnectionPool,), {'ConnectionCls': https_conn}),
+        }
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self._pool_classes
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Kiểm tra 2 backend của extractors.py (BeautifulSoup vs lxml) cho cùng kết quả
+trên các trang mẫu trong fixtures/html
+
+Chạy từ thư mục gốc repo:
+    python -m pytest tests
+    python -m unittest discover tests
+"""
+
+import glob
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import extractors  # noqa: E402
+
+FIXTURES = sorted(glob.glob(os.path.join(ROOT, 'fixtures', 'html', '*.html')))
+
+
+def extract_all(extractor, raw: bytes) -> dict:
+    doc = extractor.parse(raw)
+    return {
+        'title':    extractor.title(doc),
+        'nb_title': extractor.nb_title(doc),
+        'content':  extractor.content_100_words(doc),
+    }
+
+
+class ParityTest(unittest.TestCase):
+
+    def test_fixtures_exist(self):
+        self.assertTrue(FIXTURES, "fixtures/html không có trang mẫu nào")
+
+    @unittest.skipIf(extractors.etree is None, "chưa cài lxml")
+    def test_soup_matches_lxml(self):
+        soup = extractors.get_extractor('soup')
+        fast = extractors.get_extractor('lxml')
+        self.assertEqual(fast.name, 'lxml')
+        for path in FIXTURES:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            with self.subTest(page=os.path.basename(path)):
+                expected = extract_all(soup, raw)
+                self.assertNotEqual(expected['content'], extractors.NO_CONTENT)
+                self.assertEqual(extract_all(fast, raw), expected)
+
+    def test_nb_title_prefers_title_tag(self):
+        soup = extractors.get_extractor('soup')
+        raw = ('<html><head><title>Tiêu đề thẻ title</title>'
+               '<meta property="og:title" content="Tiêu đề og"></head>'
+               '<body><h1>Tiêu đề h1</h1></body></html>').encode('utf-8')
+        doc = soup.parse(raw)
+        self.assertEqual(soup.nb_title(doc), 'Tiêu đề thẻ title')
+        self.assertEqual(soup.title(doc), 'Tiêu đề og')
+        self.assertEqual(soup.nb_title(soup.parse(b'<html><body></body></html>')), extractors.NO_TITLE)
+
+
+if __name__ == '__main__':
+    unittest.main()
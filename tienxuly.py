@@ -1,32 +1,35 @@
-import json
 import sys
 from pathlib import Path
 
+from corpus_store import load_data, save_data
+from incremental_clean import clean_folders, find_folders
+
+
+def is_error(info):
+    """Bản ghi hỏng: thiếu tiêu đề hoặc tiêu đề là thông báo lỗi"""
+    title = info.get("title", "")
+
+    return (
+        not title
+        or title.strip() == ""
+        or "lỗi" in title.lower()
+    )
+
 
 def clean_data(input_file, output_file, error_file):
-    with open(input_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = load_data(input_file)
 
     clean_data = {}
     error_data = {}
 
     for url, info in data.items():
-        title = info.get("title", "")
-
-        if (
-            not title
-            or title.strip() == ""
-            or "lỗi" in title.lower()
-        ):
+        if is_error(info):
             error_data[url] = info
         else:
             clean_data[url] = info
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(clean_data, f, ensure_ascii=False, indent=2)
-
-    with open(error_file, "w", encoding="utf-8") as f:
-        json.dump(error_data, f, ensure_ascii=False, indent=2)
+    save_data(output_file, clean_data)
+    save_data(error_file, error_data)
 
     print(f"✅ Hợp lệ: {len(clean_data)}")
     print(f"❌ Lỗi: {len(error_data)}")
@@ -35,27 +38,41 @@ def clean_data(input_file, output_file, error_file):
 
 
 def main():
-    if len(sys.argv) < 2:
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    options = dict(a[2:].partition("=")[::2] for a in sys.argv[1:] if a.startswith("--"))
+
+    # --all: mọi thư mục thành viên; nhiều thư mục được làm sạch song song (process pool)
+    folders = find_folders("data") if "all" in options else args
+    if not folders:
         print("❌ Thiếu tên thư mục")
         print("Ví dụ: python tienxuly.py thinh")
+        print("       python tienxuly.py thinh thien huy")
+        print("       python tienxuly.py --all            # mọi thư mục, song song")
+        print("Tùy chọn: --workers=N (số process), --full (đánh giá lại mọi bản ghi)")
         return
 
-    folder = Path(sys.argv[1])
-
-    if not folder.exists():
-        print(f"❌ Thư mục '{folder}' không tồn tại")
+    missing = [f for f in folders if not Path(f).exists()]
+    for f in missing:
+        print(f"❌ Thư mục '{f}' không tồn tại")
+    folders = [f for f in folders if Path(f).exists()]
+    if not folders:
         return
 
-    input_file = folder / "data.json"
-    output_file = folder / "data_clean.json"
-    error_file = folder / "data_error.json"
-
-    if not input_file.exists():
-        print(f"❌ Không tìm thấy {input_file}")
+    try:
+        workers = int(options["workers"]) if options.get("workers") else None
+    except ValueError:
+        print("❌ --workers không hợp lệ")
         return
 
-    print(f"📂 Xử lý dữ liệu trong: {folder}")
-    clean_data(input_file, output_file, error_file)
+    print(f"📂 Xử lý dữ liệu trong: {', '.join(folders)}")
+    results = clean_folders(folders, "data", is_error, workers, full="full" in options)
+
+    if len(results) == 1 and not results[0].get("missing"):
+        r = results[0]
+        print(f"✅ Hợp lệ: {r['clean']}")
+        print(f"❌ Lỗi: {r['error']}")
+        print(f"📁 Lưu file sạch: {r['output']}")
+        print(f"📁 Lưu file lỗi: {r['error_file']}")
 
 
 if __name__ == "__main__":
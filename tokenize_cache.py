@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache kết quả word_tokenize (underthesea) trên đĩa, dùng chung cho train, đánh giá và app.py
+
+Tách từ là bước tốn CPU nhất, mà mỗi lần train lại / đánh giá lại đều tách lại đúng các tiêu đề cũ.
+- Khóa: hash (blake2b) của đúng văn bản truyền vào; văn bản được tách nguyên trạng (không chuẩn hóa
+  Unicode / khoảng trắng) để kết quả trùng với lúc train các model đã có
+- Lưu: SQLite .cache/tokenize.sqlite3 (đổi bằng biến môi trường ML2_TOKENIZE_CACHE),
+  phía trước là LRU trong RAM
+- Đổi phiên bản underthesea hoặc CACHE_FORMAT → cache cũ bị xoá (kết quả tách từ có thể khác)
+- Ghi xuống đĩa theo lô (FLUSH_EVERY bản ghi hoặc FLUSH_SECONDS giây), khi thoát thì ghi nốt
+
+Dùng thay cho underthesea.word_tokenize:
+    from tokenize_cache import word_tokenize
+    word_tokenize(text.lower(), format="text")
+
+Tách cả lô (rnn_custom.preprocess_batch / build_input_batch dùng hàm này):
+    tokenize_batch(texts)   # văn bản chưa có trong cache được tách song song trên nhiều process
+
+Cách dùng:
+    python tokenize_cache.py stats
+    python tokenize_cache.py clear
+"""
+
+import atexit
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from underthesea import word_tokenize as _word_tokenize
+
+
+CACHE_PATH = os.environ.get('ML2_TOKENIZE_CACHE', os.path.join('.cache', 'tokenize.sqlite3'))
+LRU_SIZE = 100_000
+FLUSH_EVERY = 500
+FLUSH_SECONDS = 5.0
+# Đổi khi cách tạo khóa / văn bản đưa vào tokenizer thay đổi (bản trước khóa theo văn bản đã NFC + gộp
+# khoảng trắng nên kết quả cũ có thể lệch với văn bản gốc)
+CACHE_FORMAT = 'raw'
+
+# tokenize_batch: lô có ít văn bản chưa tách hơn POOL_MIN_BATCH thì tách ngay trong process hiện tại
+# (khởi động process pool + nạp underthesea mất vài giây)
+POOL_MIN_BATCH = 256
+CHUNK_SIZE = 64
+
+# Thư viện tạo thread nền khi được nạp: fork sau khi đã nạp chúng có thể làm process con bị treo
+FORK_UNSAFE_MODULES = ('tensorflow', 'torch')
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def tokenizer_version() -> str:
+    try:
+        from importlib.metadata import version
+        return version('underthesea')
+    except Exception:
+        return 'unknown'
+
+
+class TokenizeCache:
+    """LRU trong RAM + SQLite trên đĩa; an toàn khi gọi từ nhiều thread"""
+
+    def __init__(self, path: str = CACHE_PATH, lru_size: int = LRU_SIZE):
+        self.path = path
+        self.lru_size = lru_size
+        self.lru: 'OrderedDict[bytes, str]' = OrderedDict()
+        self.pending: Dict[bytes, str] = {}
+        self.lock = threading.RLock()
+        self.db = None
+        self.pid = None
+        self.last_flush = time.monotonic()
+        self.stats = {'memory': 0, 'disk': 0, 'miss': 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        # Process con (fork từ process pool) phải mở kết nối riêng
+        if self.db is not None and self.pid == os.getpid():
+            return self.db
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS tokens (key BLOB PRIMARY KEY, text TEXT NOT NULL)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        version = f'{tokenizer_version()}/{CACHE_FORMAT}'
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'tokenizer'").fetchone()
+        if row is None or row[0] != version:
+            self.db.execute('DELETE FROM tokens')
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('tokenizer', ?)", (version,))
+        self.db.commit()
+        self.pid = os.getpid()
+        self.lru.clear()
+        self.pending.clear()
+        return self.db
+
+    def _remember(self, key: bytes, value: str):
+        self.lru[key] = value
+        self.lru.move_to_end(key)
+        if len(self.lru) > self.lru_size:
+            self.lru.popitem(last=False)
+
+    def lookup(self, text: str) -> Optional[str]:
+        """Kết quả đã cache của văn bản, None nếu chưa có — không tách từ"""
+        key = text_key(text)
+        with self.lock:
+            db = self._connect()
+            value = self.lru.get(key)
+            if value is not None:
+                self.lru.move_to_end(key)
+                self.stats['memory'] += 1
+                return value
+            value = self.pending.get(key)
+            if value is None:
+                row = db.execute('SELECT text FROM tokens WHERE key = ?', (key,)).fetchone()
+                value = row[0] if row else None
+            if value is not None:
+                self.stats['disk'] += 1
+                self._remember(key, value)
+            return value
+
+    def store(self, text: str, value: str, persist: bool = True):
+        """Ghi nhận kết quả tách từ mới; persist=False khi process khác đã ghi xuống đĩa"""
+        key = text_key(text)
+        with self.lock:
+            self._connect()
+            self.stats['miss'] += 1
+            self._remember(key, value)
+            if persist:
+                self.pending[key] = value
+                if len(self.pending) >= FLUSH_EVERY or time.monotonic() - self.last_flush >= FLUSH_SECONDS:
+                    self.flush()
+
+    def tokenize(self, text: str) -> str:
+        """Như word_tokenize(text, format="text"), có cache"""
+        value = self.lookup(text)
+        if value is None:
+            # Tách từ ngoài lock: các thread khác vẫn đọc cache được
+            value = _word_tokenize(text, format="text")
+            self.store(text, value)
+        return value
+
+    def flush(self):
+        """Ghi các kết quả mới xuống SQLite"""
+        with self.lock:
+            if self.pending and self.db is not None and self.pid == os.getpid():
+                with self.db:
+                    self.db.executemany('INSERT OR IGNORE INTO tokens VALUES (?, ?)', self.pending.items())
+                self.pending.clear()
+            self.last_flush = time.monotonic()
+
+    def __len__(self) -> int:
+        with self.lock:
+            self.flush()
+            return self._connect().execute('SELECT COUNT(*) FROM tokens').fetchone()[0]
+
+    def clear(self):
+        with self.lock:
+            db = self._connect()
+            with db:
+                db.execute('DELETE FROM tokens')
+            self.lru.clear()
+            self.pending.clear()
+
+    def hit_rate(self) -> float:
+        total = sum(self.stats.values())
+        return (self.stats['memory'] + self.stats['disk']) / total if total else 0.0
+
+    def print_stats(self):
+        self.flush()
+        s = self.stats
+        total = sum(s.values())
+        if not total:
+            return
+        print(f"🧠 Cache tách từ: {total} lượt, hit {self.hit_rate():.1%} "
+              f"(RAM {s['memory']}, đĩa {s['disk']}), tách mới {s['miss']} → {self.path}")
+
+
+_cache: Optional[TokenizeCache] = None
+
+
+def get_cache() -> TokenizeCache:
+    global _cache
+    if _cache is None:
+        _cache = TokenizeCache()
+        atexit.register(_cache.flush)
+    return _cache
+
+
+def word_tokenize(sentence: str, format: str = None, **kwargs):
+    """Thay cho underthesea.word_tokenize: format="text" đi qua cache, dạng khác gọi thẳng"""
+    if format == "text" and not kwargs:
+        return get_cache().tokenize(sentence)
+    return _word_tokenize(sentence, format=format, **kwargs)
+
+
+def print_stats():
+    if _cache is not None:
+        _cache.print_stats()
+
+
+def _tokenize_chunk(texts: List[str]) -> List[str]:
+    """Chạy trong process con: tách 1 khúc văn bản, ghi kết quả xuống cache trước khi trả về"""
+    cache = get_cache()
+    result = [cache.tokenize(text) for text in texts]
+    cache.flush()       # process con của pool không chạy atexit
+    return result
+
+
+def _pool_context():
+    """
+    Start method cho process pool của tokenize_batch; None = tách ngay trong process hiện tại.
+
+    - Chưa nạp TensorFlow / PyTorch: fork (script train là file phẳng, không có
+      if __name__ == "__main__", nên spawn / forkserver sẽ chạy lại cả script trong process con)
+    - Đã nạp: không fork nữa; notebook / REPL (__main__ không có __file__, spawn không phải chạy
+      lại gì) thì dùng forkserver / spawn như parse_pool.py, còn script thì tách tại chỗ
+    """
+    methods = multiprocessing.get_all_start_methods()
+    if 'fork' in methods and not any(name in sys.modules for name in FORK_UNSAFE_MODULES):
+        return multiprocessing.get_context('fork')
+    if getattr(sys.modules.get('__main__'), '__file__', None) is None:
+        return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+    return None
+
+
+_warned_in_process = False
+
+
+def tokenize_batch(texts: Sequence[str], workers: int = None, chunksize: int = CHUNK_SIZE,
+                   min_batch: int = POOL_MIN_BATCH) -> List[str]:
+    """
+    Như [word_tokenize(t, format="text") for t in texts], giữ nguyên thứ tự.
+    Văn bản đã có trong cache lấy ngay; văn bản chưa có (bỏ trùng) được chia thành từng khúc
+    chunksize và tách song song trên workers process (mặc định số lõi CPU).
+    Ít hơn min_batch văn bản cần tách, workers=1, hoặc không tạo process con an toàn được
+    (xem _pool_context) thì tách ngay trong process hiện tại.
+    """
+    global _warned_in_process
+    cache = get_cache()
+    results: List[Optional[str]] = [None] * len(texts)
+    missing: Dict[str, List[int]] = {}      # văn bản chưa có trong cache → các vị trí cần điền
+    for i, text in enumerate(texts):
+        value = cache.lookup(text) if text not in missing else None
+        if value is None:
+            missing.setdefault(text, []).append(i)
+        else:
+            results[i] = value
+
+    workers = workers or os.cpu_count() or 1
+    pending = list(missing)
+    use_pool = len(pending) >= min_batch and workers > 1
+    context = _pool_context() if use_pool else None
+    if context is None:
+        if use_pool and not _warned_in_process and any(name in sys.modules for name in FORK_UNSAFE_MODULES):
+            _warned_in_process = True
+            print("⚠️  Đã nạp TensorFlow / PyTorch → tách từ trong process hiện tại "
+                  "(tách cả lô trước khi import tensorflow để chạy song song)")
+        for text in pending:
+            value = cache.tokenize(text)
+            for i in missing[text]:
+                results[i] = value
+        return results
+
+    chunks = [pending[i:i + chunksize] for i in range(0, len(pending), chunksize)]
+    cache.flush()
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=context) as executor:
+        # map trả kết quả theo đúng thứ tự các khúc
+        for chunk, values in zip(chunks, executor.map(_tokenize_chunk, chunks)):
+            for text, value in zip(chunk, values):
+                cache.store(text, value, persist=False)
+                for i in missing[text]:
+                    results[i] = value
+    return results
+
+
+def main(argv: List[str] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else 'stats'
+    cache = get_cache()
+    if command == 'stats':
+        size = os.path.getsize(cache.path) / 1024 / 1024 if os.path.exists(cache.path) else 0.0
+        print(f"🧠 {cache.path}: {len(cache)} văn bản đã tách ({size:.1f} MB), "
+              f"underthesea {tokenizer_version()}")
+    elif command == 'clear':
+        cache.clear()
+        print(f"🗑  Đã xoá cache {cache.path}")
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Chuẩn hóa URL và chống trùng link giữa các thư mục thành viên trước khi cào
+
+Cùng 1 bài báo thường được nhiều người thêm vào links.txt với URL hơi khác nhau
+(http/https, www, bản AMP/mobile, tham số utm_..., #comment...). canonical_url()
+đưa chúng về 1 dạng; DedupIndex gom link của mọi thư mục theo URL chuẩn để mỗi bài
+chỉ được cào 1 lần, đồng thời báo các link trùng và các bài bị gắn tag khác nhau.
+
+Chủ sở hữu mỗi bài (thư mục sẽ cào bài đó):
+    1. thư mục đã cào bài đó rồi (có trong journal / file output)
+    2. không thì thư mục đầu tiên trong lần chạy này có link đó
+Các thư mục khác bỏ qua link này.
+"""
+
+import json
+import os
+import re
+from typing import Callable, Dict, Iterable, List, Tuple
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit
+
+from chuanhoatag import split_and_normalize
+from crawl_journal import CrawlJournal
+
+
+DEDUP_REPORT_FILE = os.path.join('.cache', 'dedup_report.json')
+
+# Tham số theo dõi / quảng cáo, không ảnh hưởng nội dung bài
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', '_ga', '_gl',
+    'zarsrc', 'gidzl', 'zalo_share', 'cmpid', 'ref', 'refsrc', 'src', 'source',
+    'amp', 'outputtype', 'mobile',
+}
+TRACKING_PREFIXES = ('utm_', 'itm_', 'fb_', 'mc_', 'pk_')
+
+# Tiền tố tên miền của bản mobile / AMP
+HOST_PREFIXES = ('www.', 'm.', 'amp.', 'mobile.')
+
+AMP_SUFFIX = re.compile(r'\.amp(?=\.html?$|$)', re.IGNORECASE)
+
+
+def canonical_url(url: str) -> str:
+    """
+    Đưa URL về dạng chuẩn để so trùng (không dùng để fetch):
+        https://www.vnexpress.net/abc-123.html?utm_source=fb#box
+        http://m.vnexpress.net/abc-123.html/amp
+    → vnexpress.net/abc-123.html
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').lower().rstrip('.')
+    stripped = True
+    while stripped:
+        stripped = False
+        for prefix in HOST_PREFIXES:
+            if host.startswith(prefix) and host.count('.') > 1:
+                host = host[len(prefix):]
+                stripped = True
+    if parts.port and parts.port not in (80, 443):
+        host = f'{host}:{parts.port}'
+
+    # Chuẩn hóa percent-encoding, bỏ đoạn /amp ở đầu/cuối path và đuôi .amp
+    segments = [s for s in unquote(parts.path).split('/') if s]
+    if segments and segments[0].lower() == 'amp':
+        segments = segments[1:]
+    if segments and segments[-1].lower() == 'amp':
+        segments = segments[:-1]
+    path = AMP_SUFFIX.sub('', '/'.join(segments))
+    path = quote(path, safe="/:@!$&'()*+,;=-._~")
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+
+    canonical = f'{host}/{path}' if path else host
+    if query:
+        canonical += '?' + urlencode(query)
+    return canonical
+
+
+def _done_urls(folder: str, output_name: str) -> set:
+    """URL đã cào trong thư mục: đọc journal, chưa có journal thì đọc file output"""
+    output_file = os.path.join(folder, output_name)
+    journal = CrawlJournal(output_file)
+    if journal.exists():
+        return journal.done_urls()
+    if os.path.isfile(output_file):
+        try:
+            with open(output_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                return set(data)
+        except Exception:
+            pass
+    return set()
+
+
+class DedupIndex:
+    """Chỉ mục URL chuẩn → các link (thư mục, URL gốc, tag) trỏ tới cùng 1 bài"""
+
+    def __init__(self):
+        self.groups: Dict[str, List[Tuple[str, str, str]]] = {}
+        # (thư mục, URL gốc) → (thư mục chủ, URL chủ) cho các link bị bỏ qua
+        self.skipped: Dict[Tuple[str, str], Tuple[str, str]] = {}
+
+    @classmethod
+    def build(cls, folders: Iterable[str], links_name: str, output_name: str,
+              read_links: Callable[[str], list]) -> 'DedupIndex':
+        """
+        Dựng index từ links của `folders` (các thư mục sắp cào, theo thứ tự ưu tiên)
+        và của mọi thư mục thành viên khác trong thư mục hiện tại có file links_name.
+        """
+        # "NĐT/" và "NĐT" là 1 thư mục: khóa phải khớp os.path.dirname(input_file) trong filter
+        folders = list(dict.fromkeys(os.path.normpath(f) for f in folders))
+        others = sorted(
+            d for d in os.listdir('.')
+            if d not in folders and not d.startswith(('.', '_'))
+            and os.path.isfile(os.path.join(d, links_name))
+        )
+
+        index = cls()
+        done: Dict[str, set] = {}
+        for folder in folders + others:
+            path = os.path.join(folder, links_name)
+            if not os.path.isfile(path):
+                continue
+            done[folder] = _done_urls(folder, output_name)
+            for url, tag in read_links(path):
+                index.groups.setdefault(canonical_url(url), []).append((folder, url, tag))
+
+        active = set(folders)
+        for entries in index.groups.values():
+            owner = next(((f, u) for f, u, _ in entries if u in done[f]), None)
+            if owner is None:
+                owner = next(((f, u) for f, u, _ in entries if f in active), None)
+            if owner is None:
+                continue
+            for folder, url, _ in entries:
+                if (folder, url) != owner and folder in active:
+                    index.skipped[(folder, url)] = owner
+        return index
+
+    def duplicates(self) -> Dict[str, List[Tuple[str, str, str]]]:
+        """Các bài có nhiều hơn 1 link"""
+        return {key: entries for key, entries in self.groups.items() if len(entries) > 1}
+
+    @staticmethod
+    def _labels(tag: str) -> Tuple[str, ...]:
+        return tuple(split_and_normalize(tag))
+
+    def conflicts(self) -> Dict[str, List[Tuple[str, str, str]]]:
+        """Các bài trùng mà tag (sau khi chuẩn hóa) khác nhau giữa các link"""
+        return {
+            key: entries for key, entries in self.duplicates().items()
+            if len({self._labels(tag) for _, _, tag in entries}) > 1
+        }
+
+    def filter(self, input_file: str, links: list) -> list:
+        """Bỏ các link của thư mục chứa input_file đã do thư mục/link khác đảm nhận"""
+        folder = os.path.normpath(os.path.dirname(input_file))
+        kept = []
+        skipped = 0
+        for url, tag in links:
+            owner = self.skipped.get((folder, url))
+            if owner is None:
+                kept.append((url, tag))
+                continue
+            skipped += 1
+            where = 'cùng thư mục' if owner[0] == folder else owner[0]
+            print(f"  🔁 Trùng ({where}): {url[:70]}")
+        if skipped:
+            print(f"⏭  Bỏ qua {skipped} link trùng bài với link khác\n")
+        return kept
+
+    def report(self, path: str = DEDUP_REPORT_FILE, limit: int = 10):
+        """In tóm tắt link trùng / tag mâu thuẫn và ghi chi tiết ra file JSON"""
+        duplicates = self.duplicates()
+        conflicts = self.conflicts()
+        extra = sum(len(entries) - 1 for entries in duplicates.values())
+
+        print(f"🔁 Chống trùng: {len(self.groups)} bài, {len(duplicates)} bài có link trùng "
+              f"({extra} link thừa), {len(conflicts)} bài bị gắn tag khác nhau")
+        for key, entries in list(conflicts.items())[:limit]:
+            print(f"  ⚠️  {key[:70]}")
+            for folder, url, tag in entries:
+                print(f"       {folder}: {tag}")
+        if len(conflicts) > limit:
+            print(f"  ... và {len(conflicts) - limit} bài nữa")
+
+        if not duplicates:
+            return
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    key: {
+                        'conflict': key in conflicts,
+                        'links': [{'folder': folder, 'url': url, 'tag': tag}
+                                  for folder, url, tag in entries],
+                    }
+                    for key, entries in duplicates.items()
+                }, f, ensure_ascii=False, indent=2)
+            print(f"  📄 Chi tiết: {path}")
+        except Exception as e:
+            print(f"  ⚠️  Không ghi được {path}: {e}")